@@ -0,0 +1,45 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from app.core.profiling import format_folded, get_sampler, load_hot_paths
+from app.core.config import settings
+
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+@router.get("/hot-paths", summary="Where time goes under real load", include_in_schema=False)
+async def get_hot_paths(
+        limit: int = Query(default=20, ge=1, le=500, description="Functions per ranking"),
+        format: str = Query(default="json", pattern="^(json|folded)$", description="json or folded stacks")
+):
+    """
+    Aggregated samples of the always-on sampler over the last
+    SAMPLER_WINDOW_SECONDS, across the API and analysis worker processes.
+    Only served with ADMIN_ENDPOINTS_ENABLED: the stacks name internal
+    functions, files and line numbers.
+
+    - **limit**: Number of functions in each ranking
+    - **format**: ``json`` for the top functions by self time (innermost
+      frame) and cumulative time (anywhere on the stack); ``folded`` for
+      the merged stacks, to open in speedscope or a flamegraph tool
+    - Returns: Hot paths
+    """
+
+    if not settings.ADMIN_ENDPOINTS_ENABLED:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled on this server")
+
+    if not settings.SAMPLER_ENABLED:
+        raise HTTPException(status_code=403, detail="The sampler is disabled on this server")
+
+    # Include this process's latest samples rather than its last periodic snapshot
+    sampler = get_sampler()
+    if sampler.running:
+        sampler.flush()
+
+    hot_paths = load_hot_paths(limit)
+
+    if format == "folded":
+        return PlainTextResponse(format_folded(hot_paths["stacks"]))
+
+    hot_paths.pop("stacks")
+    return {"window_seconds": settings.SAMPLER_WINDOW_SECONDS, **hot_paths}
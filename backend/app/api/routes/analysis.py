@@ -1,9 +1,18 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from app.services.symmetry_service import SymmetryService
+from fastapi import APIRouter, HTTPException, UploadFile, File, Header, Query, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import AsyncIterator, List, Optional, Sequence, Tuple, Union
+from app.services.symmetry_service import DETECTOR_PROFILES, DETECTOR_TYPES, SymmetryService, resolve_detectors
 from app.services.image_service import ImageService
+from app.services.executor import ExecutorBusyError, get_analysis_executor
+from app.services.analysis_store import get_analysis_store
+from app.services.job_queue import get_job_queue
 from app.models.schemas import SymmetryAnalysisResult, ErrorResponse
-from app.core.security import validate_image_file, validate_file_size
+from app.core.security import validate_image_file
+from app.core.metrics import format_server_timing
+import asyncio
+import json
 import os
+import time
 from app.core.config import settings
 
 
@@ -12,9 +21,81 @@ symmetry_service = SymmetryService()
 image_service = ImageService()
 
 
-@router.post("/", response_model=SymmetryAnalysisResult, summary="Analyze image symmetry")
+async def store_upload(file: UploadFile) -> dict:
+    """Validate and store one uploaded file; returns its metadata"""
+    validate_image_file(file)
+    return await image_service.save_upload(file)
+
+
+async def process_upload(file: UploadFile, profile: bool = False,
+                         detectors: Optional[Sequence[str]] = None,
+                         deadline: Optional[float] = None) -> SymmetryAnalysisResult:
+    """
+    Validate, store and analyze one uploaded file
+
+    ``profile`` stores a profile under the analysis ID; ``detectors`` limits
+    the analysis to those detector types and ``deadline`` (a time.time()
+    value) bounds when they may start.
+    """
+
+    return await analyze_stored(await store_upload(file), profile, detectors, deadline)
+
+
+async def analyze_stored(file_metadata: dict, profile: bool = False,
+                         detectors: Optional[Sequence[str]] = None,
+                         deadline: Optional[float] = None) -> SymmetryAnalysisResult:
+    """Analyze an upload already stored by store_upload (see process_upload for the options)"""
+
+    return await symmetry_service.analyze_image(
+        file_metadata["file_path"],
+        file_metadata["file_id"],
+        original_filename=file_metadata["original_filename"],
+        content_hash=file_metadata["content_hash"],
+        profile_id=file_metadata["file_id"] if profile else None,
+        detectors=detectors,
+        deadline=deadline
+    )
+
+
+async def enqueue_upload(file: UploadFile) -> JSONResponse:
+    """Validate and store one uploaded file, then queue its analysis (202 Accepted)"""
+
+    file_metadata = await store_upload(file)
+
+    job = get_job_queue().enqueue(
+        file_metadata["file_id"],
+        file_metadata["file_path"],
+        original_filename=file_metadata["original_filename"],
+        content_hash=file_metadata["content_hash"]
+    )
+
+    status_url = f"{settings.API_PREFIX}/jobs/{job.job_id}"
+    return JSONResponse(
+        status_code=202,
+        content={
+            **job.model_dump(mode="json", exclude={"result"}),
+            "status_url": status_url,
+            "events_url": f"{status_url}/events"
+        },
+        headers={"Location": status_url}
+    )
+
+
+@router.post("/", response_model=SymmetryAnalysisResult, summary="Analyze image symmetry",
+             responses={202: {"description": "Analysis queued (async=true)"}})
 async def analyze_symmetry(
-        file: UploadFile = File(..., description="Image file to analyze")
+        response: Response,
+        file: UploadFile = File(..., description="Image file to analyze"),
+        run_async: bool = Query(default=False, alias="async", description="Queue the analysis and return a job ID"),
+        detectors: Optional[str] = Query(
+            default=None,
+            description=f"Comma-separated detector types ({', '.join(DETECTOR_TYPES)}) "
+                        f"or profiles ({', '.join(DETECTOR_PROFILES)}); default all"
+        ),
+        profile: bool = Header(default=False, alias="X-Profile", description="Profile this analysis"),
+        deadline_ms: Optional[int] = Header(
+            default=None, alias="X-Deadline-Ms", ge=1, description="Latency budget in milliseconds"
+        )
 ):
     """
     Analyze symmetry in an uploaded image.
@@ -26,26 +107,60 @@ async def analyze_symmetry(
     4. Returns annotated image with symmetry axes highlighted
 
     - **file**: Image file (JPG, JPEG, PNG, BMP)
-    - Returns: Complete symmetry analysis result
+    - **detectors**: Run only these detector types, e.g. ``vertical,radial``,
+      or ``quick`` (vertical and horizontal). Other stages are not run and
+      are listed in ``skipped_detectors`` / marked ``skipped`` in
+      ``detector_status``. Partial analyses get no gallery thumbnail.
+    - **async**: Return ``202`` with a job ID right after the upload is
+      stored; follow it at ``/jobs/{job_id}`` or ``/jobs/{job_id}/events``
+    - **X-Profile** (header): Stack-sample this (synchronous) analysis and
+      store folded stacks at ``/profiles/{analysis_id}``, given in the
+      ``X-Profile-Url`` response header. Requires PROFILING_ENABLED.
+    - **X-Deadline-Ms** (header): Latency budget, counted from when the
+      upload has been received (default ANALYSIS_DEADLINE_MS, 0 = none).
+      Detectors run in priority order (vertical, horizontal, diagonal,
+      radial, regions) and the first selected one always completes; those
+      not started within the budget are marked ``timed_out`` and listed in
+      ``skipped_detectors``, and the result is ``partial`` with a score over
+      the detectors that completed. Partial results are not served by
+      ``GET /analyze/{id}``, which analyzes the upload in full instead.
+    - Returns: Complete symmetry analysis result, with per-stage timings
+      in the ``Server-Timing`` header
     """
 
+    if profile and not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=403, detail="Profiling is disabled on this server")
+
     try:
-        # Validate file
-        validate_image_file(file)
-        content = await validate_file_size(file)
+        selected = resolve_detectors(detectors)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        # Save uploaded file
-        file_metadata = await image_service.save_upload(file, content)
-        file_id = file_metadata["file_id"]
-        file_path = file_metadata["file_path"]
+    if run_async and selected != DETECTOR_TYPES:
+        raise HTTPException(status_code=400, detail="Queued analyses always run every detector")
 
-        # Perform symmetry analysis
-        result = await symmetry_service.analyze_image(file_path, file_id)
+    if run_async and deadline_ms is not None:
+        raise HTTPException(status_code=400, detail="Queued analyses have no latency budget")
 
+    budget_ms = deadline_ms or settings.ANALYSIS_DEADLINE_MS
+    deadline = time.time() + budget_ms / 1000.0 if budget_ms else None
+
+    try:
+        if run_async:
+            return await enqueue_upload(file)
+
+        # Validate, save and analyze
+        result = await process_upload(file, profile=profile, detectors=selected, deadline=deadline)
+        timings = dict(result.stage_timings or {}, total=result.processing_time)
+        response.headers["Server-Timing"] = format_server_timing(timings)
+        if profile:
+            response.headers["X-Profile-Url"] = f"{settings.API_PREFIX}/profiles/{result.analysis_id}"
         return result
 
     except HTTPException:
         raise
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -53,74 +168,168 @@ async def analyze_symmetry(
         )
 
 
+def find_upload_path(file_id: str) -> str:
+    """Locate the uploaded original for ``file_id`` or raise 404"""
+
+    for ext in settings.ALLOWED_EXTENSIONS:
+        upload_path = os.path.join(settings.UPLOAD_DIR, f"{file_id}{ext}")
+        if os.path.exists(upload_path):
+            return upload_path
+
+    raise HTTPException(
+        status_code=404,
+        detail=f"Analysis with ID '{file_id}' not found"
+    )
+
+
+async def load_or_analyze(file_id: str, recompute: bool = False) -> SymmetryAnalysisResult:
+    """Serve a stored analysis, running detection only when missing, partial or forced"""
+
+    if not recompute:
+        result = get_analysis_store().get(file_id)
+        if result is not None and not result.partial:
+            return result
+
+    # Not persisted yet, cut short by a latency budget, or recompute requested: analyze the original upload
+    upload_path = find_upload_path(file_id)
+
+    try:
+        return await symmetry_service.analyze_image(upload_path, file_id)
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
 @router.get("/{file_id}", response_model=SymmetryAnalysisResult, summary="Get analysis by ID")
-async def get_analysis(file_id: str):
+async def get_analysis(
+        file_id: str,
+        recompute: bool = Query(default=False, description="Re-run detection instead of loading the stored result")
+):
     """
     Retrieve existing analysis result by file ID.
 
     - **file_id**: Unique identifier for the analyzed image
+    - **recompute**: Force a fresh analysis of the original upload
     - Returns: Previously computed symmetry analysis
     """
 
-    # Check if files exist
-    upload_path = os.path.join(settings.UPLOAD_DIR, f"{file_id}.jpg")
-    result_path = os.path.join(settings.RESULTS_DIR, f"{file_id}_analyzed.jpg")
-
-    if not os.path.exists(upload_path):
-        # Try other extensions
-        for ext in [".png", ".jpeg", ".bmp"]:
-            alt_path = os.path.join(settings.UPLOAD_DIR, f"{file_id}{ext}")
-            if os.path.exists(alt_path):
-                upload_path = alt_path
-                break
-        else:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Analysis with ID '{file_id}' not found"
-            )
+    return await load_or_analyze(file_id, recompute)
 
-    # Re-analyze if processed image doesn't exist
-    if not os.path.exists(result_path):
-        result = await symmetry_service.analyze_image(upload_path, file_id)
-        return result
 
-    # TODO: Load from database or cache if available
-    # For now, re-run analysis
-    result = await symmetry_service.analyze_image(upload_path, file_id)
-    return result
+async def store_batch(files: List[UploadFile], stored: "asyncio.Queue[Tuple[int, str, Union[dict, str]]]") -> None:
+    """
+    Validate and store every file of a batch, one at a time, putting
+    (index, filename, stored file metadata or error message) on ``stored``
+    as each one finishes
+    """
+
+    for index, file in enumerate(files):
+        try:
+            upload = await store_upload(file)
+        except HTTPException as e:
+            upload = e.detail
+        except Exception as e:
+            upload = str(e)
+        await stored.put((index, file.filename, upload))
+
+
+async def stream_batch(files: List[UploadFile]) -> AsyncIterator[str]:
+    """
+    Store and analyze ``files`` concurrently and yield one NDJSON line per
+    file as it finishes
+
+    A producer task stores the files one at a time (store_batch) and each
+    analysis starts as soon as its file is stored, at most
+    BATCH_STREAM_CONCURRENCY at a time. The request's files are closed only
+    after the response has been sent, and this stream ends only once every
+    file has been stored. Files that fail to store get an error line; a
+    final summary line closes the stream.
+    """
+
+    concurrency = settings.BATCH_STREAM_CONCURRENCY or get_analysis_executor().max_workers
+    stored: "asyncio.Queue[Tuple[int, str, Union[dict, str]]]" = asyncio.Queue()
+    producer = asyncio.ensure_future(store_batch(files, stored))
+    getter = None
+    waiting = []  # Stored, not started yet
+    running = {}
+    unstored = len(files)
+    successful = 0
+
+    try:
+        while unstored or waiting or running:
+            if unstored and getter is None:
+                getter = asyncio.ensure_future(stored.get())
+
+            done, _ = await asyncio.wait(
+                set(running) | ({getter} if getter else set()), return_when=asyncio.FIRST_COMPLETED
+            )
+
+            if getter in done:
+                index, filename, upload = getter.result()
+                getter = None
+                unstored -= 1
+                if isinstance(upload, dict):
+                    waiting.append((index, filename, upload))
+                else:
+                    yield json.dumps({"index": index, "filename": filename, "error": upload}) + "\n"
+
+            for task in done & set(running):
+                index, filename = running.pop(task)
+                line = {"index": index, "filename": filename}
+
+                try:
+                    line["result"] = task.result().model_dump(mode="json")
+                    successful += 1
+                except HTTPException as e:
+                    line["error"] = e.detail
+                except Exception as e:
+                    line["error"] = str(e)
+
+                yield json.dumps(line) + "\n"
+
+            while waiting and len(running) < concurrency:
+                index, filename, file_metadata = waiting.pop(0)
+                running[asyncio.ensure_future(analyze_stored(file_metadata))] = (index, filename)
+
+        await producer
+        yield json.dumps({"done": True, "total": len(files), "successful": successful}) + "\n"
+    finally:
+        # Client went away: stop storing and the analyses that have not finished yet
+        for task in [producer, getter, *running]:
+            if task is not None:
+                task.cancel()
 
 
 @router.post("/batch", summary="Batch analyze multiple images")
-async def batch_analyze(files: list[UploadFile] = File(...)):
+async def batch_analyze(
+        files: list[UploadFile] = File(...),
+        stream: bool = Query(default=False, description="Stream results as NDJSON while files finish")
+):
     """
     Analyze multiple images in a single request.
 
     - **files**: List of image files
+    - **stream**: Return ``application/x-ndjson`` with one line per file in
+      completion order (each with its ``index``), then a summary line.
+      Allows up to BATCH_STREAM_MAX_FILES files; each is analyzed as soon
+      as it is stored, concurrently with storing the rest.
     - Returns: List of analysis results
     """
 
-    if len(files) > 10:
+    max_files = settings.BATCH_STREAM_MAX_FILES if stream else settings.BATCH_MAX_FILES
+    if len(files) > max_files:
         raise HTTPException(
             status_code=400,
-            detail="Maximum 10 images allowed per batch"
+            detail=f"Maximum {max_files} images allowed per batch"
         )
 
+    if stream:
+        return StreamingResponse(stream_batch(files), media_type="application/x-ndjson")
+
     results = []
 
     for file in files:
         try:
-            # Validate and upload
-            validate_image_file(file)
-            content = await validate_file_size(file)
-            file_metadata = await image_service.save_upload(file, content)
-
-            # Analyze
-            result = await symmetry_service.analyze_image(
-                file_metadata["file_path"],
-                file_metadata["file_id"]
-            )
-            results.append(result)
-
+            results.append(await process_upload(file))
         except Exception as e:
             results.append({
                 "error": str(e),
@@ -135,20 +344,19 @@ async def batch_analyze(files: list[UploadFile] = File(...)):
 
 
 @router.get("/summary/{file_id}", summary="Get analysis summary")
-async def get_analysis_summary(file_id: str):
+async def get_analysis_summary(
+        file_id: str,
+        recompute: bool = Query(default=False, description="Re-run detection instead of loading the stored result")
+):
     """
     Get human-readable summary of symmetry analysis.
 
     - **file_id**: Analysis identifier
+    - **recompute**: Force a fresh analysis of the original upload
     - Returns: Text summary of findings
     """
 
-    upload_path = os.path.join(settings.UPLOAD_DIR, f"{file_id}.jpg")
-
-    if not os.path.exists(upload_path):
-        raise HTTPException(status_code=404, detail="Analysis not found")
-
-    result = await symmetry_service.analyze_image(upload_path, file_id)
+    result = await load_or_analyze(file_id, recompute)
     summary = symmetry_service.get_analysis_summary(result)
 
     return {
@@ -2,79 +2,68 @@ from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import FileResponse
 from app.models.schemas import GalleryResponse, GalleryItem
 from app.core.config import settings
+from app.services.analysis_store import get_analysis_store
+from app.services.stats_service import get_stats_service
+from app.services.storage_service import StorageService
 import os
-from datetime import datetime
 from typing import Optional
 
 
 router = APIRouter(prefix="/gallery", tags=["Gallery"])
 
+# Width of the on-request render used for rows without a stored thumbnail (as ImageService.save_thumbnail)
+THUMBNAIL_WIDTH = 300
+
 
 @router.get("/", response_model=GalleryResponse, summary="Get gallery of analyzed images")
 async def get_gallery(
         limit: int = Query(default=20, ge=1, le=100, description="Number of items to return"),
-        offset: int = Query(default=0, ge=0, description="Number of items to skip"),
-        sort_by: str = Query(default="timestamp", description="Sort by: timestamp, score")
+        offset: int = Query(default=0, ge=0, description="Number of items to skip (ignored when a cursor is given)"),
+        sort_by: str = Query(default="timestamp", description="Sort by: timestamp, score"),
+        cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page")
 ):
     """
-    Retrieve gallery of previously analyzed images.
+    Retrieve gallery of previously analyzed images. Analyses that skipped
+    detectors are left out, as they are from the gallery stats.
 
     - **limit**: Maximum number of items (1-100)
-    - **offset**: Skip first N items for pagination
+    - **offset**: Skip first N items for pagination (prefer cursor)
     - **sort_by**: Sort order (timestamp or score)
+    - **cursor**: Keyset cursor; every page costs the same regardless of depth
     - Returns: List of gallery items with thumbnails
     """
 
-    try:
-        items = []
-        results_dir = settings.RESULTS_DIR
-
-        # Get all analyzed images
-        if not os.path.exists(results_dir):
-            return GalleryResponse(total=0, items=[])
-
-        files = os.listdir(results_dir)
-        analyzed_files = [f for f in files if f.endswith("_analyzed.jpg")]
-
-        for filename in analyzed_files:
-            file_id = filename.replace("_analyzed.jpg", "")
-            file_path = os.path.join(results_dir, filename)
-            thumb_path = os.path.join(results_dir, f"{file_id}_thumb.jpg")
-
-            # Get file metadata
-            stat = os.stat(file_path)
-            timestamp = datetime.fromtimestamp(stat.st_mtime)
-
-            # For now, use placeholder score (in production, load from database)
-            score = 75.0  # TODO: Load actual score from database
-
-            items.append(GalleryItem(
-                analysis_id=file_id,
-                thumbnail_url=f"/results/{file_id}_thumb.jpg" if os.path.exists(thumb_path) else f"/results/{filename}",
-                symmetry_score=score,
-                timestamp=timestamp,
-                has_vertical_symmetry=True,  # TODO: Load from database
-                has_horizontal_symmetry=False
-            ))
-
-        # Sort items
-        if sort_by == "score":
-            items.sort(key=lambda x: x.symmetry_score, reverse=True)
-        else:  # timestamp
-            items.sort(key=lambda x: x.timestamp, reverse=True)
-
-        # Apply pagination
-        total = len(items)
-        items = items[offset:offset + limit]
-
-        return GalleryResponse(total=total, items=items)
+    store = get_analysis_store()
 
+    try:
+        rows, next_cursor = store.list_page(sort_by, limit, cursor, offset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to load gallery: {str(e)}"
         )
 
+    items = [
+        GalleryItem(
+            analysis_id=row["analysis_id"],
+            thumbnail_url=(
+                f"/results/{row['analysis_id']}_thumb.jpg" if row["thumbnail_path"]
+                else f"/results/{row['analysis_id']}_analyzed.jpg?width={THUMBNAIL_WIDTH}"
+            ),
+            symmetry_score=row["symmetry_score"],
+            timestamp=row["timestamp"],
+            has_vertical_symmetry=bool(row["has_vertical_symmetry"]),
+            has_horizontal_symmetry=bool(row["has_horizontal_symmetry"])
+        )
+        for row in rows
+    ]
+
+    total = get_stats_service().get_gallery_stats()["total_analyses"]
+
+    return GalleryResponse(total=total, items=items, next_cursor=next_cursor)
+
 
 @router.get("/image/{filename}", summary="Serve gallery image")
 async def get_gallery_image(filename: str):
@@ -113,7 +102,7 @@ async def delete_analysis(file_id: str):
     for ext in [".jpg", ".jpeg", ".png", ".bmp"]:
         upload_path = os.path.join(settings.UPLOAD_DIR, f"{file_id}{ext}")
         if os.path.exists(upload_path):
-            os.remove(upload_path)
+            StorageService.remove_file("uploads", upload_path)
             deleted_files.append(upload_path)
 
     # Delete from results
@@ -126,10 +115,13 @@ async def delete_analysis(file_id: str):
     for pattern in result_patterns:
         result_path = os.path.join(settings.RESULTS_DIR, pattern)
         if os.path.exists(result_path):
-            os.remove(result_path)
+            StorageService.remove_file("results", result_path)
             deleted_files.append(result_path)
 
-    if not deleted_files:
+    # Delete persisted result
+    record_deleted = get_analysis_store().delete(file_id)
+
+    if not deleted_files and not record_deleted:
         raise HTTPException(
             status_code=404,
             detail=f"No files found for analysis ID: {file_id}"
@@ -147,30 +139,22 @@ async def get_gallery_stats():
     """
     Get statistics about analyzed images.
 
+    Served from incrementally maintained aggregates (constant time).
+
     - Returns: Statistics summary
     """
 
-    results_dir = settings.RESULTS_DIR
+    return get_stats_service().get_gallery_stats()
 
-    if not os.path.exists(results_dir):
-        return {
-            "total_analyses": 0,
-            "average_score": 0,
-            "highest_score": 0,
-            "lowest_score": 0
-        }
 
-    files = os.listdir(results_dir)
-    analyzed_files = [f for f in files if f.endswith("_analyzed.jpg")]
+@router.post("/stats/reconcile", summary="Rebuild gallery statistics")
+async def reconcile_gallery_stats():
+    """
+    Rebuild statistics from the analyses table and the storage directories.
 
-    # TODO: Calculate actual statistics from database
-    return {
-        "total_analyses": len(analyzed_files),
-        "average_score": 72.5,  # Placeholder
-        "highest_score": 95.0,
-        "lowest_score": 45.0,
-        "storage_used_mb": sum(
-            os.path.getsize(os.path.join(results_dir, f))
-            for f in files
-        ) / (1024 * 1024)
-    }
\ No newline at end of file
+    Use after files were added or removed outside the application.
+
+    - Returns: Rebuilt totals
+    """
+
+    return get_stats_service().reconcile()
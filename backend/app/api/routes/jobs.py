@@ -0,0 +1,73 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator
+from app.services.job_queue import TERMINAL_STATUSES, get_job_queue
+from app.models.schemas import JobStatus
+from app.core.config import settings
+import asyncio
+import time
+
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+KEEPALIVE_SECONDS = 15.0  # Comment line sent on idle streams so proxies keep them open
+
+
+def get_job_or_404(job_id: str) -> JobStatus:
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job
+
+
+@router.get("/{job_id}", response_model=JobStatus, summary="Get job status")
+async def get_job(job_id: str):
+    """
+    Status of an analysis queued with ``POST /analyze?async=true``.
+
+    - **job_id**: Job identifier returned by the enqueue request
+    - Returns: Job status, with the analysis result once it has succeeded
+    """
+
+    return get_job_or_404(job_id)
+
+
+async def job_events(job: JobStatus) -> AsyncIterator[str]:
+    """Server-Sent Events: one event per status change, ending with the terminal one"""
+
+    last_state = None
+    last_sent = time.monotonic()
+
+    while True:
+        state = (job.status, job.attempts)
+        if state != last_state:
+            yield f"event: {job.status}\ndata: {job.model_dump_json()}\n\n"
+            last_state, last_sent = state, time.monotonic()
+        elif time.monotonic() - last_sent >= KEEPALIVE_SECONDS:
+            yield ": keepalive\n\n"
+            last_sent = time.monotonic()
+
+        if job.status in TERMINAL_STATUSES:
+            return
+
+        await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+        job = get_job_queue().get(job.job_id) or job
+
+
+@router.get("/{job_id}/events", summary="Stream job status")
+async def stream_job_events(job_id: str):
+    """
+    Follow a job as a ``text/event-stream``.
+
+    Each event is named after the job status (``queued``, ``running``,
+    ``succeeded``, ``failed``) and carries the job as JSON; the stream
+    closes after ``succeeded`` or ``failed``.
+    """
+
+    job = get_job_or_404(job_id)
+
+    return StreamingResponse(
+        job_events(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
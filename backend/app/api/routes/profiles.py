@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+from app.core.profiling import profile_path
+from app.core.config import settings
+import os
+
+
+router = APIRouter(prefix="/profiles", tags=["Profiling"])
+
+
+@router.get("/{profile_id}", summary="Download an analysis profile")
+async def get_profile(profile_id: str):
+    """
+    Folded stacks recorded for an analysis requested with ``X-Profile: 1``.
+
+    One ``frame;frame;... count`` line per sampled stack; open it in
+    speedscope or feed it to flamegraph.pl / inferno-flamegraph.
+
+    - **profile_id**: Analysis ID the profile was recorded for
+    - Returns: Plain-text folded stacks
+    """
+
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=403, detail="Profiling is disabled on this server")
+
+    try:
+        path = profile_path(profile_id)
+    except ValueError:
+        path = None
+
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail=f"Profile '{profile_id}' not found")
+
+    return FileResponse(path, media_type="text/plain", filename=os.path.basename(path))
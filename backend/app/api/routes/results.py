@@ -0,0 +1,60 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse, Response
+from typing import Optional
+from app.services.analysis_store import get_analysis_store
+from app.services.executor import ExecutorBusyError, get_analysis_executor
+from app.services.render_service import get_render_cache, render_annotated
+from app.api.routes.analysis import find_upload_path
+from app.core.config import settings
+from app.core.metrics import STAGE_DURATION, format_server_timing
+import os
+import time
+
+
+# Mounted at /results ahead of the static files, which still serve thumbnails
+router = APIRouter(prefix="/results", tags=["Results"])
+
+
+@router.get("/{analysis_id}_analyzed.jpg", summary="Annotated result image")
+async def get_annotated_image(
+        analysis_id: str,
+        width: Optional[int] = Query(default=None, ge=16, le=8192, description="Output width in pixels")
+):
+    """
+    Original image with the detected axes drawn on it, rendered on first request.
+
+    - **analysis_id**: Analysis identifier
+    - **width**: Downscale to this width (never upscales)
+    - Returns: JPEG image
+    """
+
+    result = get_analysis_store().get(analysis_id)
+
+    if result is None:
+        # Written eagerly by earlier versions, before results were persisted
+        legacy_path = os.path.join(settings.RESULTS_DIR, f"{analysis_id}_analyzed.jpg")
+        if width is None and os.path.exists(legacy_path):
+            return FileResponse(legacy_path, media_type="image/jpeg")
+        raise HTTPException(status_code=404, detail=f"Analysis with ID '{analysis_id}' not found")
+
+    # The timestamp changes when an analysis is recomputed, retiring stale renders
+    cache = get_render_cache()
+    key = (analysis_id, result.timestamp.isoformat(), width)
+    image = cache.get(key)
+    headers = {}
+
+    if image is None:
+        axes = [axis.model_dump() for axis in result.detected_axes]
+        start = time.perf_counter()
+        try:
+            image = await get_analysis_executor().run(
+                render_annotated, find_upload_path(analysis_id), axes, width
+            )
+        except ExecutorBusyError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        elapsed = time.perf_counter() - start
+        STAGE_DURATION.observe(elapsed, stage="render")
+        headers["Server-Timing"] = format_server_timing({"render": elapsed})
+        cache.put(key, image)
+
+    return Response(content=image, media_type="image/jpeg", headers=headers)
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.core.security import validate_image_file, validate_file_size
+from app.core.security import validate_image_file
 from app.services.image_service import ImageService
 from app.models.schemas import UploadResponse, ErrorResponse
 
@@ -23,11 +23,8 @@ async def upload_image(
         # Validate file type
         validate_image_file(file)
 
-        # Validate file size
-        content = await validate_file_size(file)
-
-        # Save file
-        file_metadata = await image_service.save_upload(file, content)
+        # Stream to disk, enforcing the size limit and checking the content
+        file_metadata = await image_service.save_upload(file)
 
         return UploadResponse(
             message="File uploaded successfully",
@@ -29,12 +29,68 @@ class Settings(BaseSettings):
     RESULTS_DIR: str = "results"
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
     ALLOWED_EXTENSIONS: List[str] = [".jpg", ".jpeg", ".png", ".bmp"]
+    MAX_IMAGE_PIXELS: int = 64 * 1024 * 1024  # Decompression-bomb guard, checked from the header before decoding
 
     # ML Model
     MODEL_PATH: str = "models/symmetry_detector.h5"
     CONFIDENCE_THRESHOLD: float = 0.7
     IMAGE_SIZE: tuple = (224, 224)
 
+    # Symmetry detection
+    SYMMETRY_AXIS_SEARCH: str = "midline"  # "midline" or "fft" (best axis at any offset)
+    SYMMETRY_ANGLE_SWEEP: bool = False  # Also report reflection axes at arbitrary angles
+    SYMMETRY_ANGLE_STEP: float = 1.0  # Degrees
+    SYMMETRY_RADIAL_MODE: str = "rotation"  # "rotation" or "polar" (all orders from one FFT)
+    SYMMETRY_DIAGONAL_MODE: str = "warp"  # "warp" or "transpose" (exact, centred square crop)
+    SYMMETRY_PYRAMID: bool = False  # Detect on a downsampled level, refine near-threshold results
+    MAX_WORKING_PIXELS: int = 1024 * 1024  # Largest pyramid level detectors run on in pyramid mode
+    SYMMETRY_CASCADE: bool = False  # Probe diagonal/radial at low resolution, skip full runs that can't move the score
+    SYMMETRY_CASCADE_PROBE_PIXELS: int = 256 * 256  # Largest pyramid level the cascade probes
+    SYMMETRY_CASCADE_MIN_ERROR: float = 0.02  # Least assumed error of a probed confidence
+    SYMMETRY_CASCADE_TOLERANCE: float = 2.0  # Overall score points a pruned detector may be off by
+
+    # Analysis execution (runs the CV pipeline off the event loop)
+    ANALYSIS_EXECUTOR: str = "process"  # "process" or "thread"
+    ANALYSIS_WORKERS: int = 2
+    ANALYSIS_QUEUE_SIZE: int = 16  # Pending analyses beyond busy workers
+    ANALYSIS_DEADLINE_MS: int = 0  # Default latency budget of POST /analyze (X-Deadline-Ms overrides); 0 = none
+
+    # Batch analysis
+    BATCH_MAX_FILES: int = 10  # Buffered (single JSON response) batches
+    BATCH_STREAM_MAX_FILES: int = 500  # Streaming (NDJSON) batches
+    BATCH_STREAM_CONCURRENCY: int = 0  # Files analyzed at once per stream; 0 = one per analysis worker
+
+    # Job queue (?async=true analyses; consumed by `python -m app.worker`)
+    JOB_LEASE_SECONDS: int = 60  # A claimed job is requeued if its worker stops renewing for this long
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_POLL_INTERVAL: float = 0.5  # Seconds between queue polls when idle (workers and event streams)
+    JOB_EMBEDDED_WORKERS: int = 1  # Consumers inside the API process, feeding the analysis executor
+
+    # Result cache (content-addressed, shared by all worker processes)
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_PATH: str = "result_cache.db"
+    RESULT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # 64MB
+
+    # Annotated result images (rendered on request, kept in memory)
+    RENDER_CACHE_MAX_BYTES: int = 32 * 1024 * 1024  # 32MB per API process
+
+    # Per-request profiling (POST /analyze/ with an "X-Profile: 1" header)
+    PROFILING_ENABLED: bool = False
+    PROFILE_DIR: str = "profiles"
+    PROFILE_SAMPLE_INTERVAL: float = 0.001  # Seconds between stack samples
+    PROFILE_MAX_FILES: int = 100  # Oldest profiles are deleted beyond this
+
+    # Always-on statistical sampler (aggregated at /admin/hot-paths when ADMIN_ENDPOINTS_ENABLED)
+    SAMPLER_ENABLED: bool = True
+    SAMPLER_INTERVAL: float = 0.01  # Seconds between samples of every busy thread
+    SAMPLER_WINDOW_SECONDS: float = 300.0  # Rolling window hot paths are reported over
+    SAMPLER_FLUSH_SECONDS: float = 10.0  # How often each process writes its snapshot
+    SAMPLER_DIR: str = "profiles/sampler"  # Per-process snapshots, shared by all processes
+    ADMIN_ENDPOINTS_ENABLED: bool = False  # Serve /admin/* (unauthenticated; exposes code paths and file names)
+
+    # Rebuild gallery/storage statistics from disk at startup
+    STATS_RECONCILE_ON_STARTUP: bool = False
+
     # Database (optional - for future use)
     DATABASE_URL: str = "sqlite:///./symmetry_vision.db"
 
@@ -0,0 +1,233 @@
+"""
+Metrics
+Stage timers plus in-process counters, gauges and histograms rendered in
+the Prometheus text exposition format (no client library needed).
+
+Analyses run in executor worker processes, so their stage timings travel
+back on the result (``stage_timings``) and are recorded here, in the API
+process that serves /metrics. With several API processes each one exports
+its own series.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class StageTimer:
+    """Accumulates wall-clock seconds per named stage, in first-seen order"""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+
+class NullTimer(StageTimer):
+    """Timer that records nothing, for callers that don't collect timings"""
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        yield
+
+
+def format_server_timing(timings: Dict[str, float]) -> str:
+    """Server-Timing header value (durations in milliseconds)"""
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items())
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    """Base class: a named family of labelled series"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Metric):
+    """Current value, read from a callback at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], object]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def set_function(self, function: Callable[[], object]) -> None:
+        """``function`` returns a number, or a dict of label value -> number for one label"""
+        self.function = function
+
+    def samples(self) -> List[str]:
+        if self.function is None:
+            return []
+
+        try:
+            value = self.function()
+        except Exception as e:
+            print(f"⚠️  Metric {self.name} unavailable: {e}")
+            return []
+
+        if isinstance(value, dict):
+            label = self.labelnames[0]
+            return [
+                f"{self.name}{_format_labels(((label, str(key)),))} {_format_value(number)}"
+                for key, number in sorted(value.items())
+            ]
+        return [f"{self.name} {_format_value(value)}"]
+
+
+class Histogram(Metric):
+    """Cumulative bucket counts, sum and count of observations"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[Tuple, List[float]] = {}  # bucket counts..., sum
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 1))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+
+        lines = []
+        for key, series in items:
+            for bound, count in zip(self.buckets, series):
+                labels = key + (("le", _format_value(bound)),)
+                lines.append(f"{self.name}_bucket{_format_labels(labels)} {_format_value(count)}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {_format_value(series[len(self.buckets) - 1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics rendered together for /metrics"""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Global registry and the application's metrics
+registry = MetricsRegistry()
+
+HTTP_REQUESTS = registry.register(Counter(
+    "symmetry_http_requests_total", "HTTP requests by route template, method and status", ("route", "method", "status")
+))
+HTTP_DURATION = registry.register(Histogram(
+    "symmetry_http_request_duration_seconds", "Time to response headers by route template", ("route",)
+))
+ANALYSES = registry.register(Counter(
+    "symmetry_analyses_total", "Completed analyses by outcome", ("outcome",)
+))
+ANALYSIS_DURATION = registry.register(Histogram(
+    "symmetry_analysis_duration_seconds", "End-to-end analysis pipeline time (processing_time)"
+))
+STAGE_DURATION = registry.register(Histogram(
+    "symmetry_stage_duration_seconds", "Time spent per pipeline stage (decode, detectors, thumbnail, render...)",
+    ("stage",)
+))
+ANALYSIS_IN_FLIGHT = registry.register(Gauge(
+    "symmetry_analysis_in_flight", "Analyses running or waiting on the analysis executor"
+))
+ANALYSIS_QUEUE_DEPTH = registry.register(Gauge(
+    "symmetry_analysis_queue_depth", "Analyses waiting for a free executor worker"
+))
+JOBS = registry.register(Gauge(
+    "symmetry_jobs", "Queued analysis jobs by status", ("status",)
+))
+
+
+def record_stage_timings(timings: Optional[Dict[str, float]]) -> None:
+    """Feed one run's stage timings into the stage histogram"""
+    for stage, seconds in (timings or {}).items():
+        STAGE_DURATION.observe(seconds, stage=stage)
@@ -0,0 +1,358 @@
+"""
+Profiling
+Stack-sampling profilers that produce collapsed ("folded") stacks, the
+format read by speedscope, flamegraph.pl and inferno.
+
+- SamplingProfiler: one thread, for the duration of one profiled call
+  (per-request profiling, PROFILE_SAMPLE_INTERVAL).
+- ContinuousSampler: every busy thread of the process, always on, over a
+  rolling window (SAMPLER_*). Each process (API, executor workers,
+  `python -m app.worker`) runs its own and periodically writes a snapshot
+  to SAMPLER_DIR/<pid>.json; load_hot_paths() merges the fresh ones.
+
+Both read frames with sys._current_frames() from a background thread.
+Time spent in NumPy/OpenCV shows up under the Python frame that called
+into them.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from functools import lru_cache
+from types import CodeType, FrameType
+from typing import Deque, Dict, List, Optional, Tuple
+from app.core.config import settings
+
+
+PROFILE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Leaf frames of threads that are waiting rather than working (event loop, pool and queue waits)
+IDLE_FRAMES = frozenset({
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("thread.py", "_worker"),
+    ("queue.py", "get"),
+    ("queues.py", "get"),
+    ("connection.py", "_recv"),
+    ("connection.py", "_poll")
+})
+
+
+@lru_cache(maxsize=8192)
+def code_label(code: CodeType) -> str:
+    """``function (file:line)`` of a function's code object"""
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+def fold_stack(frame: Optional[FrameType]) -> str:
+    """Root-first, semicolon-separated stack of ``frame``"""
+    labels = []
+    while frame is not None:
+        labels.append(code_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def is_idle(frame: FrameType) -> bool:
+    """Whether a thread whose innermost frame is ``frame`` is blocked waiting for work"""
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+
+def format_folded(stacks: Dict[str, int]) -> str:
+    """One ``stack count`` line per distinct stack, most frequent first"""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items(), key=lambda item: -item[1]))
+
+
+class SamplingProfiler:
+    """
+    Sample one thread's stack until stopped
+
+    Usable as a context manager around the code to profile, which must run
+    on the thread that enters it.
+    """
+
+    def __init__(self, interval: Optional[float] = None, thread_id: Optional[int] = None):
+        self.interval = interval or settings.PROFILE_SAMPLE_INTERVAL
+        self.thread_id = thread_id
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started_at = 0.0
+
+    def __enter__(self) -> "SamplingProfiler":
+        self.start(threading.get_ident() if self.thread_id is None else self.thread_id)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def start(self, thread_id: int) -> None:
+        self.thread_id = thread_id
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self._started_at
+
+    def folded(self) -> str:
+        return format_folded(self.stacks)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[fold_stack(frame)] += 1
+                self.samples += 1
+            del frame
+
+
+class ContinuousSampler:
+    """
+    Sample every busy thread of this process into a rolling window
+
+    Samples are counted per folded stack in buckets of SAMPLER_FLUSH_SECONDS;
+    buckets older than SAMPLER_WINDOW_SECONDS are dropped. Each time a
+    bucket closes the window is written to SAMPLER_DIR/<pid>.json.
+    """
+
+    def __init__(self, interval: Optional[float] = None, window: Optional[float] = None,
+                 flush_seconds: Optional[float] = None, directory: Optional[str] = None):
+        self.interval = interval or settings.SAMPLER_INTERVAL
+        self.window = window or settings.SAMPLER_WINDOW_SECONDS
+        self.flush_seconds = flush_seconds or settings.SAMPLER_FLUSH_SECONDS
+        self.directory = directory or settings.SAMPLER_DIR
+        self._buckets: Deque[Tuple[float, Counter]] = deque()
+        self._current: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    @property
+    def running(self) -> bool:
+        # A forked child inherits the object but not the thread
+        return self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+
+    def start(self) -> None:
+        """Start sampling (idempotent)"""
+
+        if self.running:
+            return
+
+        self._pid = os.getpid()
+        self._stop = threading.Event()
+        self._buckets.clear()
+        self._current = Counter()
+        self._thread = threading.Thread(target=self._run, name="continuous-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and write a last snapshot"""
+
+        if not self.running:
+            return
+
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+
+    def stacks(self) -> Dict[str, int]:
+        """Folded stack -> samples over the current window"""
+
+        cutoff = time.time() - self.window
+        with self._lock:
+            merged = Counter(self._current)
+            for started, bucket in self._buckets:
+                if started >= cutoff:
+                    merged.update(bucket)
+        return dict(merged)
+
+    def flush(self) -> None:
+        """Write the window to SAMPLER_DIR/<pid>.json (atomically)"""
+
+        snapshot = {
+            "pid": os.getpid(),
+            "updated_at": time.time(),
+            "interval": self.interval,
+            "window": self.window,
+            "stacks": self.stacks()
+        }
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f"{os.getpid()}.json")
+            with open(f"{path}.tmp", "w") as f:
+                json.dump(snapshot, f)
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            print(f"⚠️  Could not write sampler snapshot: {e}")
+
+    def _run(self) -> None:
+        own_thread = threading.get_ident()
+        bucket_started = time.time()
+
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, frame in frames.items():
+                    if thread_id != own_thread and not is_idle(frame):
+                        self._current[fold_stack(frame)] += 1
+            frames = frame = None
+
+            now = time.time()
+            if now - bucket_started >= self.flush_seconds:
+                with self._lock:
+                    self._buckets.append((bucket_started, self._current))
+                    self._current = Counter()
+                    while self._buckets and self._buckets[0][0] < now - self.window:
+                        self._buckets.popleft()
+                bucket_started = now
+                self.flush()
+
+
+def load_hot_paths(limit: int = 20, directory: Optional[str] = None) -> dict:
+    """
+    Merge the fresh snapshots of every sampling process and rank functions
+
+    Snapshots not updated within the window are skipped, and deleted once
+    they are older than two windows (their process is gone).
+
+    Returns:
+        processes, samples, seconds (approximate busy thread time),
+        top ``self`` and ``cumulative`` functions, and the merged ``stacks``
+    """
+
+    directory = directory or settings.SAMPLER_DIR
+    now = time.time()
+    stacks: Counter = Counter()
+    processes = 0
+    interval = settings.SAMPLER_INTERVAL
+
+    try:
+        names = [name for name in os.listdir(directory) if name.endswith(".json")]
+    except FileNotFoundError:
+        names = []
+
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+
+        age = now - snapshot.get("updated_at", 0)
+        if age > 2 * snapshot.get("window", settings.SAMPLER_WINDOW_SECONDS):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        if age > snapshot.get("window", settings.SAMPLER_WINDOW_SECONDS):
+            continue
+
+        stacks.update(snapshot["stacks"])
+        interval = snapshot.get("interval", interval)
+        processes += 1
+
+    return dict(summarize_stacks(stacks, limit, interval), processes=processes, stacks=dict(stacks))
+
+
+def summarize_stacks(stacks: Dict[str, int], limit: int, interval: float) -> dict:
+    """Top functions by self samples (innermost frame) and cumulative samples (anywhere on the stack)"""
+
+    self_samples: Counter = Counter()
+    cumulative_samples: Counter = Counter()
+
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        self_samples[frames[-1]] += count
+        for frame in set(frames):
+            cumulative_samples[frame] += count
+
+    total = sum(stacks.values())
+
+    def top(counter: Counter) -> List[dict]:
+        return [
+            {
+                "function": function,
+                "samples": count,
+                "seconds": round(count * interval, 3),
+                "percent": round(100.0 * count / total, 2)
+            }
+            for function, count in counter.most_common(limit)
+        ]
+
+    return {
+        "samples": total,
+        "seconds": round(total * interval, 3),
+        "self": top(self_samples),
+        "cumulative": top(cumulative_samples)
+    }
+
+
+# Global instance (singleton)
+_sampler_instance = None
+
+
+def get_sampler() -> ContinuousSampler:
+    """Get or create this process's continuous sampler"""
+    global _sampler_instance
+
+    if _sampler_instance is None:
+        _sampler_instance = ContinuousSampler()
+
+    return _sampler_instance
+
+
+def start_sampler() -> None:
+    """Start the continuous sampler in this process if SAMPLER_ENABLED"""
+    if settings.SAMPLER_ENABLED:
+        get_sampler().start()
+
+
+def profile_path(profile_id: str) -> str:
+    """Where the folded stacks of ``profile_id`` are stored"""
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        raise ValueError(f"Invalid profile id: {profile_id!r}")
+    return os.path.join(settings.PROFILE_DIR, f"{profile_id}.folded")
+
+
+def save_profile(profile_id: str, folded: str) -> str:
+    """Write a profile, dropping the oldest ones beyond PROFILE_MAX_FILES"""
+
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    path = profile_path(profile_id)
+    with open(path, "w") as f:
+        f.write(folded)
+
+    prune_profiles(settings.PROFILE_MAX_FILES)
+    return path
+
+
+def prune_profiles(keep: int) -> None:
+    """Delete all but the ``keep`` most recent profiles"""
+
+    try:
+        names = [name for name in os.listdir(settings.PROFILE_DIR) if name.endswith(".folded")]
+    except FileNotFoundError:
+        return
+
+    paths = sorted((os.path.join(settings.PROFILE_DIR, name) for name in names), key=os.path.getmtime, reverse=True)
+    for path in paths[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
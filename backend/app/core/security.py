@@ -1,9 +1,15 @@
 from fastapi import HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.core.config import settings
+from typing import Optional
 import os
 
 
+# Multipart framing allowed per file on top of MAX_FILE_SIZE (boundary, part headers, filename)
+MULTIPART_OVERHEAD = 16 * 1024
+
+
 def setup_cors(app):
     """Configure CORS middleware"""
     app.add_middleware(
@@ -39,18 +45,117 @@ def validate_image_file(file: UploadFile) -> None:
         )
 
 
-async def validate_file_size(file: UploadFile) -> None:
-    """Validate file size (must be called after reading file)"""
-    # Read file content to check size
-    content = await file.read()
-    size = len(content)
+# Leading bytes of each accepted image format
+IMAGE_SIGNATURES = {
+    "jpeg": b"\xff\xd8\xff",
+    "png": b"\x89PNG\r\n\x1a\n",
+    "bmp": b"BM"
+}
+SIGNATURE_BYTES = max(len(signature) for signature in IMAGE_SIGNATURES.values())
+
+
+def sniff_image_type(header: bytes) -> Optional[str]:
+    """Image format named by the first bytes of a file, or None"""
+    for image_type, signature in IMAGE_SIGNATURES.items():
+        if header.startswith(signature):
+            return image_type
+    return None
+
+
+def validate_image_signature(header: bytes) -> str:
+    """Validate that the file content starts like an accepted image"""
+    image_type = sniff_image_type(header)
+    if image_type is None:
+        raise HTTPException(
+            status_code=400,
+            detail="File content is not a JPEG, PNG or BMP image"
+        )
+    return image_type
+
 
+def validate_file_size(size: int) -> None:
+    """Validate the number of bytes received so far"""
     if size > settings.MAX_FILE_SIZE:
         raise HTTPException(
             status_code=400,
             detail=f"File too large. Maximum size: {settings.MAX_FILE_SIZE / (1024*1024)}MB"
         )
 
-    # Reset file pointer to beginning
-    await file.seek(0)
-    return content
\ No newline at end of file
+
+def upload_body_limit(scope: dict) -> Optional[int]:
+    """Largest request body the upload routes accept (files times MAX_FILE_SIZE), None for other requests"""
+    if scope["type"] != "http" or scope["method"] != "POST":
+        return None
+
+    path = scope["path"].rstrip("/")
+    if path in (f"{settings.API_PREFIX}/upload", f"{settings.API_PREFIX}/analyze"):
+        files = 1
+    elif path == f"{settings.API_PREFIX}/analyze/batch":
+        files = max(settings.BATCH_MAX_FILES, settings.BATCH_STREAM_MAX_FILES)
+    else:
+        return None
+
+    return files * (settings.MAX_FILE_SIZE + MULTIPART_OVERHEAD)
+
+
+def validate_body_size(size: int, limit: int) -> None:
+    """Validate the request body bytes declared or received so far against ``limit``"""
+    if size > limit:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File too large. Maximum size: {settings.MAX_FILE_SIZE / (1024*1024)}MB"
+        )
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject oversized upload requests before their body is spooled
+
+    Multipart bodies are parsed (and spooled to temp files) before an
+    endpoint runs, so save_upload's per-file check comes too late to stop
+    the transfer. A declared Content-Length over upload_body_limit is
+    refused before anything is read; bodies without one are counted as
+    they arrive and cut off once over the limit.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limit = upload_body_limit(scope)
+        if limit is None:
+            return await self.app(scope, receive, send)
+
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit():
+            try:
+                validate_body_size(int(content_length), limit)
+            except HTTPException as e:
+                response = JSONResponse(status_code=e.status_code, content={"detail": e.detail})
+                return await response(scope, receive, send)
+
+        received = 0
+
+        async def receive_limited():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                validate_body_size(received, limit)
+            return message
+
+        await self.app(scope, receive_limited, send)
+
+
+def setup_upload_limits(app):
+    """Enforce upload size limits while the request body arrives (call before setup_cors so rejections get CORS headers)"""
+    app.add_middleware(UploadSizeLimitMiddleware)
+
+
+def validate_image_dimensions(width: int, height: int) -> None:
+    """Validate decoded pixel count (read from the header, before decoding)"""
+    if width * height > settings.MAX_IMAGE_PIXELS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Image too large: {width}x{height} pixels. Maximum: {settings.MAX_IMAGE_PIXELS} pixels"
+        )
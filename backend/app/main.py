@@ -1,11 +1,19 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.routing import Mount
 from app.core.config import settings
-from app.core.security import setup_cors
-from app.api.routes import upload, analysis, gallery
+from app.core import metrics
+from app.core.profiling import get_sampler, start_sampler
+from app.core.security import setup_cors, setup_upload_limits
+from app.api.routes import upload, analysis, gallery, jobs, profiles, results, admin
+from app.services.executor import get_analysis_executor
+from app.services.analysis_store import AnalysisStore
+from app.services.job_queue import get_job_queue
+from app.services.stats_service import get_stats_service
 import os
+import time
 from pathlib import Path
 
 # Create FastAPI app
@@ -17,9 +25,55 @@ app = FastAPI(
     redoc_url="/api/redoc"
 )
 
+# Reject oversized uploads while they arrive; CORS is added after so it also wraps those responses
+setup_upload_limits(app)
+
 # Setup CORS
 setup_cors(app)
 
+
+def route_template(scope: dict) -> str:
+    """Path template of the matched route, e.g. /api/v1/analyze/{file_id}"""
+
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        # Mounted apps (static files) only leave their mount point behind
+        return (scope.get("root_path") or "unmatched") if "endpoint" in scope else "unmatched"
+    if isinstance(route, Mount) or ":path}" in template:
+        return template
+
+    # Routes of included routers may report their path without the router prefix;
+    # the prefix is whatever the request path has beyond the template's segments
+    segments = scope["path"].split("/")
+    return "/".join(segments[:len(segments) - template.count("/")]) + template
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count requests and time them to response headers, labelled by route template"""
+
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Route templates (not raw paths) keep label cardinality bounded
+        route_label = route_template(request.scope)
+        metrics.HTTP_REQUESTS.inc(route=route_label, method=request.method, status=str(status))
+        metrics.HTTP_DURATION.observe(time.perf_counter() - start, route=route_label)
+
+
+# Gauges are read at scrape time
+metrics.ANALYSIS_IN_FLIGHT.set_function(lambda: get_analysis_executor().in_flight)
+metrics.ANALYSIS_QUEUE_DEPTH.set_function(lambda: get_analysis_executor().queue_depth)
+metrics.JOBS.set_function(lambda: get_job_queue().get_stats())
+
+# Annotated result images are rendered on request; registered before the /results mount so they take precedence
+app.include_router(results.router)
+
 # Mount static file directories for uploads/results
 app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
 app.mount("/results", StaticFiles(directory=settings.RESULTS_DIR), name="results")
@@ -28,6 +82,9 @@ app.mount("/results", StaticFiles(directory=settings.RESULTS_DIR), name="results
 app.include_router(upload.router, prefix=settings.API_PREFIX)
 app.include_router(analysis.router, prefix=settings.API_PREFIX)
 app.include_router(gallery.router, prefix=settings.API_PREFIX)
+app.include_router(jobs.router, prefix=settings.API_PREFIX)
+app.include_router(profiles.router, prefix=settings.API_PREFIX)
+app.include_router(admin.router, prefix=settings.API_PREFIX)
 
 # API-specific routes
 @app.get("/api")
@@ -41,7 +98,8 @@ async def api_root():
         "endpoints": {
             "upload": f"{settings.API_PREFIX}/upload",
             "analyze": f"{settings.API_PREFIX}/analyze",
-            "gallery": f"{settings.API_PREFIX}/gallery"
+            "gallery": f"{settings.API_PREFIX}/gallery",
+            "jobs": f"{settings.API_PREFIX}/jobs"
         }
     }
 
@@ -51,9 +109,16 @@ async def health_check():
     return {
         "status": "healthy",
         "service": settings.APP_NAME,
-        "version": settings.APP_VERSION
+        "version": settings.APP_VERSION,
+        "executor": get_analysis_executor().get_status(),
+        "jobs": get_job_queue().get_stats()
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus text-format metrics for this process"""
+    return Response(content=metrics.registry.render(), media_type=metrics.registry.CONTENT_TYPE)
+
 # Serve Next.js frontend
 FRONTEND_BUILD_DIR = Path(__file__).parent.parent.parent / "frontend" / "out"
 
@@ -110,6 +175,26 @@ async def startup_event():
     print(f"🤖 Model path: {settings.MODEL_PATH}")
     print(f"🌐 Frontend directory: {FRONTEND_BUILD_DIR}")
     print(f"🌐 Frontend exists: {FRONTEND_BUILD_DIR.exists()}")
+
+    AnalysisStore.ensure_schema()
+    print(f"🗄️  Database: {settings.DATABASE_URL}")
+
+    if settings.STATS_RECONCILE_ON_STARTUP:
+        totals = get_stats_service().reconcile()
+        print(f"📊 Statistics rebuilt: {totals['analyses']} analyses")
+    else:
+        get_stats_service().ensure_initialized()
+
+    executor = get_analysis_executor()
+    executor.start()
+    print(f"⚙️  Analysis executor: {executor.kind} pool, {executor.max_workers} workers, queue {executor.queue_size}")
+
+    get_job_queue().start_consumers()
+    print(f"📬 Job queue: {settings.JOB_EMBEDDED_WORKERS} embedded consumers")
+
+    start_sampler()
+    if settings.SAMPLER_ENABLED:
+        print(f"🔬 Sampler: every {settings.SAMPLER_INTERVAL * 1000:.0f} ms, snapshots in {settings.SAMPLER_DIR}")
     print(f"✅ Application started successfully!")
 
 
@@ -117,6 +202,9 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown"""
     print(f"👋 {settings.APP_NAME} shutting down...")
+    await get_job_queue().stop_consumers()
+    get_analysis_executor().shutdown(wait=True)
+    get_sampler().stop()
 
 
 if __name__ == "__main__":
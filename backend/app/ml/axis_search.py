@@ -0,0 +1,298 @@
+"""
+Mirror axis search
+Finds the best reflection axis position over every offset in one pass.
+
+Reflecting a row f about position c pairs f(x) with f(2c - x), so the
+correlation for every candidate axis is the autoconvolution (f * f)(s)
+with s = 2c. Summed over rows it is one rFFT per row, a squared spectrum
+and a single inverse FFT: O(H * W log W) instead of O(H * W^2).
+
+The same trick finds axis *angles*: a reflection about direction theta
+reflects the Fourier magnitude spectrum about theta too, so in polar
+coordinates it pairs angle phi with 2 * theta - phi, and one FFT along the
+angular axis scores every theta at once.
+
+Diagonal axes of a square need no search or resampling at all: the
+reflection is a transpose.
+"""
+
+import cv2
+import numpy as np
+from typing import List, Tuple
+from app.ml.ncc import ncc
+
+
+ROW_BLOCK = 256  # Rows transformed at a time, bounds the complex temporaries
+
+
+def mirror_correlation_profile(gray: np.ndarray, min_overlap: float = 0.5) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Normalized correlation of each row with its mirror image, for every axis offset
+
+    Axes are searched along the last dimension (columns); pass ``gray.T``
+    for horizontal axes.
+
+    Args:
+        gray: 2-D grayscale image
+        min_overlap: Minimum fraction of the width that must overlap its mirror
+
+    Returns:
+        (ncc, valid) arrays indexed by shift s = 2c, 0 <= s <= 2W - 2, where c
+        is the axis position in pixel-centre coordinates. ``ncc`` is in [-1, 1]
+        and ``valid`` marks shifts with enough overlap.
+    """
+
+    h, w = gray.shape
+    n_shifts = 2 * w - 1
+    n_fft = _fft_size(n_shifts)
+    mean = float(np.mean(gray, dtype=np.float64))
+
+    spectrum = np.zeros(n_fft // 2 + 1, dtype=np.complex128)
+    column_energy = np.zeros(w, dtype=np.float64)
+
+    for start in range(0, h, ROW_BLOCK):
+        block = np.asarray(gray[start:start + ROW_BLOCK], dtype=np.float32) - np.float32(mean)
+        transformed = np.fft.rfft(block, n=n_fft, axis=1)
+        spectrum += np.sum(transformed * transformed, axis=0)
+        column_energy += np.einsum("ij,ij->j", block, block, dtype=np.float64)
+
+    correlation = np.fft.irfft(spectrum, n=n_fft)[:n_shifts]
+
+    # Pairs x <-> s - x stay inside the image for x in [max(0, s - w + 1), min(w - 1, s)]
+    shifts = np.arange(n_shifts)
+    lo = np.maximum(0, shifts - w + 1)
+    hi = np.minimum(w - 1, shifts)
+    cumulative = np.concatenate(([0.0], np.cumsum(column_energy)))
+    energy = cumulative[hi + 1] - cumulative[lo]
+
+    overlap = hi - lo + 1
+    valid = (overlap >= max(2, int(np.ceil(min_overlap * w)))) & (energy > 1e-6)
+
+    ncc = np.zeros(n_shifts, dtype=np.float64)
+    ncc[valid] = np.clip(correlation[valid] / energy[valid], -1.0, 1.0)
+
+    return ncc, valid
+
+
+def find_mirror_axes(gray: np.ndarray, top_k: int = 3, min_overlap: float = 0.5,
+                     suppression_radius: float = 0.02) -> List[Tuple[float, float]]:
+    """
+    Best reflection axes along the column direction
+
+    Args:
+        gray: 2-D grayscale image
+        top_k: Number of candidates to return
+        min_overlap: Minimum overlapping fraction of the width
+        suppression_radius: Non-max suppression radius as a fraction of the width
+
+    Returns:
+        List of (position, ncc) sorted by ncc, where position is the axis
+        x coordinate in pixel-edge coordinates (the midline of an even-width
+        image is ``w / 2``) refined to sub-pixel precision.
+    """
+
+    w = gray.shape[1]
+    ncc, valid = mirror_correlation_profile(gray, min_overlap)
+
+    scores = np.where(valid, ncc, -np.inf)
+    padded = np.concatenate(([-np.inf], scores, [-np.inf]))
+    is_peak = valid & (scores >= padded[:-2]) & (scores >= padded[2:])
+    peaks = np.flatnonzero(is_peak)
+    peaks = peaks[np.argsort(scores[peaks])[::-1]]
+
+    radius = max(2.0, suppression_radius * 2 * w)  # In shift units (two per pixel)
+    selected: List[int] = []
+    for peak in peaks:
+        if all(abs(int(peak) - other) > radius for other in selected):
+            selected.append(int(peak))
+        if len(selected) >= top_k:
+            break
+
+    candidates = []
+    for peak in selected:
+        offset = _parabolic_offset(scores, peak)
+        position = (peak + offset) / 2.0 + 0.5
+        candidates.append((float(position), float(ncc[peak])))
+
+    return candidates
+
+
+def reflection_angle_profile(gray: np.ndarray, angle_step: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Spectral reflection score for every axis angle in [0, 90)
+
+    The magnitude spectrum of a real image is point symmetric, so an axis
+    at theta and one at theta + 90 give the same score; callers must
+    disambiguate spatially.
+
+    Args:
+        gray: 2-D grayscale image (a few hundred pixels per side is plenty)
+        angle_step: Angular sampling of the spectrum in degrees; scores are
+            returned at half this step
+
+    Returns:
+        (angles, ncc) where angles are in degrees (y-down convention: 0 is
+        horizontal, 90 vertical) and ncc is in [-1, 1]
+    """
+
+    h, w = gray.shape
+    size = min(h, w)
+    y0, x0 = (h - size) // 2, (w - size) // 2
+    square = np.asarray(gray[y0:y0 + size, x0:x0 + size], dtype=np.float32)
+
+    # Window the square so its borders don't add a horizontal/vertical cross to the spectrum
+    window = np.hanning(size).astype(np.float32)
+    square = (square - square.mean()) * window[:, None] * window[None, :]
+    magnitude = np.log1p(np.abs(np.fft.fftshift(np.fft.fft2(square)))).astype(np.float32)
+
+    n_angles = max(8, int(round(360.0 / angle_step)))
+    n_radii = size // 2
+    centre = (size / 2.0, size / 2.0)
+    polar = cv2.warpPolar(
+        magnitude, (n_radii, n_angles), centre, size / 2.0,
+        cv2.INTER_LINEAR + cv2.WARP_POLAR_LINEAR
+    )
+
+    # Skip the DC neighbourhood and the corners beyond the inscribed circle
+    band = polar[:, max(1, int(0.05 * n_radii)):int(0.95 * n_radii)].astype(np.float64)
+    band -= band.mean(axis=0, keepdims=True)
+
+    transformed = np.fft.rfft(band, axis=0)
+    correlation = np.fft.irfft(np.sum(transformed * transformed, axis=1), n=n_angles)
+    energy = float(np.sum(band * band))
+
+    ncc = correlation / energy if energy > 1e-9 else np.zeros(n_angles)
+
+    # Shift s pairs phi with s * step - phi, i.e. theta = s * step / 2; keep [0, 90)
+    half = n_angles // 2
+    angles = np.arange(half) * (360.0 / n_angles) / 2.0
+    return angles, np.clip(ncc[:half], -1.0, 1.0)
+
+
+def find_reflection_angles(gray: np.ndarray, angle_step: float = 1.0, top_k: int = 3,
+                           suppression_degrees: float = 5.0) -> List[Tuple[float, float]]:
+    """
+    Strongest spectral reflection angles in [0, 90) (each also stands for angle + 90)
+
+    Returns:
+        List of (angle_degrees, spectral_ncc) sorted by score, sub-sample refined
+    """
+
+    angles, scores = reflection_angle_profile(gray, angle_step)
+    n = len(scores)
+    step = angles[1] - angles[0] if n > 1 else 1.0
+
+    # Peaks on the circular profile (period 90 degrees)
+    is_peak = (scores >= np.roll(scores, 1)) & (scores >= np.roll(scores, -1))
+    peaks = np.flatnonzero(is_peak)
+    peaks = peaks[np.argsort(scores[peaks])[::-1]]
+
+    selected: List[int] = []
+    for peak in peaks:
+        distance_ok = all(
+            min(abs(int(peak) - other), n - abs(int(peak) - other)) * step > suppression_degrees
+            for other in selected
+        )
+        if distance_ok:
+            selected.append(int(peak))
+        if len(selected) >= top_k:
+            break
+
+    candidates = []
+    for peak in selected:
+        left, centre, right = scores[(peak - 1) % n], scores[peak], scores[(peak + 1) % n]
+        denominator = left - 2 * centre + right
+        offset = float(np.clip(0.5 * (left - right) / denominator, -0.5, 0.5)) if denominator < 0 else 0.0
+        candidates.append((float(((peak + offset) * step) % 90.0), float(centre)))
+
+    return candidates
+
+
+def reflection_score(gray: np.ndarray, angle: float) -> float:
+    """
+    Spatial NCC between an image and its reflection about the line through
+    its centre at ``angle`` degrees, restricted to the inscribed disc
+    """
+
+    h, w = gray.shape
+    cx, cy = (w - 1) / 2.0, (h - 1) / 2.0
+    theta = np.deg2rad(angle)
+    c2, s2 = np.cos(2 * theta), np.sin(2 * theta)
+
+    # Reflection about direction (cos theta, sin theta) through the centre (an involution)
+    matrix = np.array([
+        [c2, s2, cx - c2 * cx - s2 * cy],
+        [s2, -c2, cy - s2 * cx + c2 * cy]
+    ], dtype=np.float64)
+    reflected = cv2.warpAffine(gray, matrix, (w, h), flags=cv2.INTER_LINEAR)
+
+    yy, xx = np.ogrid[:h, :w]
+    radius = min(h, w) / 2.0 - 1
+    mask = (xx - cx) ** 2 + (yy - cy) ** 2 <= radius ** 2
+
+    return ncc(gray[mask], reflected[mask])
+
+
+def diagonal_mirror_ncc(square: np.ndarray, anti_diagonal: bool = False) -> float:
+    """
+    NCC between a square image and its reflection about the main (or anti-)
+    diagonal, without interpolation
+
+    The reflection is a transposed view (plus a double flip for the
+    anti-diagonal), so nothing is warped or copied. Pixels on the axis map
+    to themselves and are excluded through sum identities: the off-axis
+    pixels and their mirrors are the same set, so both sides share one
+    mean and variance.
+    """
+
+    size = square.shape[0]
+    if size < 2 or square.shape[1] != size:
+        return 0.0
+
+    partner = square[::-1, ::-1] if anti_diagonal else square
+    axis = np.fliplr(square).diagonal() if anti_diagonal else square.diagonal()
+    axis = axis.astype(np.float64)
+
+    count = size * size - size
+    total = float(np.sum(square, dtype=np.float64)) - float(np.sum(axis))
+    squares = float(np.einsum("ij,ij->", square, square, dtype=np.float64)) - float(np.dot(axis, axis))
+    cross = float(np.einsum("ij,ji->", square, partner, dtype=np.float64)) - float(np.dot(axis, axis))
+
+    mean = total / count
+    variance = squares / count - mean * mean
+    if variance <= 1e-9:
+        return 0.0
+
+    return float(np.clip((cross / count - mean * mean) / variance, -1.0, 1.0))
+
+
+def _parabolic_offset(scores: np.ndarray, index: int) -> float:
+    """Sub-sample peak offset from a parabola through the peak and its neighbours"""
+    if index <= 0 or index >= len(scores) - 1:
+        return 0.0
+
+    left, centre, right = scores[index - 1], scores[index], scores[index + 1]
+    if not (np.isfinite(left) and np.isfinite(right)):
+        return 0.0
+
+    denominator = left - 2 * centre + right
+    if denominator >= 0:
+        return 0.0
+
+    return float(np.clip(0.5 * (left - right) / denominator, -0.5, 0.5))
+
+
+def _fft_size(n: int) -> int:
+    """Smallest 2^a * 3^b * 5^c >= n (fast sizes for pocketfft)"""
+    best = 1 << (n - 1).bit_length()
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            size = p35
+            while size < n:
+                size *= 2
+            best = min(best, size)
+            p35 *= 3
+        p5 *= 5
+    return best
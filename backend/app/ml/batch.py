@@ -0,0 +1,138 @@
+"""
+Batch kernels
+Vectorized versions of the detector reductions for a stack of equally
+sized grayscale images (N x H x W).
+
+Sums are taken over images in chunks of about CHUNK_PIXELS pixels, so the
+float32 temporaries stay bounded however many frames are stacked. OpenCV
+resamples each plane straight into the output stack: packing frames as
+channels of one warp costs more in interleaving than it saves, and above
+four channels OpenCV rounds differently from the single-image detectors.
+"""
+
+import cv2
+import numpy as np
+from typing import Iterator, Tuple
+
+
+CHUNK_PIXELS = 1 << 20  # Pixels converted to float32 at a time (4MB, stays in cache)
+
+
+def image_chunks(stack: np.ndarray) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield (start, chunk) slices of ``stack`` holding about CHUNK_PIXELS pixels each"""
+    per_image = max(1, int(np.prod(stack.shape[1:])))
+    step = max(1, CHUNK_PIXELS // per_image)
+    for start in range(0, stack.shape[0], step):
+        yield start, stack[start:start + step]
+
+
+def batch_ncc(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Per-image Pearson correlation of two N x ... stacks (0.0 where either image is constant)"""
+
+    n = a.shape[0]
+    scores = np.zeros(n, dtype=np.float64)
+    count = int(np.prod(a.shape[1:]))
+    if count == 0:
+        return scores
+
+    for start, chunk_a in image_chunks(a):
+        chunk_a = np.asarray(chunk_a, dtype=np.float32).reshape(chunk_a.shape[0], -1)
+        chunk_b = np.asarray(b[start:start + chunk_a.shape[0]], dtype=np.float32).reshape(chunk_a.shape[0], -1)
+
+        sum_a = chunk_a.sum(axis=1, dtype=np.float64)
+        sum_b = chunk_b.sum(axis=1, dtype=np.float64)
+        sum_aa = np.einsum("ni,ni->n", chunk_a, chunk_a, dtype=np.float64)
+        sum_bb = np.einsum("ni,ni->n", chunk_b, chunk_b, dtype=np.float64)
+        sum_ab = np.einsum("ni,ni->n", chunk_a, chunk_b, dtype=np.float64)
+
+        mean_a, mean_b = sum_a / count, sum_b / count
+        covariance = sum_ab / count - mean_a * mean_b
+        variance = (sum_aa / count - mean_a ** 2) * (sum_bb / count - mean_b ** 2)
+        valid = (sum_aa / count - mean_a ** 2 > 1e-12) & (sum_bb / count - mean_b ** 2 > 1e-12)
+
+        chunk_scores = np.zeros(chunk_a.shape[0], dtype=np.float64)
+        chunk_scores[valid] = np.clip(covariance[valid] / np.sqrt(variance[valid]), -1.0, 1.0)
+        scores[start:start + chunk_a.shape[0]] = chunk_scores
+
+    return scores
+
+
+def batch_mirror_ncc(stack: np.ndarray, axis: int = 2) -> np.ndarray:
+    """Per-image NCC of the first half along ``axis`` (1: rows, 2: columns) with the mirrored second half"""
+
+    half = stack.shape[axis] // 2
+    if half == 0:
+        return np.zeros(stack.shape[0], dtype=np.float64)
+
+    if axis == 2:
+        first, second = stack[:, :, :half], stack[:, :, half:2 * half][:, :, ::-1]
+    else:
+        first, second = stack[:, :half], stack[:, half:2 * half][:, ::-1]
+
+    return batch_ncc(first, second)
+
+
+def batch_diagonal_mirror_ncc(squares: np.ndarray, anti_diagonal: bool = False) -> np.ndarray:
+    """Stacked version of axis_search.diagonal_mirror_ncc (N x S x S, diagonal pixels excluded)"""
+
+    n, size = squares.shape[0], squares.shape[1]
+    if size < 2:
+        return np.zeros(n, dtype=np.float64)
+
+    count = size * size - size
+    scores = np.zeros(n, dtype=np.float64)
+
+    for start, chunk in image_chunks(squares):
+        partner = chunk[:, ::-1, ::-1] if anti_diagonal else chunk
+        flipped = chunk[:, :, ::-1] if anti_diagonal else chunk
+        axis = np.diagonal(flipped, axis1=1, axis2=2).astype(np.float64)
+        axis_squares = np.einsum("ni,ni->n", axis, axis)
+
+        total = chunk.reshape(chunk.shape[0], -1).sum(axis=1, dtype=np.float64) - axis.sum(axis=1)
+        squared = np.einsum("nij,nij->n", chunk, chunk, dtype=np.float64) - axis_squares
+        cross = np.einsum("nij,nji->n", chunk, partner, dtype=np.float64) - axis_squares
+
+        mean = total / count
+        variance = squared / count - mean * mean
+        valid = variance > 1e-9
+
+        chunk_scores = np.zeros(chunk.shape[0], dtype=np.float64)
+        chunk_scores[valid] = np.clip((cross[valid] / count - mean[valid] ** 2) / variance[valid], -1.0, 1.0)
+        scores[start:start + chunk.shape[0]] = chunk_scores
+
+    return scores
+
+
+def batch_resize(stack: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+    """cv2.resize every image of an N x H x W stack to ``size`` (width, height)"""
+    out = np.empty((stack.shape[0], size[1], size[0]), dtype=stack.dtype)
+    for i, image in enumerate(stack):
+        cv2.resize(image, size, dst=out[i])
+    return out
+
+
+def batch_warp_affine(stack: np.ndarray, matrix: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+    """cv2.warpAffine every image of an N x H x W stack with the same matrix"""
+    out = np.empty((stack.shape[0], size[1], size[0]), dtype=stack.dtype)
+    for i, image in enumerate(stack):
+        cv2.warpAffine(image, matrix, size, dst=out[i])
+    return out
+
+
+def batch_mean_absdiff(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Per-image mean of |a - b| for two uint8 N x H x W stacks"""
+
+    n = a.shape[0]
+    means = np.zeros(n, dtype=np.float64)
+    count = int(np.prod(a.shape[1:]))
+
+    for start, chunk in image_chunks(a):
+        rows = chunk.shape[0]
+        # One cv2.absdiff over the chunk viewed as a single tall image
+        diff = cv2.absdiff(
+            np.ascontiguousarray(chunk).reshape(rows * a.shape[1], -1),
+            np.ascontiguousarray(b[start:start + rows]).reshape(rows * a.shape[1], -1)
+        )
+        means[start:start + rows] = diff.reshape(rows, -1).sum(axis=1, dtype=np.int64) / count
+
+    return means
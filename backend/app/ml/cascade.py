@@ -0,0 +1,171 @@
+"""
+Detection cascade
+Decides from cheap low-resolution probes whether the expensive scored
+detectors (diagonal, then radial: cost order) can still change
+calculate_overall_score, and prunes the ones that cannot.
+
+Each expensive detector is probed on the two pyramid levels just under
+SYMMETRY_CASCADE_PROBE_PIXELS. Confidences converge as resolution grows,
+so the gap between the two probes bounds how far the finer one is from
+the full-resolution value (never less than SYMMETRY_CASCADE_MIN_ERROR).
+The overall score is evaluated over every confidence within those
+bounds, on either side of its threshold; while it can differ from the
+probe estimate by more than SYMMETRY_CASCADE_TOLERANCE points the next
+detector in cost order gets a full run, and the rest are judged again
+with its full-run confidences. Pruned detectors report their finer
+probe's result.
+"""
+
+import itertools
+from typing import Dict, List, Optional, Sequence, Tuple
+from app.core.config import settings
+from app.ml.context import AnalysisContext
+from app.ml.detector import SymmetryDetector
+
+
+# Scored detectors the cascade can prune, in cost order (vertical and horizontal always run)
+CASCADE_STAGES = ("diagonal", "radial")
+
+
+class DetectionCascade:
+    """Probe results of the expensive detectors and the plan of which ones to prune"""
+
+    def __init__(self, context: AnalysisContext, stages: Sequence[str], min_level: int = 0,
+                 probe_pixels: Optional[int] = None, min_error: Optional[float] = None,
+                 tolerance: Optional[float] = None):
+        """
+        Args:
+            context: Image the full detectors would run on
+            stages: Selected detector types; only CASCADE_STAGES among them are probed
+            min_level: Pyramid level the full detectors run on; nothing is
+                probed unless the probe level is coarser
+        """
+
+        self.min_error = settings.SYMMETRY_CASCADE_MIN_ERROR if min_error is None else min_error
+        self.tolerance = settings.SYMMETRY_CASCADE_TOLERANCE if tolerance is None else tolerance
+        self.level = context.working_level(probe_pixels or settings.SYMMETRY_CASCADE_PROBE_PIXELS)
+        self.stages = [stage for stage in CASCADE_STAGES if stage in stages] if self.level > min_level else []
+        self.pruned: List[str] = []
+
+        parameters = SymmetryDetector.get_parameters()
+        radial_detector = "detect_radial_order" if settings.SYMMETRY_RADIAL_MODE == "polar" else "detect_radial_symmetry"
+        self.thresholds = {
+            "diagonal": parameters["detect_diagonal_symmetry"]["threshold"],
+            "radial": parameters[radial_detector]["threshold"]
+        }
+
+        # Per stage: the finer probe's raw result and (confidence, error bound) of each scored confidence
+        self.probes: Dict[str, tuple] = {}
+        self.bounds: Dict[str, List[Tuple[float, float]]] = {}
+
+        for stage in self.stages:
+            fine = self._probe(stage, context.at_level(self.level))
+            coarse = self._probe(stage, context.at_level(self.level + 1))
+            self.probes[stage] = fine
+            self.bounds[stage] = [
+                (conf, max(self.min_error, abs(conf - coarse_conf)))
+                for conf, coarse_conf in zip(self._confidences(stage, fine), self._confidences(stage, coarse))
+            ]
+
+    def plan(self, vertical_conf: float, horizontal_conf: float, extra_confs: Sequence[float] = (),
+             exact: Optional[Dict[str, List[float]]] = None) -> List[str]:
+        """
+        Choose which probed stages to prune, given the exact vertical and
+        horizontal score inputs (0.0 when not detected), any extra axes
+        that weigh like diagonals (reflection sweep) and, in ``exact``, the
+        scored confidences of probed stages that already had their full run
+        (an empty list when not detected or not run)
+
+        Either all remaining stages are pruned or none is. In the latter
+        case the next one in cost order needs its full run; plan again
+        with its confidences in ``exact`` to decide the rest.
+
+        Returns:
+            Pruned stages
+        """
+
+        exact = exact or {}
+        remaining = [stage for stage in self.stages if stage not in exact]
+        prunable = remaining and self.score_error(
+            vertical_conf, horizontal_conf, remaining, extra_confs, exact
+        ) <= self.tolerance
+
+        self.pruned = remaining if prunable else []
+        return self.pruned
+
+    def score_error(self, vertical_conf: float, horizontal_conf: float, uncertain: Sequence[str],
+                    extra_confs: Sequence[float] = (), exact: Optional[Dict[str, List[float]]] = None) -> float:
+        """
+        Largest change of the overall score from its probe estimate when
+        ``uncertain`` stages take any value within their bounds (the other
+        probed stages count as exact, at their ``exact`` full-run
+        confidences if given)
+        """
+
+        exact = exact or {}
+        probed = [stage for stage in self.stages if stage not in exact]
+
+        def score(values: Dict[str, List[float]]) -> float:
+            values = dict(exact, **values)
+            return SymmetryDetector.calculate_overall_score(
+                vertical_conf, horizontal_conf, sum(values.get("radial", [])),
+                values.get("diagonal", []) + list(extra_confs)
+            )
+
+        def passing(stage: str, conf: float) -> float:
+            # Below its threshold a detector adds nothing to the score
+            return conf if conf >= self.thresholds[stage] else 0.0
+
+        estimate = score({
+            stage: [passing(stage, conf) for conf, _ in self.bounds[stage]] for stage in probed
+        })
+
+        slots = []
+        for stage in probed:
+            threshold = self.thresholds[stage]
+            for conf, error in self.bounds[stage]:
+                low, high = (conf - error, conf + error) if stage in uncertain else (conf, conf)
+                values = {low, high}
+                if low < threshold <= high:
+                    values.add(threshold)
+                slots.append((stage, sorted({passing(stage, value) for value in values})))
+
+        error = 0.0
+        for combination in itertools.product(*(values for _, values in slots)):
+            values: Dict[str, List[float]] = {}
+            for (stage, _), value in zip(slots, combination):
+                values.setdefault(stage, []).append(value)
+            error = max(error, abs(score(values) - estimate))
+
+        return error
+
+    def diagonal(self) -> List[Tuple[bool, float, dict, str]]:
+        """Probe result in detect_diagonal_symmetry's format, coordinates at level 0"""
+        threshold = self.thresholds["diagonal"]
+        return [
+            (bool(conf >= threshold), float(conf), self._scale(coords), diag_type)
+            for _, conf, coords, diag_type in self.probes["diagonal"]
+        ]
+
+    def radial(self) -> Tuple[bool, float, Optional[int]]:
+        """Probe result as (detected, confidence, order); order is None in rotation mode"""
+        probe = self.probes["radial"]
+        order = probe[2] if len(probe) > 2 else None
+        return bool(probe[1] >= self.thresholds["radial"]), float(probe[1]), order
+
+    def _scale(self, coords: dict) -> dict:
+        return {key: float(value) * 2.0 ** self.level for key, value in coords.items()}
+
+    @staticmethod
+    def _probe(stage: str, context: AnalysisContext) -> tuple:
+        if stage == "diagonal":
+            return tuple(SymmetryDetector.detect_diagonal_symmetry(context, threshold=0.0))
+        if settings.SYMMETRY_RADIAL_MODE == "polar":
+            return SymmetryDetector.detect_radial_order(context)
+        return SymmetryDetector.detect_radial_symmetry(context)
+
+    @staticmethod
+    def _confidences(stage: str, result: tuple) -> List[float]:
+        if stage == "diagonal":
+            return [float(r[1]) for r in result]
+        return [float(result[1])]
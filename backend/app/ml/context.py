@@ -0,0 +1,119 @@
+"""
+Shared per-image analysis context
+Decoded once per request and handed to every detector so intermediate
+representations (grayscale, edges, resampled squares, pyramid levels)
+are computed at most once.
+"""
+
+import cv2
+import numpy as np
+from functools import cached_property
+from typing import Dict, Optional, Union
+from app.ml.preprocessor import ImagePreprocessor
+
+
+class AnalysisContext:
+    """Lazily computed, memoized views of a single decoded image"""
+
+    def __init__(self, image: np.ndarray, bgr: bool = False):
+        self.image = image
+        self.bgr = bgr  # Channel order of a colour ``image`` (detectors otherwise assume RGB)
+        self._pyramid: Dict[int, np.ndarray] = {}
+        self._levels: Dict[int, "AnalysisContext"] = {}
+        self._parent: Optional["AnalysisContext"] = None
+        self._offset = 0
+
+    @classmethod
+    def ensure(cls, image: Union[np.ndarray, "AnalysisContext"]) -> "AnalysisContext":
+        """Wrap a raw image in a context (no-op if it already is one)"""
+        if isinstance(image, AnalysisContext):
+            return image
+        return cls(image)
+
+    @property
+    def shape(self) -> tuple:
+        """Shape of the original image"""
+        return self.image.shape
+
+    @cached_property
+    def gray(self) -> np.ndarray:
+        """uint8 grayscale plane"""
+        if self.bgr and self.image.ndim == 3:
+            return cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        return ImagePreprocessor.convert_to_grayscale(self.image)
+
+    @cached_property
+    def gray_f32(self) -> np.ndarray:
+        """float32 copy of the grayscale plane"""
+        return self.gray.astype(np.float32)
+
+    @cached_property
+    def edges(self) -> np.ndarray:
+        """Canny edge map of the grayscale plane"""
+        return ImagePreprocessor.detect_edges(self.gray)
+
+    @cached_property
+    def square(self) -> np.ndarray:
+        """Grayscale plane resampled to a min(h, w) square"""
+        h, w = self.gray.shape
+        size = min(h, w)
+        if h == w:
+            return self.gray
+        return cv2.resize(self.gray, (size, size))
+
+    @property
+    def square_crop(self) -> np.ndarray:
+        """Centred min(h, w) square of the grayscale plane (a view, no resampling)"""
+        h, w = self.gray.shape
+        size = min(h, w)
+        y0, x0 = (h - size) // 2, (w - size) // 2
+        return self.gray[y0:y0 + size, x0:x0 + size]
+
+    def pyramid(self, level: int) -> np.ndarray:
+        """
+        Grayscale plane halved ``level`` times by 2x2 averaging
+
+        Unlike cv2.pyrDown (which keeps every even pixel) this is centred:
+        level pixel i covers original pixels 2^level * i onwards, so mirror
+        and rotation symmetry about the image centre survive downsampling.
+        An odd last row/column is dropped.
+        """
+        if level < 0:
+            raise ValueError("Pyramid level must be non-negative")
+
+        if level == 0:
+            return self.gray
+
+        if self._parent is not None:
+            return self._parent.pyramid(level + self._offset)
+
+        if level not in self._pyramid:
+            finer = self.pyramid(level - 1)
+            h, w = finer.shape
+            even = finer[:h - h % 2, :w - w % 2]
+            self._pyramid[level] = cv2.resize(even, (even.shape[1] // 2, even.shape[0] // 2),
+                                              interpolation=cv2.INTER_AREA)
+
+        return self._pyramid[level]
+
+    def at_level(self, level: int) -> "AnalysisContext":
+        """Context for pyramid level ``level``; its own pyramid continues this one's"""
+        if level == 0:
+            return self
+
+        if level not in self._levels:
+            child = AnalysisContext(self.pyramid(level))
+            child._parent, child._offset = self, level
+            self._levels[level] = child
+
+        return self._levels[level]
+
+    def working_level(self, max_pixels: int) -> int:
+        """Finest pyramid level with at most ``max_pixels`` pixels"""
+        h, w = self.gray.shape[:2]
+        level = 0
+        while h * w > max_pixels and min(h, w) > 1:
+            h, w = h // 2, w // 2
+            level += 1
+        return level
+
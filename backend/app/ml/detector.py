@@ -1,92 +1,174 @@
 import cv2
+import hashlib
+import inspect
+import json
 import numpy as np
-from typing import List, Tuple
-from app.ml.preprocessor import ImagePreprocessor
+from typing import Dict, List, Optional, Tuple, Union
+from app.core.config import settings
+from app.ml.axis_search import (
+    diagonal_mirror_ncc, find_mirror_axes, find_reflection_angles, reflection_score
+)
+from app.ml.context import AnalysisContext
+from app.ml.ncc import mirror_ncc
+from app.ml.rotation_search import rotation_order_scores
+
+
+ImageInput = Union[np.ndarray, AnalysisContext]
 
 
 class SymmetryDetector:
     """Core symmetry detection algorithms"""
+
+    # Bump when detection logic changes in a way parameters don't capture
+    ALGORITHM_VERSION = 2
+
+    # Settings that change detection output (part of the cache signature)
+    SIGNATURE_SETTINGS = [
+        "SYMMETRY_AXIS_SEARCH", "SYMMETRY_ANGLE_SWEEP", "SYMMETRY_ANGLE_STEP", "SYMMETRY_RADIAL_MODE",
+        "SYMMETRY_DIAGONAL_MODE", "SYMMETRY_PYRAMID", "MAX_WORKING_PIXELS", "SYMMETRY_CASCADE",
+        "SYMMETRY_CASCADE_PROBE_PIXELS", "SYMMETRY_CASCADE_MIN_ERROR", "SYMMETRY_CASCADE_TOLERANCE"
+    ]
+
+    # Axis angles already covered by the dedicated vertical/horizontal/diagonal detectors
+    FIXED_AXIS_ANGLES = (0.0, 45.0, 90.0, 135.0)
+
+    @classmethod
+    def get_parameters(cls) -> Dict[str, Dict[str, object]]:
+        """Default keyword parameters (thresholds etc.) of every detector"""
+        parameters = {}
+        for name, member in inspect.getmembers(cls, predicate=inspect.isfunction):
+            if not (name.startswith("detect_") or name.startswith("find_")):
+                continue
+            parameters[name] = {
+                param.name: param.default
+                for param in inspect.signature(member).parameters.values()
+                if param.default is not inspect.Parameter.empty
+            }
+        return parameters
+
+    @classmethod
+    def get_signature(cls) -> str:
+        """Stable hash of algorithm version and parameters, used to version cached results"""
+        payload = json.dumps(
+            {
+                "version": cls.ALGORITHM_VERSION,
+                "parameters": cls.get_parameters(),
+                "settings": {name: getattr(settings, name) for name in cls.SIGNATURE_SETTINGS}
+            },
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
     
     @staticmethod
-    def detect_vertical_symmetry(image: np.ndarray, threshold: float = 0.85) -> Tuple[bool, float, dict]:
-        """Detect vertical axis of symmetry"""
-        
-        gray = ImagePreprocessor.convert_to_grayscale(image)
+    def detect_vertical_symmetry(image: ImageInput, threshold: float = 0.85,
+                                 search: Optional[str] = None) -> Tuple[bool, float, dict]:
+        """Detect vertical axis of symmetry (at the midline, or anywhere with search="fft")"""
+        
+        if (search or settings.SYMMETRY_AXIS_SEARCH) == "fft":
+            candidates = SymmetryDetector.find_vertical_axes(image, top_k=1)
+            if not candidates:
+                return False, 0.0, {}
+            best = candidates[0]
+            return best["confidence"] >= threshold, best["confidence"], best["coordinates"]
+        
+        gray = AnalysisContext.ensure(image).gray
         h, w = gray.shape
         
-        # Split image into left and right halves
+        # Compare the left half with the mirrored right half (flipped view, no copies)
         mid = w // 2
-        left_half = gray[:, :mid]
-        right_half = gray[:, mid:mid + left_half.shape[1]]
+        if mid == 0:
+            return False, 0.0, {}
         
-        # Flip right half horizontally
-        right_flipped = cv2.flip(right_half, 1)
+        correlation = mirror_ncc(gray, axis=1)
+        confidence = (correlation + 1) / 2  # Convert from [-1,1] to [0,1]
         
-        # Calculate similarity using normalized cross-correlation
-        if left_half.shape == right_flipped.shape:
-            # Normalize both halves
-            left_norm = (left_half - np.mean(left_half)) / (np.std(left_half) + 1e-10)
-            right_norm = (right_flipped - np.mean(right_flipped)) / (np.std(right_flipped) + 1e-10)
-            
-            # Compute correlation
-            correlation = np.mean(left_norm * right_norm)
-            confidence = (correlation + 1) / 2  # Convert from [-1,1] to [0,1]
-            
-            axis_coords = {
-                "x1": mid, "y1": 0,
-                "x2": mid, "y2": h
-            }
-            
-            return confidence >= threshold, confidence, axis_coords
+        axis_coords = {
+            "x1": mid, "y1": 0,
+            "x2": mid, "y2": h
+        }
         
-        return False, 0.0, {}
+        return confidence >= threshold, confidence, axis_coords
     
     @staticmethod
-    def detect_horizontal_symmetry(image: np.ndarray, threshold: float = 0.85) -> Tuple[bool, float, dict]:
-        """Detect horizontal axis of symmetry"""
-        
-        gray = ImagePreprocessor.convert_to_grayscale(image)
+    def detect_horizontal_symmetry(image: ImageInput, threshold: float = 0.85,
+                                   search: Optional[str] = None) -> Tuple[bool, float, dict]:
+        """Detect horizontal axis of symmetry (at the midline, or anywhere with search="fft")"""
+        
+        if (search or settings.SYMMETRY_AXIS_SEARCH) == "fft":
+            candidates = SymmetryDetector.find_horizontal_axes(image, top_k=1)
+            if not candidates:
+                return False, 0.0, {}
+            best = candidates[0]
+            return best["confidence"] >= threshold, best["confidence"], best["coordinates"]
+        
+        gray = AnalysisContext.ensure(image).gray
         h, w = gray.shape
         
-        # Split image into top and bottom halves
+        # Compare the top half with the mirrored bottom half
         mid = h // 2
-        top_half = gray[:mid, :]
-        bottom_half = gray[mid:mid + top_half.shape[0], :]
+        if mid == 0:
+            return False, 0.0, {}
         
-        # Flip bottom half vertically
-        bottom_flipped = cv2.flip(bottom_half, 0)
+        correlation = mirror_ncc(gray, axis=0)
+        confidence = (correlation + 1) / 2
         
-        # Calculate similarity
-        if top_half.shape == bottom_flipped.shape:
-            # Normalize
-            top_norm = (top_half - np.mean(top_half)) / (np.std(top_half) + 1e-10)
-            bottom_norm = (bottom_flipped - np.mean(bottom_flipped)) / (np.std(bottom_flipped) + 1e-10)
-            
-            # Compute correlation
-            correlation = np.mean(top_norm * bottom_norm)
-            confidence = (correlation + 1) / 2
-            
-            axis_coords = {
-                "x1": 0, "y1": mid,
-                "x2": w, "y2": mid
-            }
-            
-            return confidence >= threshold, confidence, axis_coords
+        axis_coords = {
+            "x1": 0, "y1": mid,
+            "x2": w, "y2": mid
+        }
+        
+        return confidence >= threshold, confidence, axis_coords
+    
+    @staticmethod
+    def find_vertical_axes(image: ImageInput, top_k: int = 3) -> List[dict]:
+        """Top-k vertical mirror axes at any horizontal offset, via FFT cross-correlation"""
+        
+        gray = AnalysisContext.ensure(image).gray
+        h, w = gray.shape
         
-        return False, 0.0, {}
+        return [
+            {
+                "position": x,
+                "confidence": (ncc + 1) / 2,
+                "coordinates": {"x1": x, "y1": 0, "x2": x, "y2": h}
+            }
+            for x, ncc in find_mirror_axes(gray, top_k)
+        ]
     
     @staticmethod
-    def detect_diagonal_symmetry(image: np.ndarray, threshold: float = 0.75) -> List[Tuple[bool, float, dict, str]]:
-        """Detect diagonal axes of symmetry (main and anti-diagonal)"""
+    def find_horizontal_axes(image: ImageInput, top_k: int = 3) -> List[dict]:
+        """Top-k horizontal mirror axes at any vertical offset, via FFT cross-correlation"""
         
-        gray = ImagePreprocessor.convert_to_grayscale(image)
+        gray = AnalysisContext.ensure(image).gray
         h, w = gray.shape
         
+        # Rows of the transpose are image columns
+        return [
+            {
+                "position": y,
+                "confidence": (ncc + 1) / 2,
+                "coordinates": {"x1": 0, "y1": y, "x2": w, "y2": y}
+            }
+            for y, ncc in find_mirror_axes(gray.T, top_k)
+        ]
+    
+    @staticmethod
+    def detect_diagonal_symmetry(image: ImageInput, threshold: float = 0.75,
+                                 mode: Optional[str] = None) -> List[Tuple[bool, float, dict, str]]:
+        """Detect diagonal axes of symmetry (main and anti-diagonal; warp, or exact with mode="transpose")"""
+        
+        if (mode or settings.SYMMETRY_DIAGONAL_MODE) == "transpose":
+            return SymmetryDetector.detect_diagonal_symmetry_exact(image, threshold)
+        
+        context = AnalysisContext.ensure(image)
+        h, w = context.gray.shape
+        
         results = []
         
         # Make image square for easier diagonal detection
-        size = min(h, w)
-        gray_square = cv2.resize(gray, (size, size))
+        gray_square = context.square
+        size = gray_square.shape[0]
         
         # Main diagonal (top-left to bottom-right)
         # Rotate image 45 degrees and check for vertical symmetry
@@ -95,16 +177,8 @@ class SymmetryDetector:
         rotated_45 = cv2.warpAffine(gray_square, rotation_matrix, (size, size))
         
         # Check vertical symmetry on rotated image
-        mid = size // 2
-        left = rotated_45[:, :mid]
-        right = rotated_45[:, mid:mid + left.shape[1]]
-        
-        if left.shape == right.shape:
-            right_flipped = cv2.flip(right, 1)
-            left_norm = (left - np.mean(left)) / (np.std(left) + 1e-10)
-            right_norm = (right_flipped - np.mean(right_flipped)) / (np.std(right_flipped) + 1e-10)
-            correlation = np.mean(left_norm * right_norm)
-            confidence = (correlation + 1) / 2
+        if size >= 2:
+            confidence = (mirror_ncc(rotated_45, axis=1) + 1) / 2
             
             if confidence >= threshold:
                 results.append((True, confidence, {
@@ -116,15 +190,8 @@ class SymmetryDetector:
         rotation_matrix_135 = cv2.getRotationMatrix2D(center, 135, 1.0)
         rotated_135 = cv2.warpAffine(gray_square, rotation_matrix_135, (size, size))
         
-        left_135 = rotated_135[:, :mid]
-        right_135 = rotated_135[:, mid:mid + left_135.shape[1]]
-        
-        if left_135.shape == right_135.shape:
-            right_flipped_135 = cv2.flip(right_135, 1)
-            left_norm_135 = (left_135 - np.mean(left_135)) / (np.std(left_135) + 1e-10)
-            right_norm_135 = (right_flipped_135 - np.mean(right_flipped_135)) / (np.std(right_flipped_135) + 1e-10)
-            correlation_135 = np.mean(left_norm_135 * right_norm_135)
-            confidence_135 = (correlation_135 + 1) / 2
+        if size >= 2:
+            confidence_135 = (mirror_ncc(rotated_135, axis=1) + 1) / 2
             
             if confidence_135 >= threshold:
                 results.append((True, confidence_135, {
@@ -135,10 +202,103 @@ class SymmetryDetector:
         return results
     
     @staticmethod
-    def detect_radial_symmetry(image: np.ndarray, num_angles: int = 8, threshold: float = 0.70) -> Tuple[bool, float]:
-        """Detect radial (rotational) symmetry"""
+    def detect_diagonal_symmetry_exact(image: ImageInput, threshold: float = 0.75) -> List[Tuple[bool, float, dict, str]]:
+        """Detect diagonal axes of the centred square crop by comparing it with its transpose"""
+        
+        context = AnalysisContext.ensure(image)
+        h, w = context.gray.shape
+        square = context.square_crop
+        size = square.shape[0]
+        x0, y0 = (w - size) // 2, (h - size) // 2
+        
+        results = []
+        
+        # Main diagonal (top-left to bottom-right of the crop)
+        confidence = (diagonal_mirror_ncc(square) + 1) / 2
+        if confidence >= threshold:
+            results.append((True, confidence, {
+                "x1": x0, "y1": y0,
+                "x2": x0 + size, "y2": y0 + size
+            }, "main_diagonal"))
+        
+        # Anti-diagonal (top-right to bottom-left of the crop)
+        confidence_anti = (diagonal_mirror_ncc(square, anti_diagonal=True) + 1) / 2
+        if confidence_anti >= threshold:
+            results.append((True, confidence_anti, {
+                "x1": x0 + size, "y1": y0,
+                "x2": x0, "y2": y0 + size
+            }, "anti_diagonal"))
+        
+        return results
+    
+    @staticmethod
+    def detect_reflection_axes(image: ImageInput, threshold: float = 0.80, angle_step: float = 1.0,
+                               top_k: int = 3) -> List[Tuple[bool, float, dict, float]]:
+        """Detect reflection axes at any angle through the image centre (spectral sweep)"""
+        
+        context = AnalysisContext.ensure(image)
+        h, w = context.gray.shape
+        
+        # The spectral sweep and its verification only need a small image
+        level = 0
+        while max(h, w) >> level > 256:
+            level += 1
+        small = context.pyramid(level)
         
-        gray = ImagePreprocessor.convert_to_grayscale(image)
+        results = []
+        for angle, _ in find_reflection_angles(small, angle_step, top_k):
+            # The spectrum can't tell an axis from its perpendicular; check both in the image
+            options = [(reflection_score(small, a), a % 180.0) for a in (angle, angle + 90.0)]
+            correlation, best_angle = max(options)
+            confidence = (correlation + 1) / 2
+            
+            results.append((
+                confidence >= threshold,
+                confidence,
+                SymmetryDetector._axis_through_centre(w, h, best_angle),
+                best_angle
+            ))
+        
+        results.sort(key=lambda r: r[1], reverse=True)
+        return results
+    
+    @staticmethod
+    def is_fixed_axis_angle(angle: float, tolerance: float = 2.0) -> bool:
+        """Whether ``angle`` is (nearly) one of the fixed axes checked by the dedicated detectors"""
+        return any(
+            min(abs(angle - fixed) % 180.0, 180.0 - abs(angle - fixed) % 180.0) <= tolerance
+            for fixed in SymmetryDetector.FIXED_AXIS_ANGLES
+        )
+    
+    @staticmethod
+    def _axis_through_centre(w: int, h: int, angle: float) -> dict:
+        """End points of the line through the image centre at ``angle`` degrees, clipped to the image"""
+        
+        cx, cy = w / 2.0, h / 2.0
+        dx, dy = np.cos(np.deg2rad(angle)), np.sin(np.deg2rad(angle))
+        
+        limits = []
+        if abs(dx) > 1e-9:
+            limits.append(cx / abs(dx))
+        if abs(dy) > 1e-9:
+            limits.append(cy / abs(dy))
+        t = min(limits)
+        
+        return {
+            "x1": float(cx - t * dx), "y1": float(cy - t * dy),
+            "x2": float(cx + t * dx), "y2": float(cy + t * dy)
+        }
+    
+    @staticmethod
+    def detect_radial_symmetry(image: ImageInput, num_angles: int = 8, threshold: float = 0.70,
+                               mode: Optional[str] = None) -> Tuple[bool, float]:
+        """Detect radial (rotational) symmetry (rotate-and-compare, or mode="polar")"""
+        
+        if (mode or settings.SYMMETRY_RADIAL_MODE) == "polar":
+            has_radial, confidence, _ = SymmetryDetector.detect_radial_order(image, threshold)
+            return has_radial, confidence
+        
+        gray = AnalysisContext.ensure(image).gray
         h, w = gray.shape
         center = (w // 2, h // 2)
         
@@ -163,6 +323,41 @@ class SymmetryDetector:
         
         return avg_similarity >= threshold, avg_similarity
     
+    @staticmethod
+    def detect_radial_order(image: ImageInput, threshold: float = 0.70, max_order: int = 12,
+                            order_tolerance: float = 0.05) -> Tuple[bool, float, int]:
+        """
+        Detect radial symmetry and its dominant order from one polar unwrap
+        
+        An n-fold pattern also scores on the divisors of n (a hexagon is
+        2- and 3-fold too), so the highest order within ``order_tolerance``
+        of the best score is reported.
+        
+        Returns:
+            (detected, confidence, order) with order 1 when no order stands out
+        """
+        
+        context = AnalysisContext.ensure(image)
+        h, w = context.gray.shape
+        
+        # Keep the outer ring's circumference near the angular sampling to limit aliasing
+        level = 0
+        while min(h, w) >> level > 256:
+            level += 1
+        
+        # Level pixel i covers original pixels from 2^level * i, so the centre maps as (c + 0.5) / 2^level - 0.5
+        scale = 1 << level
+        centre = (w / 2.0 / scale - 0.5, h / 2.0 / scale - 0.5)
+        scores = rotation_order_scores(context.pyramid(level), max_order, centre=centre)
+        
+        best = max(scores.values())
+        if best < order_tolerance:
+            return False, best, 1
+        order = max(n for n, score in scores.items() if score >= best - order_tolerance)
+        confidence = scores[order]
+        
+        return confidence >= threshold, confidence, order
+    
     @staticmethod
     def calculate_overall_score(vertical_conf: float, horizontal_conf: float, 
                                radial_conf: float, diagonal_confs: List[float]) -> float:
@@ -200,11 +395,10 @@ class SymmetryDetector:
         return min(overall_score, 100.0)
     
     @staticmethod
-    def find_symmetry_regions(image: np.ndarray) -> List[dict]:
+    def find_symmetry_regions(image: ImageInput) -> List[dict]:
         """Find and segment symmetric regions"""
         
-        gray = ImagePreprocessor.convert_to_grayscale(image)
-        edges = ImagePreprocessor.detect_edges(image)
+        edges = AnalysisContext.ensure(image).edges
         
         # Find contours
         contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
@@ -0,0 +1,121 @@
+"""
+Normalized cross-correlation kernel
+One implementation of the zero-offset NCC used by every reflection check.
+
+Inputs can be uint8 or float views, including flipped (negative-stride)
+views, so a half and the mirror of the other half are compared without
+copying either. The NumPy backend converts ROW_BLOCK rows at a time to
+float32 and accumulates all five sums in float64, so the peak extra memory
+is a few MB regardless of image size. Searching every axis offset at once
+is the FFT profile in app.ml.axis_search.
+"""
+
+import cv2
+import numpy as np
+from typing import Callable, Dict, Optional
+
+
+ROW_BLOCK = 256  # Rows converted to float32 at a time
+
+# matchTemplate measured 2-13x slower than the blocked sums from 64x64 to 24 MP
+# (it copies flipped views and goes through its DFT path), so it is opt-in
+DEFAULT_BACKEND = "numpy"
+
+
+def ncc(a: np.ndarray, b: np.ndarray, backend: Optional[str] = None) -> float:
+    """
+    Pearson correlation of two equally shaped arrays, in [-1, 1]
+
+    Args:
+        a, b: Arrays (or views) of the same shape
+        backend: "numpy", "opencv" or None for DEFAULT_BACKEND
+
+    Returns:
+        The correlation, or 0.0 when either input is constant
+    """
+
+    if a.shape != b.shape:
+        raise ValueError(f"Shape mismatch: {a.shape} vs {b.shape}")
+
+    if a.size == 0:
+        return 0.0
+
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown NCC backend: {backend}")
+
+    return BACKENDS[backend](a, b)
+
+
+def mirror_ncc(image: np.ndarray, axis: int = 1, backend: Optional[str] = None) -> float:
+    """
+    NCC between the first half of ``image`` along ``axis`` and the mirrored
+    second half (axis=1: left vs right, axis=0: top vs bottom). An odd
+    middle row/column is ignored.
+    """
+
+    half = image.shape[axis] // 2
+    if half == 0:
+        return 0.0
+
+    if axis == 1:
+        first, second = image[:, :half], image[:, half:2 * half][:, ::-1]
+    else:
+        first, second = image[:half], image[half:2 * half][::-1]
+
+    return ncc(first, second, backend)
+
+
+def _ncc_numpy(a: np.ndarray, b: np.ndarray) -> float:
+    """One pass of blocked float32 sums (Σa, Σb, Σa², Σb², Σab)"""
+
+    if a.ndim == 1:
+        a, b = a[None, :], b[None, :]
+    elif a.ndim > 2:
+        a, b = a.reshape(a.shape[0], -1), b.reshape(b.shape[0], -1)
+
+    sum_a = sum_b = sum_aa = sum_bb = sum_ab = 0.0
+    for start in range(0, a.shape[0], ROW_BLOCK):
+        block_a = np.asarray(a[start:start + ROW_BLOCK], dtype=np.float32)
+        block_b = np.asarray(b[start:start + ROW_BLOCK], dtype=np.float32)
+        sum_a += float(block_a.sum(dtype=np.float64))
+        sum_b += float(block_b.sum(dtype=np.float64))
+        sum_aa += float(np.einsum("ij,ij->", block_a, block_a, dtype=np.float64))
+        sum_bb += float(np.einsum("ij,ij->", block_b, block_b, dtype=np.float64))
+        sum_ab += float(np.einsum("ij,ij->", block_a, block_b, dtype=np.float64))
+
+    n = a.size
+    covariance = sum_ab / n - (sum_a / n) * (sum_b / n)
+    variance_a = sum_aa / n - (sum_a / n) ** 2
+    variance_b = sum_bb / n - (sum_b / n) ** 2
+
+    return _finish(covariance, variance_a, variance_b)
+
+
+def _ncc_opencv(a: np.ndarray, b: np.ndarray) -> float:
+    """cv2.matchTemplate(TM_CCOEFF_NORMED) with a same-sized template (2-D inputs)"""
+
+    if a.ndim != 2:
+        return _ncc_numpy(a, b)
+
+    # OpenCV needs positive strides, so flipped views are copied here
+    dtype = np.uint8 if a.dtype == np.uint8 and b.dtype == np.uint8 else np.float32
+    a = np.ascontiguousarray(a, dtype=dtype)
+    b = np.ascontiguousarray(b, dtype=dtype)
+
+    if float(a.std()) < 1e-6 or float(b.std()) < 1e-6:
+        return 0.0
+
+    return float(np.clip(cv2.matchTemplate(a, b, cv2.TM_CCOEFF_NORMED)[0, 0], -1.0, 1.0))
+
+
+def _finish(covariance: float, variance_a: float, variance_b: float) -> float:
+    if variance_a <= 1e-12 or variance_b <= 1e-12:
+        return 0.0
+    return float(np.clip(covariance / np.sqrt(variance_a * variance_b), -1.0, 1.0))
+
+
+BACKENDS: Dict[str, Callable[[np.ndarray, np.ndarray], float]] = {
+    "numpy": _ncc_numpy,
+    "opencv": _ncc_opencv
+}
@@ -0,0 +1,67 @@
+"""
+Rotation order search
+Scores every rotational symmetry order in one pass.
+
+Unwrapping the image around its centre into polar coordinates turns a
+rotation into a cyclic shift along the angle axis. A ring that is
+unchanged by a rotation of 360 / n degrees only has Fourier harmonics at
+multiples of n, so a single FFT along the angle axis measures every order
+at once instead of warping the image once per rotation angle.
+"""
+
+import cv2
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+
+def rotation_order_scores(gray: np.ndarray, max_order: int = 12, num_angles: int = 720,
+                          inner_radius: float = 0.05,
+                          centre: Optional[Tuple[float, float]] = None) -> Dict[int, float]:
+    """
+    Rotational symmetry score for every order n = 2..max_order
+
+    Args:
+        gray: 2-D grayscale image, rotated about its centre (a few hundred
+            pixels per side is plenty; larger images only alias the outer rings)
+        max_order: Highest order to score
+        num_angles: Angular samples per ring
+        inner_radius: Fraction of the radius skipped around the centre
+        centre: Rotation centre (x, y) in pixel coordinates, defaults to the image centre
+
+    Returns:
+        Mapping order -> score in [0, 1]. The score is the share of angular
+        (non-DC) energy at multiples of n, rescaled so that an image with no
+        preference for any harmonic scores 0 and an exactly n-fold one
+        scores 1.
+    """
+
+    h, w = gray.shape
+    if centre is None:
+        centre = ((w - 1) / 2.0, (h - 1) / 2.0)
+    radius = min(centre[0], centre[1], w - 1 - centre[0], h - 1 - centre[1]) + 0.5
+    n_radii = max(2, int(radius))
+
+    # Rows are angles, columns radii
+    polar = cv2.warpPolar(
+        np.asarray(gray, dtype=np.float32), (n_radii, num_angles), centre, radius,
+        cv2.INTER_LINEAR + cv2.WARP_POLAR_LINEAR
+    )
+    rings = polar[:, max(1, int(inner_radius * n_radii)):].astype(np.float64)
+
+    # Harmonic power per ring; weight rings by circumference so every pixel counts alike
+    power = np.abs(np.fft.rfft(rings, axis=0)) ** 2
+    ring_radii = np.arange(rings.shape[1]) + max(1, int(inner_radius * n_radii))
+    harmonics = power[1:] @ ring_radii  # Drop DC (k = 0)
+    total = float(np.sum(harmonics))
+
+    scores = {}
+    for order in range(2, max_order + 1):
+        if total <= 1e-9:
+            scores[order] = 0.0
+            continue
+
+        fraction = float(np.sum(harmonics[order - 1::order])) / total
+        chance = 1.0 / order
+        scores[order] = float(np.clip((fraction - chance) / (1.0 - chance), 0.0, 1.0))
+
+    return scores
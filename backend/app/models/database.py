@@ -1,10 +1,10 @@
 """
 Database models for storing analysis results
-This is optional and for future use when you want to persist data in a database
-Currently, the app works without a database (files are stored locally)
+Analysis results are persisted here when computed so they can be served
+without re-running detection (image files are still stored locally)
 """
 
-from sqlalchemy import create_engine, Column, String, Float, Boolean, DateTime, Integer, JSON
+from sqlalchemy import create_engine, event, inspect, text, true, Column, String, Float, Boolean, DateTime, Integer, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -16,9 +16,19 @@ Base = declarative_base()
 # Database engine (SQLite for development, can be changed to PostgreSQL for production)
 engine = create_engine(
     settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+    connect_args={"check_same_thread": False, "timeout": 30} if "sqlite" in settings.DATABASE_URL else {}
 )
 
+
+if "sqlite" in settings.DATABASE_URL:
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """WAL lets the API and analysis worker processes read while one writes"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -31,8 +41,10 @@ class AnalysisRecord(Base):
     analysis_id = Column(String, unique=True, index=True, nullable=False)
     original_filename = Column(String, nullable=False)
     original_image_path = Column(String, nullable=False)
-    processed_image_path = Column(String, nullable=False)
+    processed_image_path = Column(String, nullable=True)  # Legacy: annotated images are rendered on request
     thumbnail_path = Column(String)
+    # False when detectors were skipped (selection or latency budget): kept out of the gallery and its stats
+    complete = Column(Boolean, nullable=False, default=True, server_default=true())
 
     # Symmetry metrics
     symmetry_score = Column(Float, nullable=False)
@@ -48,13 +60,146 @@ class AnalysisRecord(Base):
     processing_time = Column(Float)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
+    # Full serialized SymmetryAnalysisResult, returned as-is on reads
+    result_data = Column(JSON)
+
     # Optional: User association (for future multi-user support)
     user_id = Column(String, nullable=True)
 
+    # Composite indexes backing keyset pagination of the gallery
+    __table_args__ = (
+        Index("ix_analyses_timestamp_id", "timestamp", "id"),
+        Index("ix_analyses_score_id", "symmetry_score", "id"),
+    )
+
+
+class GalleryStats(Base):
+    """Running aggregates over the analyses table (single row, id=0)"""
+    __tablename__ = "gallery_stats"
+
+    id = Column(Integer, primary_key=True)
+    analysis_count = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0.0)
+    score_min = Column(Float, nullable=True)
+    score_max = Column(Float, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class StorageUsage(Base):
+    """Running byte/file totals per storage directory"""
+    __tablename__ = "storage_usage"
+
+    directory = Column(String, primary_key=True)  # "uploads" or "results"
+    bytes_used = Column(Integer, nullable=False, default=0)
+    file_count = Column(Integer, nullable=False, default=0)
+
+
+class AnalysisJob(Base):
+    """Queued analysis of a stored upload, consumed by app.worker processes"""
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True)  # Job ID, also the analysis ID of the result
+    status = Column(String, nullable=False, default="queued")  # queued, running, succeeded, failed
+    file_path = Column(String, nullable=False)
+    original_filename = Column(String)
+    content_hash = Column(String)
+
+    # Claiming worker and the time its claim lapses unless renewed
+    worker_id = Column(String)
+    lease_expires_at = Column(DateTime)
+    attempts = Column(Integer, nullable=False, default=0)
+
+    error = Column(String)
+    result_data = Column(JSON)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    # Claims scan the oldest queued (or lease-expired) job
+    __table_args__ = (
+        Index("ix_jobs_status_created", "status", "created_at"),
+    )
+
 
 def init_db():
     """Initialize database - create all tables"""
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+    _relax_processed_image_path()
+
+    # create_all skips indexes on tables that already exist
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def _add_missing_columns():
+    """Add columns introduced after a table was created (create_all never alters existing tables)"""
+
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable and column.server_default is None:
+                print(f"⚠️  Cannot add required column {table.name}.{column.name} without a default")
+                continue
+
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+            if column.server_default is not None:
+                default = column.server_default.arg
+                ddl += f" DEFAULT {default if isinstance(default, str) else default.compile(dialect=engine.dialect)}"
+            if not column.nullable:
+                ddl += " NOT NULL"
+
+            with engine.begin() as conn:
+                conn.execute(text(ddl))
+
+
+def _relax_processed_image_path():
+    """Drop the NOT NULL on analyses.processed_image_path in databases created while it was required"""
+
+    columns = {column["name"]: column for column in inspect(engine).get_columns("analyses")}
+    legacy = columns.get("processed_image_path")
+    if legacy is None or legacy["nullable"]:
+        return
+
+    table = AnalysisRecord.__table__
+    with engine.begin() as conn:
+        if engine.dialect.name != "sqlite":
+            conn.execute(text("ALTER TABLE analyses ALTER COLUMN processed_image_path DROP NOT NULL"))
+            return
+
+        # SQLite can't alter a column: rebuild the table around the existing rows
+        names = ", ".join(column.name for column in table.columns if column.name in columns)
+        conn.execute(text("ALTER TABLE analyses RENAME TO analyses_legacy"))
+        for index in table.indexes:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+        table.create(bind=conn)
+        conn.execute(text(f"INSERT INTO analyses ({names}) SELECT {names} FROM analyses_legacy"))
+        conn.execute(text("DROP TABLE analyses_legacy"))
+
+
+_db_ready = False
+
+
+def ensure_db():
+    """Create tables once per process"""
+    global _db_ready
+
+    if not _db_ready:
+        init_db()
+        _db_ready = True
+
+
+def dispose_engine():
+    """Drop pooled connections inherited from a parent process (call after fork)"""
+    engine.dispose(close=False)
 
 
 def get_db():
@@ -66,7 +211,6 @@ def get_db():
         db.close()
 
 
-# NOTE: To use the database:
-# 1. Uncomment sqlalchemy in requirements.txt
-# 2. Run: python -c "from app.models.database import init_db; init_db()"
-# 3. Update routes to save/load from database
\ No newline at end of file
+# NOTE: Tables are created on application startup (see app/main.py).
+# To create them manually run:
+#   python -c "from app.models.database import init_db; init_db()"
\ No newline at end of file
@@ -5,7 +5,7 @@ from datetime import datetime
 
 class SymmetryAxis(BaseModel):
     """Represents a detected symmetry axis"""
-    type: str = Field(..., description="Type of symmetry: vertical, horizontal, diagonal")
+    type: str = Field(..., description="Type of symmetry: vertical, horizontal, main_diagonal, anti_diagonal, reflection")
     angle: float = Field(..., description="Angle of the axis in degrees")
     confidence: float = Field(..., ge=0, le=1, description="Confidence score (0-1)")
     coordinates: Dict[str, float] = Field(..., description="Start and end points of the axis")
@@ -31,7 +31,22 @@ class SymmetryAnalysisResult(BaseModel):
     has_vertical_symmetry: bool
     has_horizontal_symmetry: bool
     has_radial_symmetry: bool
+    radial_order: Optional[int] = Field(None, description="Dominant rotational order (polar radial mode only)")
+    pyramid_level: Optional[int] = Field(None, description="Finest pyramid level any detector ran on (0 = full resolution)")
+    skipped_detectors: List[str] = Field(
+        default_factory=list, description="Detector types not run for this analysis (not selected or timed out)"
+    )
+    pruned_detectors: List[str] = Field(
+        default_factory=list, description="Detector types answered from a low-resolution probe (SYMMETRY_CASCADE)"
+    )
+    detector_status: Optional[Dict[str, str]] = Field(
+        None, description="Per detector type: detected, not_detected, skipped or timed_out"
+    )
+    partial: bool = Field(False, description="The latency budget ran out before every selected detector ran")
     processing_time: float = Field(..., description="Processing time in seconds")
+    stage_timings: Optional[Dict[str, float]] = Field(
+        None, description="Seconds spent per pipeline stage in this run (fresh analyses only)"
+    )
     timestamp: datetime = Field(default_factory=datetime.now)
 
     class Config:
@@ -59,6 +74,18 @@ class SymmetryAnalysisResult(BaseModel):
         }
 
 
+class JobStatus(BaseModel):
+    """State of a queued analysis job"""
+    job_id: str = Field(..., description="Job ID, also the analysis ID of the result")
+    status: str = Field(..., description="Job status: queued, running, succeeded, failed")
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[SymmetryAnalysisResult] = Field(None, description="Analysis result once succeeded")
+
+
 class UploadResponse(BaseModel):
     """Response after successful image upload"""
     message: str
@@ -86,4 +113,5 @@ class GalleryItem(BaseModel):
 class GalleryResponse(BaseModel):
     """Gallery listing response"""
     total: int
-    items: List[GalleryItem]
\ No newline at end of file
+    items: List[GalleryItem]
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, if any")
\ No newline at end of file
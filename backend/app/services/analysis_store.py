@@ -0,0 +1,219 @@
+"""
+Analysis Store
+Persists analysis results in the analyses table and loads them back by ID
+"""
+
+import base64
+import json
+import os
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import func, tuple_
+from app.models.database import AnalysisRecord, SessionLocal, ensure_db
+from app.models.schemas import SymmetryAnalysisResult
+from app.services.stats_service import StatsService
+
+
+class AnalysisStore:
+    """Read/write access to persisted symmetry analyses"""
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+
+    @staticmethod
+    def ensure_schema() -> None:
+        """Create tables once per process"""
+        ensure_db()
+
+    def save(self, result: SymmetryAnalysisResult, original_image_path: str,
+             original_filename: Optional[str] = None, thumbnail_path: Optional[str] = None) -> None:
+        """Insert or replace the record for ``result.analysis_id``"""
+
+        self.ensure_schema()
+
+        values = {
+            "original_filename": original_filename or os.path.basename(original_image_path),
+            "original_image_path": original_image_path,
+            "processed_image_path": None,  # Annotated images are rendered on request, never stored
+            "thumbnail_path": thumbnail_path,
+            "complete": not result.skipped_detectors,
+            "symmetry_score": result.symmetry_score,
+            "has_vertical_symmetry": result.has_vertical_symmetry,
+            "has_horizontal_symmetry": result.has_horizontal_symmetry,
+            "has_radial_symmetry": result.has_radial_symmetry,
+            "detected_axes": [axis.model_dump() for axis in result.detected_axes],
+            "detected_regions": [region.model_dump() for region in result.detected_regions],
+            "processing_time": result.processing_time,
+            "timestamp": result.timestamp,
+            "result_data": result.model_dump(mode="json")
+        }
+
+        with self.session_factory() as db:
+            record = db.query(AnalysisRecord).filter(
+                AnalysisRecord.analysis_id == result.analysis_id
+            ).first()
+
+            if record is None:
+                db.add(AnalysisRecord(analysis_id=result.analysis_id, **values))
+                previous_score = None
+            else:
+                previous_score = record.symmetry_score if record.complete else None
+                for key, value in values.items():
+                    setattr(record, key, value)
+
+            # Keep gallery aggregates in step within the same transaction (complete analyses only)
+            db.flush()
+            added_score = result.symmetry_score if values["complete"] else None
+            if added_score is not None or previous_score is not None:
+                StatsService.apply_score_change(db, added=added_score, removed=previous_score)
+            db.commit()
+
+    def get(self, analysis_id: str) -> Optional[SymmetryAnalysisResult]:
+        """Load a stored result by its indexed analysis ID"""
+
+        self.ensure_schema()
+
+        with self.session_factory() as db:
+            record = db.query(AnalysisRecord).filter(
+                AnalysisRecord.analysis_id == analysis_id
+            ).first()
+
+            if record is None:
+                return None
+
+            return self._to_result(record)
+
+    def delete(self, analysis_id: str) -> bool:
+        """Delete the record for ``analysis_id``; returns True if one existed"""
+
+        self.ensure_schema()
+
+        with self.session_factory() as db:
+            record = db.query(AnalysisRecord).filter(
+                AnalysisRecord.analysis_id == analysis_id
+            ).first()
+
+            if record is None:
+                return False
+
+            score = record.symmetry_score if record.complete else None
+            db.delete(record)
+            db.flush()
+            if score is not None:
+                StatsService.apply_score_change(db, removed=score)
+            db.commit()
+
+        return True
+
+    def list_page(self, sort_by: str = "timestamp", limit: int = 20,
+                  cursor: Optional[str] = None, offset: int = 0) -> Tuple[List[dict], Optional[str]]:
+        """
+        One gallery page of complete analyses, newest (or highest scoring) first
+
+        With a cursor the page is located by an index range scan on
+        (sort key, id), so every page costs the same regardless of depth.
+        ``offset`` is only honoured without a cursor, for older clients.
+
+        Returns:
+            (rows, next_cursor) where next_cursor is None on the last page
+        """
+
+        self.ensure_schema()
+        sort_column = AnalysisRecord.symmetry_score if sort_by == "score" else AnalysisRecord.timestamp
+
+        with self.session_factory() as db:
+            query = db.query(
+                AnalysisRecord.id,
+                AnalysisRecord.analysis_id,
+                AnalysisRecord.thumbnail_path,
+                AnalysisRecord.symmetry_score,
+                AnalysisRecord.timestamp,
+                AnalysisRecord.has_vertical_symmetry,
+                AnalysisRecord.has_horizontal_symmetry
+            ).filter(AnalysisRecord.complete.is_(True))
+
+            if cursor:
+                last_value, last_id = self._decode_cursor(cursor, sort_by)
+                query = query.filter(tuple_(sort_column, AnalysisRecord.id) < tuple_(last_value, last_id))
+            elif offset:
+                query = query.offset(offset)
+
+            rows = query.order_by(sort_column.desc(), AnalysisRecord.id.desc()).limit(limit + 1).all()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+
+        if has_more and rows:
+            last = rows[-1]
+            last_value = last.symmetry_score if sort_by == "score" else last.timestamp
+            next_cursor = self._encode_cursor(sort_by, last_value, last.id)
+
+        return [row._asdict() for row in rows], next_cursor
+
+    def count(self) -> int:
+        """Number of stored analyses"""
+
+        self.ensure_schema()
+
+        with self.session_factory() as db:
+            return db.query(func.count(AnalysisRecord.id)).scalar()
+
+    @staticmethod
+    def _encode_cursor(sort_by: str, value, record_id: int) -> str:
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        raw = json.dumps([sort_by, value, record_id]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @staticmethod
+    def _decode_cursor(cursor: str, sort_by: str) -> tuple:
+        """Decode a cursor; raises ValueError if it is malformed or for another sort order"""
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            cursor_sort, value, record_id = json.loads(base64.urlsafe_b64decode(padded))
+        except Exception:
+            raise ValueError("Invalid cursor")
+
+        if cursor_sort != sort_by:
+            raise ValueError("Cursor was issued for a different sort order")
+
+        if sort_by == "score":
+            return float(value), int(record_id)
+        return datetime.fromisoformat(value), int(record_id)
+
+    @staticmethod
+    def _to_result(record: AnalysisRecord) -> SymmetryAnalysisResult:
+        """Rebuild the API model from a database row"""
+
+        if record.result_data:
+            return SymmetryAnalysisResult.model_validate(record.result_data)
+
+        # Rows written without the serialized payload
+        return SymmetryAnalysisResult(
+            analysis_id=record.analysis_id,
+            original_image_url=f"/uploads/{record.analysis_id}",
+            processed_image_url=f"/results/{record.analysis_id}_analyzed.jpg",
+            symmetry_score=record.symmetry_score,
+            detected_axes=record.detected_axes or [],
+            detected_regions=record.detected_regions or [],
+            has_vertical_symmetry=bool(record.has_vertical_symmetry),
+            has_horizontal_symmetry=bool(record.has_horizontal_symmetry),
+            has_radial_symmetry=bool(record.has_radial_symmetry),
+            processing_time=record.processing_time or 0.0,
+            timestamp=record.timestamp
+        )
+
+
+# Global instance (singleton)
+_store_instance = None
+
+
+def get_analysis_store() -> AnalysisStore:
+    """Get or create analysis store instance"""
+    global _store_instance
+
+    if _store_instance is None:
+        _store_instance = AnalysisStore()
+
+    return _store_instance
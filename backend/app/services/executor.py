@@ -0,0 +1,147 @@
+"""
+Analysis Executor
+Bounded worker pool that keeps CPU-heavy OpenCV/NumPy work off the asyncio event loop
+"""
+
+import asyncio
+import threading
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from app.core.config import settings
+
+
+class ExecutorBusyError(RuntimeError):
+    """Raised when the analysis queue is full"""
+
+
+class AnalysisExecutor:
+    """
+    Process or thread pool with a bounded number of in-flight jobs
+
+    At most ``max_workers`` jobs run at once and at most ``queue_size``
+    more wait for a free worker; anything beyond that is rejected
+    immediately with ExecutorBusyError instead of piling up in memory.
+    """
+
+    def __init__(self, kind: Optional[str] = None, max_workers: Optional[int] = None,
+                 queue_size: Optional[int] = None):
+        self.kind = (kind or settings.ANALYSIS_EXECUTOR).lower()
+        self.max_workers = max(1, max_workers or settings.ANALYSIS_WORKERS)
+        self.queue_size = max(0, settings.ANALYSIS_QUEUE_SIZE if queue_size is None else queue_size)
+
+        if self.kind not in ("process", "thread"):
+            raise ValueError(f"Unknown executor kind: {self.kind}")
+
+        self._pool: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of running plus queued jobs"""
+        return self.max_workers + self.queue_size
+
+    @property
+    def in_flight(self) -> int:
+        """Number of jobs currently running or queued"""
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of jobs waiting for a free worker"""
+        return max(0, self._in_flight - self.max_workers)
+
+    @property
+    def running(self) -> bool:
+        return self._pool is not None
+
+    def start(self) -> None:
+        """Create the underlying pool (idempotent)"""
+        with self._lock:
+            if self._pool is None:
+                self._pool = self._create_pool()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting work and release the pool"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=not wait)
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        """Run ``fn(*args)`` on the pool and await its result"""
+        self._acquire_slot()
+        try:
+            if self._pool is None:
+                self.start()
+
+            try:
+                future = self._pool.submit(fn, *args)
+            except BrokenExecutor:
+                # A worker died (e.g. OOM-killed); replace the pool and retry once
+                self._restart()
+                future = self._pool.submit(fn, *args)
+
+            return await asyncio.wrap_future(future)
+        finally:
+            self._release_slot()
+
+    def get_status(self) -> dict:
+        """Executor status for health reporting"""
+        return {
+            "kind": self.kind,
+            "running": self.running,
+            "workers": self.max_workers,
+            "in_flight": self._in_flight,
+            "queue_depth": self.queue_depth,
+            "capacity": self.capacity
+        }
+
+    def _create_pool(self) -> Executor:
+        if self.kind == "thread":
+            return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="analysis")
+        return ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker_process)
+
+    def _restart(self) -> None:
+        with self._lock:
+            old_pool, self._pool = self._pool, self._create_pool()
+
+        if old_pool is not None:
+            old_pool.shutdown(wait=False, cancel_futures=True)
+
+    def _acquire_slot(self) -> None:
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                raise ExecutorBusyError(
+                    f"Analysis queue is full ({self.capacity} jobs in flight)"
+                )
+            self._in_flight += 1
+
+    def _release_slot(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+
+def _init_worker_process() -> None:
+    """Per-process setup for pool workers"""
+    # Forked workers must not reuse the parent's pooled database connections
+    from app.models.database import dispose_engine
+    dispose_engine()
+
+    from app.core.profiling import start_sampler
+    start_sampler()
+
+
+# Global instance (singleton)
+_executor_instance = None
+
+
+def get_analysis_executor() -> AnalysisExecutor:
+    """Get or create the shared analysis executor"""
+    global _executor_instance
+
+    if _executor_instance is None:
+        _executor_instance = AnalysisExecutor()
+
+    return _executor_instance
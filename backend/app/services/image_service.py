@@ -1,62 +1,209 @@
+import hashlib
+import io
 import os
 import uuid
 import aiofiles
-from fastapi import UploadFile
-from PIL import Image
+from fastapi import HTTPException, UploadFile
+from PIL import ExifTags, Image
 import cv2
 import numpy as np
+from typing import Optional, Tuple
 from app.core.config import settings
+from app.core.security import (
+    SIGNATURE_BYTES, validate_file_size, validate_image_dimensions, validate_image_signature
+)
+from app.services.stats_service import get_stats_service
+from app.services.storage_service import StorageService
 from datetime import datetime
 
 
+class ImageTooLargeError(ValueError):
+    """Raised when an image header declares more than MAX_IMAGE_PIXELS pixels"""
+
+
 class ImageService:
     """Service for handling image file operations"""
 
+    CHUNK_SIZE = 1024 * 1024  # 1MB
+
+    # EXIF orientations the decoder applies as a quarter turn, swapping width and height
+    TRANSPOSING_ORIENTATIONS = (5, 6, 7, 8)
+
+    # cv2.imdecode flags decoding at 1/2^r scale (JPEG scales in the DCT, before the pixels are allocated)
+    REDUCED_COLOR_FLAGS = (
+        cv2.IMREAD_COLOR,
+        cv2.IMREAD_REDUCED_COLOR_2,
+        cv2.IMREAD_REDUCED_COLOR_4,
+        cv2.IMREAD_REDUCED_COLOR_8
+    )
+
     @staticmethod
     def generate_file_id() -> str:
         """Generate unique file ID"""
         return str(uuid.uuid4())
 
     @staticmethod
-    async def save_upload(file: UploadFile, content: bytes) -> dict:
-        """Save uploaded file and return metadata"""
+    async def save_upload(file: UploadFile) -> dict:
+        """
+        Stream an upload to disk and return its metadata
+
+        The body is copied CHUNK_SIZE bytes at a time; the per-file size
+        limit, the content hash and the format sniffing are all applied
+        while copying, so memory per request stays constant. The file only
+        appears under its final name once it is complete and valid.
+
+        By then the request body has been received and spooled: oversized
+        requests are refused earlier, as they arrive, by
+        UploadSizeLimitMiddleware (see app.core.security).
+        """
 
         # Generate unique filename
         file_id = ImageService.generate_file_id()
         file_ext = os.path.splitext(file.filename)[1]
         new_filename = f"{file_id}{file_ext}"
         file_path = os.path.join(settings.UPLOAD_DIR, new_filename)
+        partial_path = f"{file_path}.part"
+
+        hasher = ImageService.new_content_hasher()
+        header = b""
+        size = 0
+
+        try:
+            async with aiofiles.open(partial_path, 'wb') as f:
+                while True:
+                    chunk = await file.read(ImageService.CHUNK_SIZE)
+                    if not chunk:
+                        break
+
+                    size += len(chunk)
+                    validate_file_size(size)
 
-        # Save file asynchronously
-        async with aiofiles.open(file_path, 'wb') as f:
-            await f.write(content)
+                    if len(header) < SIGNATURE_BYTES:
+                        header += chunk[:SIGNATURE_BYTES - len(header)]
+                        if len(header) == SIGNATURE_BYTES:
+                            validate_image_signature(header)
+
+                    hasher.update(chunk)
+                    await f.write(chunk)
+
+            if len(header) < SIGNATURE_BYTES:
+                validate_image_signature(header)
+
+            # Pixel bombs are rejected from the header, before anything decodes them
+            try:
+                width, height = ImageService.get_image_dimensions(partial_path)
+            except Exception:
+                raise HTTPException(status_code=400, detail="Could not read image header")
+            validate_image_dimensions(width, height)
+
+            os.replace(partial_path, file_path)
+        except BaseException:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+
+        get_stats_service().record_file_written("uploads", file_path, None)
 
         return {
             "file_id": file_id,
             "filename": new_filename,
             "original_filename": file.filename,
             "file_path": file_path,
+            "content_hash": hasher.hexdigest(),
+            "size": size,
             "upload_time": datetime.now()
         }
 
+    @staticmethod
+    def new_content_hasher():
+        """Hasher used to content-address uploads"""
+        return hashlib.blake2b(digest_size=32)
+
     @staticmethod
     def load_image(file_path: str) -> np.ndarray:
         """Load image as numpy array"""
-        image = cv2.imread(file_path)
-        if image is None:
-            raise ValueError(f"Could not load image from {file_path}")
+        image, _ = ImageService.decode_image(ImageService.read_file(file_path))
         return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
 
     @staticmethod
-    def save_processed_image(image: np.ndarray, file_id: str, suffix: str = "_processed") -> str:
+    def read_file(file_path: str) -> bytes:
+        """Read a stored file's encoded bytes"""
+        with open(file_path, 'rb') as f:
+            return f.read()
+
+    @staticmethod
+    def read_header(data: bytes) -> Tuple[int, int, str]:
+        """
+        (width, height, format) from the image header, without decoding any pixels
+
+        The size is that of the decoded image: cv2.imdecode applies the EXIF
+        orientation, so quarter-turn orientations swap width and height.
+        """
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                if img.getexif().get(ExifTags.Base.Orientation) in ImageService.TRANSPOSING_ORIENTATIONS:
+                    return img.height, img.width, img.format
+                return img.width, img.height, img.format
+        except Image.DecompressionBombError as e:
+            raise ImageTooLargeError(str(e))
+        except Exception:
+            raise ValueError("Could not read image header")
+
+    @staticmethod
+    def decode_image(data: bytes, max_pixels: Optional[int] = None,
+                     target_width: Optional[int] = None) -> Tuple[np.ndarray, int]:
+        """
+        Decode an encoded image to BGR, once
+
+        The header is checked against MAX_IMAGE_PIXELS before any pixel
+        buffer is allocated. When the caller only needs ``max_pixels`` (or
+        an image at least ``target_width`` wide), JPEGs are decoded at 1/2,
+        1/4 or 1/8 scale by the decoder itself.
+
+        Returns:
+            (image, reduction): the image is the original halved
+            ``reduction`` times, with odd trailing rows/columns dropped like
+            AnalysisContext.pyramid, so coordinates scale by 2^reduction
+        """
+
+        width, height, image_format = ImageService.read_header(data)
+        if width * height > settings.MAX_IMAGE_PIXELS:
+            raise ImageTooLargeError(
+                f"Image is {width}x{height} pixels, above the {settings.MAX_IMAGE_PIXELS} pixel limit"
+            )
+
+        reduction = 0
+        if image_format == "JPEG":
+            while reduction < len(ImageService.REDUCED_COLOR_FLAGS) - 1:
+                if target_width is not None:
+                    if width >> (reduction + 1) < target_width:
+                        break
+                elif not max_pixels or (width >> reduction) * (height >> reduction) <= max_pixels:
+                    break
+                reduction += 1
+
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), ImageService.REDUCED_COLOR_FLAGS[reduction])
+        if image is None:
+            raise ValueError("Could not decode image")
+
+        if reduction:
+            image = image[:height >> reduction, :width >> reduction]
+
+        return image, reduction
+
+    @staticmethod
+    def save_processed_image(image: np.ndarray, file_id: str, suffix: str = "_processed",
+                             bgr: bool = False) -> str:
         """Save processed image and return path"""
 
         filename = f"{file_id}{suffix}.jpg"
         file_path = os.path.join(settings.RESULTS_DIR, filename)
 
         # Convert RGB back to BGR for OpenCV
-        image_bgr = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+        previous_size = ImageService.get_existing_size(file_path)
+        image_bgr = image if bgr else cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
         cv2.imwrite(file_path, image_bgr)
+        get_stats_service().record_file_written("results", file_path, previous_size)
 
         return file_path
 
@@ -71,15 +218,36 @@ class ImageService:
         """Create thumbnail and return path"""
 
         file_id = os.path.splitext(os.path.basename(file_path))[0]
+        image, _ = ImageService.decode_image(ImageService.read_file(file_path), size[0] * size[1])
+        return ImageService.save_thumbnail(image, file_id, size)
+
+    @staticmethod
+    def save_thumbnail(image: np.ndarray, file_id: str, size: tuple = (300, 300)) -> str:
+        """Save a thumbnail of an already decoded BGR image and return path"""
+
         thumb_filename = f"{file_id}_thumb.jpg"
         thumb_path = os.path.join(settings.RESULTS_DIR, thumb_filename)
 
-        with Image.open(file_path) as img:
-            img.thumbnail(size, Image.Resampling.LANCZOS)
-            img.save(thumb_path, "JPEG")
+        # Fit within ``size`` keeping the aspect ratio, never enlarging (like PIL's thumbnail)
+        h, w = image.shape[:2]
+        scale = min(size[0] / w, size[1] / h, 1.0)
+        thumb_size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        thumbnail = cv2.resize(image, thumb_size, interpolation=cv2.INTER_AREA) if scale < 1.0 else image
+
+        previous_size = ImageService.get_existing_size(thumb_path)
+        cv2.imwrite(thumb_path, thumbnail)
+        get_stats_service().record_file_written("results", thumb_path, previous_size)
 
         return thumb_path
 
+    @staticmethod
+    def get_existing_size(file_path: str) -> Optional[int]:
+        """Size of ``file_path`` in bytes, or None if it does not exist"""
+        try:
+            return os.path.getsize(file_path)
+        except OSError:
+            return None
+
     @staticmethod
     def cleanup_old_files(days: int = 7) -> int:
         """Remove files older than specified days"""
@@ -88,22 +256,23 @@ class ImageService:
         current_time = datetime.now().timestamp()
         max_age = days * 24 * 60 * 60  # Convert days to seconds
 
-        for directory in [settings.UPLOAD_DIR, settings.RESULTS_DIR]:
+        for key, directory in [("uploads", settings.UPLOAD_DIR), ("results", settings.RESULTS_DIR)]:
             for filename in os.listdir(directory):
                 file_path = os.path.join(directory, filename)
                 file_age = current_time - os.path.getmtime(file_path)
 
                 if file_age > max_age:
-                    os.remove(file_path)
+                    StorageService.remove_file(key, file_path)
                     count += 1
 
         return count
 
     @staticmethod
-    def draw_symmetry_axis(image: np.ndarray, axis_data: dict) -> np.ndarray:
-        """Draw symmetry axis on image"""
+    def draw_symmetry_axis(image: np.ndarray, axis_data: dict, color: tuple = (255, 0, 0),
+                           in_place: bool = False) -> np.ndarray:
+        """Draw symmetry axis on image (red in RGB by default; pass (0, 0, 255) for BGR)"""
 
-        img_copy = image.copy()
+        img_copy = image if in_place else image.copy()
         coords = axis_data["coordinates"]
 
         # Draw line
@@ -111,7 +280,7 @@ class ImageService:
             img_copy,
             (int(coords["x1"]), int(coords["y1"])),
             (int(coords["x2"]), int(coords["y2"])),
-            color=(255, 0, 0),  # Red color
+            color=color,
             thickness=3
         )
 
@@ -123,8 +292,8 @@ class ImageService:
             (int(coords["x1"]) + 10, int(coords["y1"]) + 30),
             cv2.FONT_HERSHEY_SIMPLEX,
             0.7,
-            (255, 0, 0),
+            color,
             2
         )
 
-        return img_copy
\ No newline at end of file
+        return img_copy
@@ -0,0 +1,302 @@
+"""
+Job Queue
+Durable queue of analysis jobs in the jobs table (no external broker)
+
+Workers claim the oldest job with a single UPDATE ... RETURNING, so two
+workers can never take the same job. A claim is a lease: the worker
+renews it while the analysis runs, and if the worker dies the lease lapses
+and the next claim picks the job up again, up to JOB_MAX_ATTEMPTS times.
+Jobs are consumed by `python -m app.worker` processes and, unless
+JOB_EMBEDDED_WORKERS is 0, by consumers inside the API process that feed
+the analysis executor.
+"""
+
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import and_, func, or_, select, update
+from app.core.config import settings
+from app.models.database import AnalysisJob, SessionLocal, ensure_db
+from app.models.schemas import JobStatus, SymmetryAnalysisResult
+from app.services.executor import ExecutorBusyError, get_analysis_executor
+
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+
+class JobQueue:
+    """Enqueue, claim and settle analysis jobs"""
+
+    def __init__(self, session_factory=SessionLocal, lease_seconds: Optional[int] = None,
+                 max_attempts: Optional[int] = None):
+        self.session_factory = session_factory
+        self.lease_seconds = lease_seconds or settings.JOB_LEASE_SECONDS
+        self.max_attempts = max_attempts or settings.JOB_MAX_ATTEMPTS
+        self._consumers: List[asyncio.Task] = []
+
+    @staticmethod
+    def ensure_schema() -> None:
+        """Create tables once per process"""
+        ensure_db()
+
+    def enqueue(self, job_id: str, file_path: str, original_filename: Optional[str] = None,
+                content_hash: Optional[str] = None) -> JobStatus:
+        """Queue an analysis of the stored upload at ``file_path``"""
+
+        self.ensure_schema()
+
+        with self.session_factory() as db:
+            job = AnalysisJob(
+                id=job_id,
+                status="queued",
+                file_path=file_path,
+                original_filename=original_filename,
+                content_hash=content_hash,
+                attempts=0,
+                created_at=datetime.utcnow()
+            )
+            db.add(job)
+            db.commit()
+            return self._to_status(job)
+
+    def claim(self, worker_id: str) -> Optional[dict]:
+        """
+        Atomically take the oldest queued (or lease-expired) job
+
+        Returns:
+            The job's id, file_path, original_filename, content_hash and
+            attempts, or None if nothing is claimable
+        """
+
+        self.ensure_schema()
+        now = datetime.utcnow()
+        expired = and_(AnalysisJob.status == "running", AnalysisJob.lease_expires_at < now)
+
+        with self.session_factory() as db:
+            # A lease that lapsed on the last allowed attempt fails the job instead of retrying it
+            db.execute(
+                update(AnalysisJob)
+                .where(expired, AnalysisJob.attempts >= self.max_attempts)
+                .values(status="failed", error="Worker stopped responding", worker_id=None,
+                        lease_expires_at=None, finished_at=now),
+                execution_options={"synchronize_session": False}
+            )
+
+            claimable = or_(AnalysisJob.status == "queued", expired)
+            candidate = (
+                select(AnalysisJob.id)
+                .where(claimable)
+                .order_by(AnalysisJob.created_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            row = db.execute(
+                update(AnalysisJob)
+                .where(AnalysisJob.id == candidate, claimable)
+                .values(
+                    status="running",
+                    worker_id=worker_id,
+                    attempts=AnalysisJob.attempts + 1,
+                    started_at=now,
+                    lease_expires_at=now + timedelta(seconds=self.lease_seconds)
+                )
+                .returning(
+                    AnalysisJob.id, AnalysisJob.file_path, AnalysisJob.original_filename,
+                    AnalysisJob.content_hash, AnalysisJob.attempts
+                ),
+                execution_options={"synchronize_session": False}
+            ).first()
+            db.commit()
+
+        if row is None:
+            return None
+
+        return {
+            "job_id": row.id,
+            "file_path": row.file_path,
+            "original_filename": row.original_filename,
+            "content_hash": row.content_hash,
+            "attempts": row.attempts
+        }
+
+    def renew(self, job_id: str, worker_id: str) -> bool:
+        """Extend the lease on a running job; False if the worker no longer holds it"""
+        lease = datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+        return self._settle(job_id, worker_id, {"lease_expires_at": lease})
+
+    def complete(self, job_id: str, worker_id: str, result: SymmetryAnalysisResult) -> bool:
+        """Store the result of a running job; False if its lease was lost to another worker"""
+        return self._settle(job_id, worker_id, {
+            "status": "succeeded",
+            "result_data": result.model_dump(mode="json"),
+            "error": None,
+            "worker_id": None,
+            "lease_expires_at": None,
+            "finished_at": datetime.utcnow()
+        })
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        """Record a failed attempt: requeue the job, or fail it after the last attempt"""
+
+        self.ensure_schema()
+
+        with self.session_factory() as db:
+            job = db.get(AnalysisJob, job_id)
+            if job is None or job.status != "running" or job.worker_id != worker_id:
+                return False
+
+            job.error = error
+            job.worker_id = None
+            job.lease_expires_at = None
+            if job.attempts >= self.max_attempts:
+                job.status = "failed"
+                job.finished_at = datetime.utcnow()
+            else:
+                job.status = "queued"
+            db.commit()
+
+        return True
+
+    def release(self, job_id: str, worker_id: str) -> bool:
+        """Hand a claimed job back without counting the attempt (e.g. on shutdown)"""
+        return self._settle(job_id, worker_id, {
+            "status": "queued",
+            "attempts": AnalysisJob.attempts - 1,
+            "worker_id": None,
+            "lease_expires_at": None
+        })
+
+    def get(self, job_id: str) -> Optional[JobStatus]:
+        """Current state of a job, with its result once it has succeeded"""
+
+        self.ensure_schema()
+
+        with self.session_factory() as db:
+            job = db.get(AnalysisJob, job_id)
+            return self._to_status(job) if job is not None else None
+
+    def get_stats(self) -> dict:
+        """Number of jobs per status"""
+
+        self.ensure_schema()
+
+        with self.session_factory() as db:
+            rows = db.query(AnalysisJob.status, func.count(AnalysisJob.id)).group_by(AnalysisJob.status).all()
+
+        return {status: count for status, count in rows}
+
+    def start_consumers(self, count: Optional[int] = None) -> None:
+        """Start embedded consumers on the running event loop (idempotent)"""
+
+        if self._consumers:
+            return
+
+        count = settings.JOB_EMBEDDED_WORKERS if count is None else count
+        prefix = f"{socket.gethostname()}:{os.getpid()}:embedded"
+        self._consumers = [
+            asyncio.create_task(self._consume(f"{prefix}-{i}")) for i in range(max(0, count))
+        ]
+
+    async def stop_consumers(self) -> None:
+        """Cancel embedded consumers; their claimed jobs go back to the queue"""
+
+        consumers, self._consumers = self._consumers, []
+        for task in consumers:
+            task.cancel()
+        await asyncio.gather(*consumers, return_exceptions=True)
+
+    async def _consume(self, worker_id: str) -> None:
+        """Claim jobs while the analysis executor has room and run them there"""
+        from app.services.symmetry_service import run_analysis
+
+        executor = get_analysis_executor()
+
+        while True:
+            job = None
+            if executor.in_flight < executor.capacity:
+                job = await asyncio.to_thread(self.claim, worker_id)
+
+            if job is None:
+                await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+                continue
+
+            job_id = job["job_id"]
+            renewer = asyncio.create_task(self._renew_periodically(job_id, worker_id))
+
+            try:
+                result = await executor.run(
+                    run_analysis, job["file_path"], job_id, job["original_filename"], job["content_hash"]
+                )
+            except ExecutorBusyError:
+                # The executor filled up between the check and the claim
+                await asyncio.to_thread(self.release, job_id, worker_id)
+                await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+                continue
+            except asyncio.CancelledError:
+                await asyncio.to_thread(self.release, job_id, worker_id)
+                raise
+            except Exception as e:
+                print(f"⚠️  Job {job_id} failed: {e}")
+                await asyncio.to_thread(self.fail, job_id, worker_id, str(e))
+                continue
+            finally:
+                renewer.cancel()
+
+            await asyncio.to_thread(self.complete, job_id, worker_id, result)
+
+    async def _renew_periodically(self, job_id: str, worker_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not await asyncio.to_thread(self.renew, job_id, worker_id):
+                return
+
+    def _settle(self, job_id: str, worker_id: str, values: dict) -> bool:
+        """Update a running job only if ``worker_id`` still holds its lease"""
+
+        self.ensure_schema()
+
+        with self.session_factory() as db:
+            updated = db.execute(
+                update(AnalysisJob)
+                .where(
+                    AnalysisJob.id == job_id,
+                    AnalysisJob.status == "running",
+                    AnalysisJob.worker_id == worker_id
+                )
+                .values(values),
+                execution_options={"synchronize_session": False}
+            ).rowcount
+            db.commit()
+
+        return updated > 0
+
+    @staticmethod
+    def _to_status(job: AnalysisJob) -> JobStatus:
+        """Build the API model from a database row"""
+        return JobStatus(
+            job_id=job.id,
+            status=job.status,
+            attempts=job.attempts or 0,
+            error=job.error,
+            created_at=job.created_at,
+            started_at=job.started_at,
+            finished_at=job.finished_at,
+            result=SymmetryAnalysisResult.model_validate(job.result_data) if job.result_data else None
+        )
+
+
+# Global instance (singleton)
+_queue_instance = None
+
+
+def get_job_queue() -> JobQueue:
+    """Get or create job queue instance"""
+    global _queue_instance
+
+    if _queue_instance is None:
+        _queue_instance = JobQueue()
+
+    return _queue_instance
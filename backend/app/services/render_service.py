@@ -0,0 +1,118 @@
+"""
+Render Service
+Annotated result images, drawn on request from the persisted axes
+
+Nothing is rendered while analyzing: /results/{id}_analyzed.jpg decodes the
+original upload (at reduced scale for small widths), draws every stored
+axis in one in-place pass and keeps the encoded JPEG in a byte-budgeted
+in-memory LRU.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+import cv2
+from app.core.config import settings
+from app.services.image_service import ImageService
+
+
+JPEG_QUALITY = 90
+
+
+def render_annotated(image_path: str, axes: List[dict], width: Optional[int] = None) -> bytes:
+    """
+    Draw ``axes`` (original image coordinates) over the image at ``image_path``
+
+    Module-level so it can be pickled into analysis worker processes.
+
+    Args:
+        image_path: Stored original upload
+        axes: SymmetryAxis dicts
+        width: Output width in pixels; None (or larger than the image) for full size
+
+    Returns:
+        JPEG bytes
+    """
+
+    data = ImageService.read_file(image_path)
+    header_width, _, _ = ImageService.read_header(data)
+    target_width = min(width, header_width) if width else None
+
+    image, reduction = ImageService.decode_image(data, target_width=target_width)
+    del data
+
+    # Axes are in the coordinates of the decoded (EXIF-rotated) image at full size
+    original_width = header_width if reduction else image.shape[1]
+
+    if target_width is not None and target_width < image.shape[1]:
+        height = max(1, round(image.shape[0] * target_width / image.shape[1]))
+        image = cv2.resize(image, (target_width, height), interpolation=cv2.INTER_AREA)
+
+    scale = image.shape[1] / original_width
+    for axis in axes:
+        scaled = dict(axis, coordinates={key: value * scale for key, value in axis["coordinates"].items()})
+        ImageService.draw_symmetry_axis(image, scaled, color=(0, 0, 255), in_place=True)
+
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    if not ok:
+        raise ValueError(f"Could not encode annotated image for {image_path}")
+
+    return encoded.tobytes()
+
+
+class RenderCache:
+    """In-memory LRU of rendered images, bounded by total bytes"""
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = settings.RENDER_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._entries: "OrderedDict[Tuple, bytes]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[bytes]:
+        """Return the cached image for ``key`` and mark it recently used"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Tuple, value: bytes) -> None:
+        """Store ``value``, evicting least recently used entries if over budget"""
+        if len(value) > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= len(old)
+
+            self._entries[key] = value
+            self._total_bytes += len(value)
+
+            while self._total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= len(evicted)
+
+    def get_stats(self) -> dict:
+        """Entry count and bytes used"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "total_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+
+# Global instance (singleton)
+_cache_instance = None
+
+
+def get_render_cache() -> RenderCache:
+    """Get or create render cache instance"""
+    global _cache_instance
+
+    if _cache_instance is None:
+        _cache_instance = RenderCache()
+
+    return _cache_instance
@@ -0,0 +1,148 @@
+"""
+Result Cache
+Content-addressed detection cache keyed by image hash and detector signature.
+Backed by a SQLite file in WAL mode so every uvicorn worker and analysis
+process on the host shares the same entries.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Sequence
+from app.core.config import settings
+from app.ml.detector import SymmetryDetector
+
+
+class ResultCache:
+    """Size-bounded LRU cache of detection results stored on disk"""
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.path = path or settings.RESULT_CACHE_PATH
+        self.max_bytes = max_bytes or settings.RESULT_CACHE_MAX_BYTES
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    @staticmethod
+    def make_key(content_hash: str, detectors: Optional[Sequence[str]] = None) -> str:
+        """Cache key for an image hash under the current detector signature (and detector selection, if partial)"""
+        key = f"{content_hash}:{SymmetryDetector.get_signature()}"
+        return f"{key}:{','.join(detectors)}" if detectors else key
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the cached payload for ``key`` and mark it recently used"""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+
+        return json.loads(row[0])
+
+    def put(self, key: str, payload: dict) -> None:
+        """Store ``payload`` under ``key``, evicting least recently used entries if over budget"""
+        value = json.dumps(payload)
+        size = len(value.encode())
+
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                old = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                    (key, value, size, time.time())
+                )
+                delta = size - (old[0] if old else 0)
+                conn.execute("UPDATE meta SET total_bytes = total_bytes + ?", (delta,))
+                self._evict(conn)
+
+    def clear(self) -> None:
+        """Drop every cached entry"""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM entries")
+                conn.execute("UPDATE meta SET total_bytes = 0")
+
+    def get_stats(self) -> dict:
+        """Entry count and bytes used"""
+        with self._lock:
+            conn = self._connect()
+            count = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            total = conn.execute("SELECT total_bytes FROM meta").fetchone()[0]
+
+        return {
+            "entries": count,
+            "total_bytes": total,
+            "max_bytes": self.max_bytes,
+            "signature": SymmetryDetector.get_signature()
+        }
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT total_bytes FROM meta").fetchone()[0]
+
+        while total > self.max_bytes:
+            rows = conn.execute(
+                "SELECT key, size FROM entries ORDER BY last_access LIMIT 64"
+            ).fetchall()
+            if not rows:
+                break
+
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                total -= size
+
+        conn.execute("UPDATE meta SET total_bytes = ?", (max(total, 0),))
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections must not cross a fork, so reconnect in child processes
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (id INTEGER PRIMARY KEY CHECK (id = 0), total_bytes INTEGER NOT NULL)"
+        )
+        conn.execute("INSERT OR IGNORE INTO meta (id, total_bytes) VALUES (0, 0)")
+
+        self._conn = conn
+        self._pid = os.getpid()
+        return conn
+
+
+# Global instance (singleton)
+_cache_instance = None
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Get or create the result cache (None when disabled)"""
+    global _cache_instance
+
+    if not settings.RESULT_CACHE_ENABLED:
+        return None
+
+    if _cache_instance is None:
+        _cache_instance = ResultCache()
+
+    return _cache_instance
@@ -0,0 +1,228 @@
+"""
+Stats Service
+Incrementally maintained gallery and storage statistics.
+
+Aggregates are updated whenever an analysis or file is written or deleted,
+so reads are a single-row lookup. reconcile() rebuilds them from the
+analyses table and the storage directories when they may have drifted
+(e.g. files changed outside the app).
+"""
+
+import os
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import case, func
+from sqlalchemy.exc import IntegrityError
+from app.core.config import settings
+from app.models.database import AnalysisRecord, GalleryStats, SessionLocal, StorageUsage, ensure_db
+
+
+STATS_ROW_ID = 0
+
+
+def storage_directories() -> Dict[str, str]:
+    """Tracked directory keys and their paths"""
+    return {
+        "uploads": settings.UPLOAD_DIR,
+        "results": settings.RESULTS_DIR
+    }
+
+
+class StatsService:
+    """Read and maintain running aggregates"""
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._initialized = False
+
+    # Score aggregates (called inside the AnalysisStore transaction)
+
+    @staticmethod
+    def apply_score_change(db, added: Optional[float] = None, removed: Optional[float] = None) -> None:
+        """Fold one inserted and/or removed score into the aggregates"""
+
+        stats = GalleryStats
+        count_delta = (1 if added is not None else 0) - (1 if removed is not None else 0)
+        sum_delta = (added or 0.0) - (removed or 0.0)
+
+        values = {
+            stats.analysis_count: stats.analysis_count + count_delta,
+            stats.score_sum: stats.score_sum + sum_delta,
+            stats.updated_at: datetime.utcnow()
+        }
+
+        if added is not None:
+            values[stats.score_min] = case(
+                ((stats.score_min.is_(None)) | (stats.score_min > added), added),
+                else_=stats.score_min
+            )
+            values[stats.score_max] = case(
+                ((stats.score_max.is_(None)) | (stats.score_max < added), added),
+                else_=stats.score_max
+            )
+
+        db.query(stats).filter(stats.id == STATS_ROW_ID).update(values, synchronize_session=False)
+
+        if removed is not None:
+            row = db.query(stats.score_min, stats.score_max).filter(stats.id == STATS_ROW_ID).first()
+            # Only an extreme value needs the (index-backed) min/max lookup
+            if row is not None and (row.score_min == removed or row.score_max == removed):
+                low, high = db.query(
+                    func.min(AnalysisRecord.symmetry_score),
+                    func.max(AnalysisRecord.symmetry_score)
+                ).filter(AnalysisRecord.complete.is_(True)).one()
+                db.query(stats).filter(stats.id == STATS_ROW_ID).update(
+                    {stats.score_min: low, stats.score_max: high},
+                    synchronize_session=False
+                )
+
+    # Storage aggregates
+
+    def record_file_change(self, directory: str, bytes_delta: int, files_delta: int = 0) -> None:
+        """Adjust the running totals of a tracked directory ("uploads" or "results")"""
+
+        if not bytes_delta and not files_delta:
+            return
+
+        try:
+            ensure_db()
+            with self.session_factory() as db:
+                updated = db.query(StorageUsage).filter(StorageUsage.directory == directory).update(
+                    {
+                        StorageUsage.bytes_used: StorageUsage.bytes_used + bytes_delta,
+                        StorageUsage.file_count: StorageUsage.file_count + files_delta
+                    },
+                    synchronize_session=False
+                )
+                db.commit()
+
+            # No totals yet: build them from disk, which already reflects this change
+            if not updated:
+                self.reconcile()
+                self._initialized = True
+        except Exception as e:
+            print(f"Failed to update storage stats for {directory}: {e}")
+
+    def record_file_written(self, directory: str, file_path: str, previous_size: Optional[int]) -> None:
+        """Account for a file that was just created or overwritten"""
+
+        size = os.path.getsize(file_path)
+        if previous_size is None:
+            self.record_file_change(directory, size, 1)
+        else:
+            self.record_file_change(directory, size - previous_size, 0)
+
+    def record_file_removed(self, directory: str, size: int) -> None:
+        """Account for a deleted file"""
+        self.record_file_change(directory, -size, -1)
+
+    # Reads
+
+    def get_gallery_stats(self) -> dict:
+        """Score aggregates and results-directory usage"""
+
+        self.ensure_initialized()
+
+        with self.session_factory() as db:
+            stats = db.get(GalleryStats, STATS_ROW_ID)
+            results = db.get(StorageUsage, "results")
+
+            count = stats.analysis_count if stats else 0
+            return {
+                "total_analyses": count,
+                "average_score": round(stats.score_sum / count, 2) if count else 0,
+                "highest_score": stats.score_max if count else 0,
+                "lowest_score": stats.score_min if count else 0,
+                "storage_used_mb": (results.bytes_used if results else 0) / (1024 * 1024)
+            }
+
+    def get_storage_usage(self) -> Dict[str, dict]:
+        """Bytes and file counts per tracked directory"""
+
+        self.ensure_initialized()
+
+        with self.session_factory() as db:
+            rows = db.query(StorageUsage).all()
+            return {
+                row.directory: {"bytes_used": row.bytes_used, "file_count": row.file_count}
+                for row in rows
+            }
+
+    # Maintenance
+
+    def ensure_initialized(self) -> None:
+        """Build aggregates on first use (e.g. right after upgrading an existing install)"""
+
+        if self._initialized:
+            return
+
+        ensure_db()
+        with self.session_factory() as db:
+            initialized = db.get(GalleryStats, STATS_ROW_ID) is not None
+
+        if not initialized:
+            self.reconcile()
+
+        self._initialized = True
+
+    def reconcile(self) -> dict:
+        """Rebuild every aggregate from the (complete) analyses and the directories on disk"""
+
+        ensure_db()
+
+        usage = {}
+        for key, path in storage_directories().items():
+            total = 0
+            files = 0
+            if os.path.exists(path):
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            total += entry.stat().st_size
+                            files += 1
+            usage[key] = (total, files)
+
+        count = 0
+        try:
+            with self.session_factory() as db:
+                count, score_sum, low, high = db.query(
+                    func.count(AnalysisRecord.id),
+                    func.coalesce(func.sum(AnalysisRecord.symmetry_score), 0.0),
+                    func.min(AnalysisRecord.symmetry_score),
+                    func.max(AnalysisRecord.symmetry_score)
+                ).filter(AnalysisRecord.complete.is_(True)).one()
+
+                db.merge(GalleryStats(
+                    id=STATS_ROW_ID,
+                    analysis_count=count,
+                    score_sum=score_sum,
+                    score_min=low,
+                    score_max=high,
+                    updated_at=datetime.utcnow()
+                ))
+                for key, (total, files) in usage.items():
+                    db.merge(StorageUsage(directory=key, bytes_used=total, file_count=files))
+
+                db.commit()
+        except IntegrityError:
+            # Another process initialized the rows concurrently; its totals are equivalent
+            pass
+
+        return {
+            "analyses": count,
+            "storage": {key: {"bytes_used": total, "file_count": files} for key, (total, files) in usage.items()}
+        }
+
+
+# Global instance (singleton)
+_stats_instance = None
+
+
+def get_stats_service() -> StatsService:
+    """Get or create stats service instance"""
+    global _stats_instance
+
+    if _stats_instance is None:
+        _stats_instance = StatsService()
+
+    return _stats_instance
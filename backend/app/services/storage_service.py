@@ -3,6 +3,7 @@ import shutil
 from typing import List, Dict
 from datetime import datetime, timedelta
 from app.core.config import settings
+from app.services.stats_service import get_stats_service
 
 
 class StorageService:
@@ -10,28 +11,16 @@ class StorageService:
 
     @staticmethod
     def get_storage_stats() -> Dict:
-        """Get storage statistics"""
+        """Get storage statistics (from running totals, no directory scan)"""
 
-        upload_size = 0
-        results_size = 0
-        upload_count = 0
-        results_count = 0
+        usage = get_stats_service().get_storage_usage()
+        uploads = usage.get("uploads", {"bytes_used": 0, "file_count": 0})
+        results = usage.get("results", {"bytes_used": 0, "file_count": 0})
 
-        # Calculate uploads directory size
-        if os.path.exists(settings.UPLOAD_DIR):
-            for filename in os.listdir(settings.UPLOAD_DIR):
-                filepath = os.path.join(settings.UPLOAD_DIR, filename)
-                if os.path.isfile(filepath):
-                    upload_size += os.path.getsize(filepath)
-                    upload_count += 1
-
-        # Calculate results directory size
-        if os.path.exists(settings.RESULTS_DIR):
-            for filename in os.listdir(settings.RESULTS_DIR):
-                filepath = os.path.join(settings.RESULTS_DIR, filename)
-                if os.path.isfile(filepath):
-                    results_size += os.path.getsize(filepath)
-                    results_count += 1
+        upload_size = uploads["bytes_used"]
+        results_size = results["bytes_used"]
+        upload_count = uploads["file_count"]
+        results_count = results["file_count"]
 
         total_size = upload_size + results_size
 
@@ -45,6 +34,14 @@ class StorageService:
             "total_files": upload_count + results_count
         }
 
+    @staticmethod
+    def remove_file(directory: str, file_path: str) -> None:
+        """Delete a tracked file and update the storage totals"""
+
+        size = os.path.getsize(file_path)
+        os.remove(file_path)
+        get_stats_service().record_file_removed(directory, size)
+
     @staticmethod
     def cleanup_old_files(days: int = 7) -> Dict:
         """Remove files older than specified days"""
@@ -53,7 +50,7 @@ class StorageService:
         max_age = timedelta(days=days)
         deleted_files = []
 
-        for directory in [settings.UPLOAD_DIR, settings.RESULTS_DIR]:
+        for key, directory in [("uploads", settings.UPLOAD_DIR), ("results", settings.RESULTS_DIR)]:
             if not os.path.exists(directory):
                 continue
 
@@ -69,7 +66,7 @@ class StorageService:
 
                 if file_age > max_age:
                     try:
-                        os.remove(filepath)
+                        StorageService.remove_file(key, filepath)
                         deleted_files.append({
                             "filename": filename,
                             "directory": directory,
@@ -94,7 +91,7 @@ class StorageService:
         for ext in ['.jpg', '.jpeg', '.png', '.bmp']:
             upload_path = os.path.join(settings.UPLOAD_DIR, f"{file_id}{ext}")
             if os.path.exists(upload_path):
-                os.remove(upload_path)
+                StorageService.remove_file("uploads", upload_path)
                 deleted.append(upload_path)
 
         # Delete from results
@@ -107,7 +104,7 @@ class StorageService:
         for pattern in result_patterns:
             result_path = os.path.join(settings.RESULTS_DIR, pattern)
             if os.path.exists(result_path):
-                os.remove(result_path)
+                StorageService.remove_file("results", result_path)
                 deleted.append(result_path)
 
         return {
@@ -162,12 +159,12 @@ class StorageService:
 
         deleted_count = 0
 
-        for directory in [settings.UPLOAD_DIR, settings.RESULTS_DIR]:
+        for key, directory in [("uploads", settings.UPLOAD_DIR), ("results", settings.RESULTS_DIR)]:
             if os.path.exists(directory):
                 for filename in os.listdir(directory):
                     filepath = os.path.join(directory, filename)
                     if os.path.isfile(filepath):
-                        os.remove(filepath)
+                        StorageService.remove_file(key, filepath)
                         deleted_count += 1
 
         return {
@@ -6,6 +6,12 @@ High-level service for symmetry detection operations
 import numpy as np
 import cv2
 from typing import Dict, List, Tuple
+from app.ml.batch import (
+    batch_diagonal_mirror_ncc, batch_mean_absdiff, batch_mirror_ncc, batch_resize, batch_warp_affine
+)
+from app.ml.cascade import DetectionCascade
+from app.ml.context import AnalysisContext
+from app.core.config import settings
 from app.ml.detector import SymmetryDetector
 from app.ml.preprocessor import ImagePreprocessor
 
@@ -20,27 +26,32 @@ class SymmetryDetectorService:
         self.detector = SymmetryDetector()
         self.preprocessor = ImagePreprocessor()
 
-    def detect_all_symmetries(self, image: np.ndarray) -> Dict:
+    def detect_all_symmetries(self, image: np.ndarray, use_cascade: bool = True) -> Dict:
         """
         Detect all types of symmetry in an image
 
         Args:
             image: Input image as numpy array (RGB)
+            use_cascade: Let SYMMETRY_CASCADE prune detectors; False runs every detector in full
 
         Returns:
             Dictionary containing all symmetry detection results
         """
 
+        context = AnalysisContext.ensure(image)
+
         results = {
             "vertical": {},
             "horizontal": {},
             "diagonal": [],
+            "reflection": [],
             "radial": {},
+            "pruned_detectors": [],  # Answered from a low-resolution probe (SYMMETRY_CASCADE)
             "overall_score": 0.0
         }
 
         # Detect vertical symmetry
-        has_vert, vert_conf, vert_coords = self.detector.detect_vertical_symmetry(image)
+        has_vert, vert_conf, vert_coords = self.detector.detect_vertical_symmetry(context)
         results["vertical"] = {
             "detected": has_vert,
             "confidence": float(vert_conf),
@@ -48,15 +59,43 @@ class SymmetryDetectorService:
         }
 
         # Detect horizontal symmetry
-        has_horiz, horiz_conf, horiz_coords = self.detector.detect_horizontal_symmetry(image)
+        has_horiz, horiz_conf, horiz_coords = self.detector.detect_horizontal_symmetry(context)
         results["horizontal"] = {
             "detected": has_horiz,
             "confidence": float(horiz_conf),
             "coordinates": horiz_coords
         }
 
+        # Detect reflection axes at arbitrary angles
+        if settings.SYMMETRY_ANGLE_SWEEP:
+            sweep_results = self.detector.detect_reflection_axes(
+                context, angle_step=settings.SYMMETRY_ANGLE_STEP
+            )
+            for has_axis, axis_conf, axis_coords, axis_angle in sweep_results:
+                if has_axis and not self.detector.is_fixed_axis_angle(axis_angle):
+                    results["reflection"].append({
+                        "angle": float(axis_angle),
+                        "detected": has_axis,
+                        "confidence": float(axis_conf),
+                        "coordinates": axis_coords
+                    })
+
+        # Probe diagonal and radial symmetry; prune full runs that can't move the score
+        cascade = None
+        if settings.SYMMETRY_CASCADE and use_cascade:
+            cascade = DetectionCascade(context, ("diagonal", "radial"))
+            results["pruned_detectors"] = cascade.plan(
+                vert_conf if has_vert else 0.0,
+                horiz_conf if has_horiz else 0.0,
+                [axis["confidence"] for axis in results["reflection"]]
+            )
+        pruned = results["pruned_detectors"]
+
         # Detect diagonal symmetry
-        diagonal_results = self.detector.detect_diagonal_symmetry(image)
+        if "diagonal" in pruned:
+            diagonal_results = [result for result in cascade.diagonal() if result[0]]
+        else:
+            diagonal_results = self.detector.detect_diagonal_symmetry(context)
         for has_diag, diag_conf, diag_coords, diag_type in diagonal_results:
             results["diagonal"].append({
                 "type": diag_type,
@@ -65,15 +104,31 @@ class SymmetryDetectorService:
                 "coordinates": diag_coords
             })
 
+        # Diagonal had its full run: judge radial against the diagonal value the score uses
+        if cascade is not None and not pruned and "diagonal" in cascade.stages:
+            pruned = results["pruned_detectors"] = cascade.plan(
+                vert_conf if has_vert else 0.0,
+                horiz_conf if has_horiz else 0.0,
+                [axis["confidence"] for axis in results["reflection"]],
+                exact={"diagonal": [diag["confidence"] for diag in results["diagonal"]]}
+            )
+
         # Detect radial symmetry
-        has_radial, radial_conf = self.detector.detect_radial_symmetry(image)
+        if "radial" in pruned:
+            has_radial, radial_conf, radial_order = cascade.radial()
+        elif settings.SYMMETRY_RADIAL_MODE == "polar":
+            has_radial, radial_conf, radial_order = self.detector.detect_radial_order(context)
+        else:
+            has_radial, radial_conf = self.detector.detect_radial_symmetry(context)
+            radial_order = None
         results["radial"] = {
             "detected": has_radial,
-            "confidence": float(radial_conf)
+            "confidence": float(radial_conf),
+            "order": radial_order
         }
 
         # Calculate overall score
-        diagonal_confs = [d["confidence"] for d in results["diagonal"]]
+        diagonal_confs = [d["confidence"] for d in results["diagonal"] + results["reflection"]]
         overall_score = self.detector.calculate_overall_score(
             vert_conf if has_vert else 0.0,
             horiz_conf if has_horiz else 0.0,
@@ -96,8 +151,9 @@ class SymmetryDetectorService:
             Basic symmetry information
         """
 
-        has_vert, vert_conf, _ = self.detector.detect_vertical_symmetry(image)
-        has_horiz, horiz_conf, _ = self.detector.detect_horizontal_symmetry(image)
+        context = AnalysisContext.ensure(image)
+        has_vert, vert_conf, _ = self.detector.detect_vertical_symmetry(context)
+        has_horiz, horiz_conf, _ = self.detector.detect_horizontal_symmetry(context)
 
         return {
             "has_symmetry": has_vert or has_horiz,
@@ -229,29 +285,218 @@ class SymmetryDetectorService:
         """
         Detect symmetry in multiple images
 
+        Images of the same size are stacked and scored together with
+        vectorized reductions (see app.ml.batch); each still gets the same
+        result dict as detect_all_symmetries. Every detector runs in full,
+        also with SYMMETRY_CASCADE: stacks score them all at once anyway,
+        and lone images skip the cascade too so one call never mixes pruned
+        and full results. A failing image only fails its own entry.
+
         Args:
             images: List of images
 
         Returns:
-            List of detection results
+            List of detection results, in input order
         """
 
-        results = []
+        results: List[Dict] = [None] * len(images)
+        groups: Dict[Tuple[int, int], List[Tuple[int, np.ndarray]]] = {}
+
         for i, image in enumerate(images):
             try:
-                result = self.detect_all_symmetries(image)
-                result["image_index"] = i
-                result["success"] = True
-                results.append(result)
+                gray = self.preprocessor.convert_to_grayscale(image)
+                if gray.ndim != 2 or gray.dtype != np.uint8 or gray.size == 0:
+                    raise ValueError(f"Unsupported image of shape {np.shape(image)}")
+                groups.setdefault(gray.shape, []).append((i, gray))
             except Exception as e:
-                results.append({
-                    "image_index": i,
-                    "success": False,
-                    "error": str(e)
-                })
+                results[i] = self._batch_error(i, e)
+
+        for members in groups.values():
+            indices = [i for i, _ in members]
+            if len(members) == 1:
+                group_results = self._detect_each(images, indices)  # Nothing to stack
+            else:
+                try:
+                    group_results = self._detect_stack(np.stack([gray for _, gray in members]))
+                except Exception:
+                    # Fall back to one image at a time so errors stay with their image
+                    group_results = self._detect_each(images, indices)
+
+            for i, result in zip(indices, group_results):
+                if isinstance(result, Exception):
+                    results[i] = self._batch_error(i, result)
+                else:
+                    result["image_index"] = i
+                    result["success"] = True
+                    results[i] = result
 
         return results
 
+    def _detect_each(self, images: List[np.ndarray], indices: List[int]) -> List:
+        """detect_all_symmetries for each of ``images[indices]``; a failure is returned as its exception"""
+
+        results = []
+        for i in indices:
+            try:
+                results.append(self.detect_all_symmetries(images[i], use_cascade=False))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    @staticmethod
+    def _batch_error(index: int, error: Exception) -> Dict:
+        return {
+            "image_index": index,
+            "success": False,
+            "error": str(error)
+        }
+
+    def _detect_stack(self, stack: np.ndarray) -> List[Dict]:
+        """detect_all_symmetries for an N x H x W stack of grayscale images"""
+
+        n, h, w = stack.shape
+        params = self.detector.get_parameters()
+        vertical_threshold = params["detect_vertical_symmetry"]["threshold"]
+        horizontal_threshold = params["detect_horizontal_symmetry"]["threshold"]
+        diagonal_threshold = params["detect_diagonal_symmetry"]["threshold"]
+        radial_params = params["detect_radial_symmetry"]
+
+        # Single-image paths for modes that are already cheap per image or search per image
+        per_image = [AnalysisContext(gray) for gray in stack]
+        fft_search = settings.SYMMETRY_AXIS_SEARCH == "fft"
+
+        # Vertical and horizontal symmetry
+        if fft_search:
+            vertical = [self.detector.detect_vertical_symmetry(context) for context in per_image]
+            horizontal = [self.detector.detect_horizontal_symmetry(context) for context in per_image]
+        else:
+            vertical_confs = (batch_mirror_ncc(stack, axis=2) + 1) / 2
+            horizontal_confs = (batch_mirror_ncc(stack, axis=1) + 1) / 2
+            vertical = [
+                (conf >= vertical_threshold, conf, {"x1": w // 2, "y1": 0, "x2": w // 2, "y2": h})
+                for conf in vertical_confs.tolist()
+            ] if w // 2 else [(False, 0.0, {})] * n
+            horizontal = [
+                (conf >= horizontal_threshold, conf, {"x1": 0, "y1": h // 2, "x2": w, "y2": h // 2})
+                for conf in horizontal_confs.tolist()
+            ] if h // 2 else [(False, 0.0, {})] * n
+
+        # Diagonal symmetry
+        diagonals = self._detect_stack_diagonals(stack, diagonal_threshold)
+
+        # Radial symmetry
+        if settings.SYMMETRY_RADIAL_MODE == "polar":
+            radial = [self.detector.detect_radial_order(context) for context in per_image]
+        else:
+            num_angles, threshold = radial_params["num_angles"], radial_params["threshold"]
+            center = (w // 2, h // 2)
+            similarities = np.zeros(n, dtype=np.float64)
+            for i in range(1, num_angles):
+                matrix = cv2.getRotationMatrix2D(center, i * 360 / num_angles, 1.0)
+                rotated = batch_warp_affine(stack, matrix, (w, h))
+                similarities += 1.0 - batch_mean_absdiff(stack, rotated) / 255.0
+            radial = [
+                (conf >= threshold, conf, None)
+                for conf in (similarities / (num_angles - 1)).tolist()
+            ]
+
+        results = []
+        for k in range(n):
+            has_vert, vert_conf, vert_coords = vertical[k]
+            has_horiz, horiz_conf, horiz_coords = horizontal[k]
+            has_radial, radial_conf, radial_order = radial[k]
+
+            result = {
+                "vertical": {
+                    "detected": bool(has_vert),
+                    "confidence": float(vert_conf),
+                    "coordinates": vert_coords
+                },
+                "horizontal": {
+                    "detected": bool(has_horiz),
+                    "confidence": float(horiz_conf),
+                    "coordinates": horiz_coords
+                },
+                "diagonal": diagonals[k],
+                "reflection": [],
+                "radial": {
+                    "detected": bool(has_radial),
+                    "confidence": float(radial_conf),
+                    "order": radial_order
+                },
+                "pruned_detectors": [],  # Stacks always run every detector in full
+                "overall_score": 0.0
+            }
+
+            if settings.SYMMETRY_ANGLE_SWEEP:
+                sweep_results = self.detector.detect_reflection_axes(
+                    per_image[k], angle_step=settings.SYMMETRY_ANGLE_STEP
+                )
+                for has_axis, axis_conf, axis_coords, axis_angle in sweep_results:
+                    if has_axis and not self.detector.is_fixed_axis_angle(axis_angle):
+                        result["reflection"].append({
+                            "angle": float(axis_angle),
+                            "detected": has_axis,
+                            "confidence": float(axis_conf),
+                            "coordinates": axis_coords
+                        })
+
+            diagonal_confs = [d["confidence"] for d in result["diagonal"] + result["reflection"]]
+            result["overall_score"] = float(self.detector.calculate_overall_score(
+                vert_conf if has_vert else 0.0,
+                horiz_conf if has_horiz else 0.0,
+                radial_conf if has_radial else 0.0,
+                diagonal_confs
+            ))
+            results.append(result)
+
+        return results
+
+    @staticmethod
+    def _detect_stack_diagonals(stack: np.ndarray, threshold: float) -> List[List[Dict]]:
+        """Detected diagonal axes of every image in the stack, as in detect_all_symmetries"""
+
+        n, h, w = stack.shape
+        size = min(h, w)
+
+        if settings.SYMMETRY_DIAGONAL_MODE == "transpose":
+            y0, x0 = (h - size) // 2, (w - size) // 2
+            squares = stack[:, y0:y0 + size, x0:x0 + size]
+            main = (batch_diagonal_mirror_ncc(squares) + 1) / 2
+            anti = (batch_diagonal_mirror_ncc(squares, anti_diagonal=True) + 1) / 2
+            main_coords = {"x1": x0, "y1": y0, "x2": x0 + size, "y2": y0 + size}
+            anti_coords = {"x1": x0 + size, "y1": y0, "x2": x0, "y2": y0 + size}
+        else:
+            squares = stack if h == w else batch_resize(stack, (size, size))
+            center = (size // 2, size // 2)
+            rotated_45 = batch_warp_affine(squares, cv2.getRotationMatrix2D(center, 45, 1.0), (size, size))
+            rotated_135 = batch_warp_affine(squares, cv2.getRotationMatrix2D(center, 135, 1.0), (size, size))
+            main = (batch_mirror_ncc(rotated_45, axis=2) + 1) / 2
+            anti = (batch_mirror_ncc(rotated_135, axis=2) + 1) / 2
+            main_coords = {"x1": 0, "y1": 0, "x2": w, "y2": h}
+            anti_coords = {"x1": w, "y1": 0, "x2": 0, "y2": h}
+
+        diagonals = []
+        for main_conf, anti_conf in zip(main.tolist(), anti.tolist()):
+            detected = []
+            if size >= 2 and main_conf >= threshold:
+                detected.append({
+                    "type": "main_diagonal",
+                    "detected": True,
+                    "confidence": float(main_conf),
+                    "coordinates": dict(main_coords)
+                })
+            if size >= 2 and anti_conf >= threshold:
+                detected.append({
+                    "type": "anti_diagonal",
+                    "detected": True,
+                    "confidence": float(anti_conf),
+                    "coordinates": dict(anti_coords)
+                })
+            diagonals.append(detected)
+
+        return diagonals
+
 
 # Global instance (singleton)
 _detector_service_instance = None
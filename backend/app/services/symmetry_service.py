@@ -1,9 +1,17 @@
 import time
-from typing import List
+from typing import Callable, List, Optional, Sequence, Tuple
 import numpy as np
+from app.ml.context import AnalysisContext
+from app.core.config import settings
+from app.core.metrics import ANALYSES, ANALYSIS_DURATION, NullTimer, StageTimer, record_stage_timings
+from app.core.profiling import SamplingProfiler, save_profile
+from app.ml.cascade import DetectionCascade
 from app.ml.detector import SymmetryDetector
 from app.ml.preprocessor import ImagePreprocessor
 from app.services.image_service import ImageService
+from app.services.executor import get_analysis_executor
+from app.services.analysis_store import get_analysis_store
+from app.services.result_cache import get_result_cache
 from app.models.schemas import (
     SymmetryAnalysisResult,
     SymmetryAxis,
@@ -12,6 +20,50 @@ from app.models.schemas import (
 from datetime import datetime
 
 
+# Pyramid mode re-checks a detector on the next finer level when its confidence is this close to the threshold
+REFINE_MARGIN = 0.05
+
+# Selectable detection stages ("diagonal" includes the reflection sweep), in the order they run
+DETECTOR_TYPES = ("vertical", "horizontal", "diagonal", "radial", "regions")
+
+# Named selections accepted wherever detector types are
+DETECTOR_PROFILES = {
+    "all": DETECTOR_TYPES,
+    "quick": ("vertical", "horizontal")
+}
+
+
+def resolve_detectors(value: Optional[str]) -> Tuple[str, ...]:
+    """
+    Parse a comma-separated list of detector types and/or profile names
+
+    Returns:
+        The selected types in DETECTOR_TYPES order (all of them for None or "")
+
+    Raises:
+        ValueError: For unknown names
+    """
+
+    if not value:
+        return DETECTOR_TYPES
+
+    selected = set()
+    for name in (part.strip().lower() for part in value.split(",")):
+        if name in DETECTOR_PROFILES:
+            selected.update(DETECTOR_PROFILES[name])
+        elif name in DETECTOR_TYPES:
+            selected.add(name)
+        elif name:
+            raise ValueError(
+                f"Unknown detector '{name}'. Choose from {', '.join(DETECTOR_TYPES + tuple(DETECTOR_PROFILES))}"
+            )
+
+    if not selected:
+        raise ValueError("No detectors selected")
+
+    return tuple(name for name in DETECTOR_TYPES if name in selected)
+
+
 class SymmetryService:
     """Main service for symmetry detection and analysis"""
 
@@ -20,59 +72,321 @@ class SymmetryService:
         self.preprocessor = ImagePreprocessor()
         self.image_service = ImageService()
 
-    async def analyze_image(self, file_path: str, file_id: str) -> SymmetryAnalysisResult:
-        """Complete symmetry analysis pipeline"""
+    async def analyze_image(self, file_path: str, file_id: str,
+                            original_filename: Optional[str] = None,
+                            content_hash: Optional[str] = None,
+                            use_cache: bool = True,
+                            profile_id: Optional[str] = None,
+                            detectors: Optional[Sequence[str]] = None,
+                            deadline: Optional[float] = None) -> SymmetryAnalysisResult:
+        """
+        Complete symmetry analysis pipeline, run on the analysis executor
+
+        With a ``profile_id`` the run is stack-sampled (bypassing the result
+        cache) and its folded stacks are stored under that id. ``detectors``
+        limits the run to those DETECTOR_TYPES (default: all). ``deadline``
+        (a time.time() value) is the latency budget: detectors after the
+        first not started by then are skipped and the result is marked
+        ``partial``.
+        """
+
+        try:
+            result = await get_analysis_executor().run(
+                run_analysis, file_path, file_id, original_filename, content_hash, use_cache, profile_id,
+                detectors, deadline
+            )
+        except Exception:
+            ANALYSES.inc(outcome="error")
+            raise
+
+        # Stage timings come back from the worker process and are recorded in this (API) process
+        record_stage_timings(result.stage_timings)
+        ANALYSES.inc(outcome="partial" if result.partial else "success")
+        ANALYSIS_DURATION.observe(result.processing_time)
+        return result
+
+    def analyze_image_sync(self, file_path: str, file_id: str,
+                           original_filename: Optional[str] = None,
+                           content_hash: Optional[str] = None,
+                           use_cache: bool = True,
+                           detectors: Optional[Sequence[str]] = None,
+                           deadline: Optional[float] = None) -> SymmetryAnalysisResult:
+        """
+        Complete symmetry analysis pipeline (blocking); persists the result
+
+        Only the ``detectors`` stages run (default: all), and only those that
+        start before ``deadline``. Partial selections and results also skip
+        the gallery thumbnail, which falls back to the rendered image;
+        partial results are not cached.
+        """
 
         start_time = time.time()
+        timer = StageTimer()
+        detectors = tuple(detectors or DETECTOR_TYPES)
+        complete = set(detectors) == set(DETECTOR_TYPES)
+
+        # Decode once (at reduced scale when pyramid mode only needs a low resolution); the
+        # buffer is shared by detection and the thumbnail. Only refinement finer than a reduced
+        # decode decodes the upload again, at full size
+        max_pixels = settings.MAX_WORKING_PIXELS if settings.SYMMETRY_PYRAMID else None
+        with timer.stage("decode"):
+            data = self.image_service.read_file(file_path)
+            image, reduction = self.image_service.decode_image(data, max_pixels)
+
+        # Reuse detections for byte-identical uploads analyzed with the same detector parameters
+        with timer.stage("cache_lookup"):
+            cache = get_result_cache() if content_hash else None
+            cache_key = cache.make_key(content_hash, None if complete else detectors) if cache else None
+            detection = cache.get(cache_key) if cache and use_cache else None
+
+        if detection is None:
+            detection = self.detect(
+                AnalysisContext(image, bgr=True), reduction, timer, detectors, deadline,
+                decode_full=lambda: AnalysisContext(self.image_service.decode_image(data)[0], bgr=True)
+            )
+            if cache and not detection["partial"]:
+                with timer.stage("cache_store"):
+                    cache.put(cache_key, detection)
+
+        # The annotated image is rendered on request from the stored axes (see render_service)
+        thumbnail_path = None
+        if complete and not detection.get("partial"):
+            with timer.stage("thumbnail"):
+                thumbnail_path = self.image_service.save_thumbnail(image, file_id)
+
+        # Calculate processing time
+        processing_time = time.time() - start_time
+
+        # Build result
+        result = SymmetryAnalysisResult(
+            analysis_id=file_id,
+            original_image_url=f"/uploads/{file_id}",
+            processed_image_url=f"/results/{file_id}_analyzed.jpg",
+            processing_time=processing_time,
+            timestamp=datetime.now(),
+            **detection
+        )
+
+        # Persist so later reads don't re-run detection
+        try:
+            with timer.stage("persist"):
+                get_analysis_store().save(result, file_path, original_filename, thumbnail_path)
+        except Exception as e:
+            print(f"Failed to persist analysis {file_id}: {e}")
+
+        # Reported on the response only; the stored result describes the detection, not this run
+        result.stage_timings = dict(timer.timings)
+
+        return result
 
-        # Load image
-        image = self.image_service.load_image(file_path)
+    def detect(self, context: AnalysisContext, reduction: int = 0,
+               timer: Optional[StageTimer] = None, detectors: Optional[Sequence[str]] = None,
+               deadline: Optional[float] = None,
+               decode_full: Optional[Callable[[], AnalysisContext]] = None) -> dict:
+        """
+        Run every detector and return the JSON-serializable detection fields of a result
 
-        # Detect symmetries
+        ``reduction`` is the number of times the context image was already
+        halved at decode time; coordinates and the reported pyramid level
+        are given for the original image. Refinement only steps finer than
+        the context when ``decode_full`` is given: it is called (once) for a
+        context of the full-size image. ``timer`` collects per-stage
+        wall-clock seconds. Stages not in ``detectors`` (default: all
+        DETECTOR_TYPES) are not run and are reported as skipped. With
+        SYMMETRY_CASCADE, expensive detectors that can't move the score by
+        more than SYMMETRY_CASCADE_TOLERANCE report their low-resolution
+        probe instead of a full run and are listed as pruned.
+
+        Stages run in DETECTOR_TYPES (priority) order. Once ``deadline`` (a
+        time.time() value) has passed, the remaining ones are not started
+        and are reported as timed out: the result is ``partial`` and its
+        score covers the stages that completed. The first selected stage
+        always runs, even past the deadline, so a partial result has at
+        least one detector's answer; a stage already running finishes.
+        """
+
+        timer = timer or NullTimer()
+        selected = set(detectors or DETECTOR_TYPES)
+        timed_out = []
+        started = []
+
+        def expired() -> bool:
+            return deadline is not None and time.time() >= deadline
+
+        def runs(name: str) -> bool:
+            """Whether selected stage ``name`` starts (the first one always does)"""
+            if name not in selected:
+                return False
+            if started and expired():
+                timed_out.append(name)
+                return False
+            started.append(name)
+            return True
+
+        full_context = []
+
+        def at_level(level: int) -> AnalysisContext:
+            """Context for ``level``; negative levels are finer than ``context``, down to the full-size image"""
+            if level >= 0:
+                return context.at_level(level)
+            if not full_context:
+                full_context.append(decode_full())
+            return full_context[0].at_level(level + reduction)
+
+        # In pyramid mode detect on a downsampled level; near-threshold results are refined on finer levels
+        level = context.working_level(settings.MAX_WORKING_PIXELS) if settings.SYMMETRY_PYRAMID else 0
+        finest = -reduction if decode_full is not None else 0
+        with timer.stage("grayscale"):
+            context.gray  # Shared by every detector; timed on its own
+            working = context.at_level(level)
+        finest_level = level  # Refinement can move single detectors to finer levels
+        thresholds = {name: params.get("threshold") for name, params in self.detector.get_parameters().items()}
+
+        # Detect symmetries (skipped stages keep their "nothing found" defaults)
         detected_axes = []
         diagonal_confs = []
+        detected_regions = []
+        has_vert, vert_conf = False, 0.0
+        has_horiz, horiz_conf = False, 0.0
+        has_radial, radial_conf, radial_order = False, 0.0, None
 
         # Vertical symmetry
-        has_vert, vert_conf, vert_coords = self.detector.detect_vertical_symmetry(image)
-        if has_vert:
-            detected_axes.append(SymmetryAxis(
-                type="vertical",
-                angle=90.0,
-                confidence=float(vert_conf),
-                coordinates=vert_coords
-            ))
+        if runs("vertical"):
+            with timer.stage("vertical"):
+                (has_vert, vert_conf, vert_coords), vert_level = self._refine(
+                    at_level, level, finest, self.detector.detect_vertical_symmetry,
+                    thresholds["detect_vertical_symmetry"]
+                )
+                finest_level = min(finest_level, vert_level)
+                if has_vert:
+                    detected_axes.append(SymmetryAxis(
+                        type="vertical",
+                        angle=90.0,
+                        confidence=float(vert_conf),
+                        coordinates=self._scale_coordinates(vert_coords, vert_level + reduction)
+                    ))
 
         # Horizontal symmetry
-        has_horiz, horiz_conf, horiz_coords = self.detector.detect_horizontal_symmetry(image)
-        if has_horiz:
-            detected_axes.append(SymmetryAxis(
-                type="horizontal",
-                angle=0.0,
-                confidence=float(horiz_conf),
-                coordinates=horiz_coords
-            ))
+        if runs("horizontal"):
+            with timer.stage("horizontal"):
+                (has_horiz, horiz_conf, horiz_coords), horiz_level = self._refine(
+                    at_level, level, finest, self.detector.detect_horizontal_symmetry,
+                    thresholds["detect_horizontal_symmetry"]
+                )
+                finest_level = min(finest_level, horiz_level)
+                if has_horiz:
+                    detected_axes.append(SymmetryAxis(
+                        type="horizontal",
+                        angle=0.0,
+                        confidence=float(horiz_conf),
+                        coordinates=self._scale_coordinates(horiz_coords, horiz_level + reduction)
+                    ))
+
+        # Reflection axes at arbitrary angles (already run at low resolution; computed before the
+        # cascade plan because extra axes weigh like diagonals in the score)
+        run_diagonal = runs("diagonal")
+        sweep_results = []
+        if settings.SYMMETRY_ANGLE_SWEEP and run_diagonal:
+            with timer.stage("reflection_sweep"):
+                sweep_results = [
+                    (axis_conf, axis_coords, axis_angle)
+                    for has_axis, axis_conf, axis_coords, axis_angle in self.detector.detect_reflection_axes(
+                        context, angle_step=settings.SYMMETRY_ANGLE_STEP
+                    )
+                    if has_axis and not self.detector.is_fixed_axis_angle(axis_angle)
+                ]
+
+        # Cascade: probe the expensive detectors and prune those whose full run can't move the score
+        cascade = None
+        pruned = []
+        if settings.SYMMETRY_CASCADE and not expired():
+            with timer.stage("probe"):
+                cascade = DetectionCascade(context, selected, min_level=level)
+                pruned = cascade.plan(
+                    vert_conf if has_vert else 0.0,
+                    horiz_conf if has_horiz else 0.0,
+                    [axis_conf for axis_conf, _, _ in sweep_results]
+                )
+
+        # Diagonal symmetry (both axes come from one call per level, each is refined on its own)
+        diagonal_results = []
+        if run_diagonal:
+            with timer.stage("diagonal"):
+                diagonal_threshold = thresholds["detect_diagonal_symmetry"]
+                diagonal_by_level = {}
+                if "diagonal" in pruned:
+                    diagonal_results = [
+                        (diag_conf, self._scale_coordinates(diag_coords, reduction), diag_type)
+                        for has_diag, diag_conf, diag_coords, diag_type in cascade.diagonal() if has_diag
+                    ]
+                else:
+                    for diag_type in ("main_diagonal", "anti_diagonal"):
+                        def detect_diagonal(level_context, diag_type=diag_type):
+                            if level_context not in diagonal_by_level:
+                                candidates = self.detector.detect_diagonal_symmetry(level_context, threshold=0.0)
+                                diagonal_by_level[level_context] = {r[3]: r for r in candidates}
+                            _, conf, coords, _ = diagonal_by_level[level_context][diag_type]
+                            return conf >= diagonal_threshold, conf, coords
 
-        # Diagonal symmetry
-        diagonal_results = self.detector.detect_diagonal_symmetry(image)
-        for has_diag, diag_conf, diag_coords, diag_type in diagonal_results:
+                        (has_diag, diag_conf, diag_coords), diag_level = self._refine(
+                            at_level, level, finest, detect_diagonal, diagonal_threshold
+                        )
+                        finest_level = min(finest_level, diag_level)
+                        if has_diag:
+                            diagonal_results.append(
+                                (diag_conf, self._scale_coordinates(diag_coords, diag_level + reduction), diag_type)
+                            )
+
+                for diag_conf, diag_coords, diag_type in diagonal_results:
+                    detected_axes.append(SymmetryAxis(
+                        type=diag_type,
+                        angle=45.0 if diag_type == "main_diagonal" else 135.0,
+                        confidence=float(diag_conf),
+                        coordinates=diag_coords
+                    ))
+                    diagonal_confs.append(diag_conf)
+
+        # Diagonal had its full run (or none): judge radial against the diagonal value the score uses
+        if cascade is not None and not pruned and "diagonal" in cascade.stages:
+            pruned = cascade.plan(
+                vert_conf if has_vert else 0.0,
+                horiz_conf if has_horiz else 0.0,
+                [axis_conf for axis_conf, _, _ in sweep_results],
+                exact={"diagonal": [diag_conf for diag_conf, _, _ in diagonal_results]}
+            )
+
+        for axis_conf, axis_coords, axis_angle in sweep_results:
             detected_axes.append(SymmetryAxis(
-                type=diag_type,
-                angle=45.0 if diag_type == "main_diagonal" else 135.0,
-                confidence=float(diag_conf),
-                coordinates=diag_coords
+                type="reflection",
+                angle=float(axis_angle),
+                confidence=float(axis_conf),
+                coordinates=self._scale_coordinates(axis_coords, reduction)
             ))
-            diagonal_confs.append(diag_conf)
+            diagonal_confs.append(axis_conf)
 
-        # Radial symmetry
-        has_radial, radial_conf = self.detector.detect_radial_symmetry(image)
+        # Radial symmetry (the polar engine picks its own low resolution)
+        if runs("radial"):
+            with timer.stage("radial"):
+                if "radial" in pruned:
+                    has_radial, radial_conf, radial_order = cascade.radial()
+                elif settings.SYMMETRY_RADIAL_MODE == "polar":
+                    has_radial, radial_conf, radial_order = self.detector.detect_radial_order(context)
+                else:
+                    (has_radial, radial_conf), radial_level = self._refine(
+                        at_level, level, finest, self.detector.detect_radial_symmetry,
+                        thresholds["detect_radial_symmetry"]
+                    )
+                    finest_level = min(finest_level, radial_level)
 
         # Find symmetric regions
-        regions_data = self.detector.find_symmetry_regions(image)
-        detected_regions = [
-            SymmetryRegion(**region) for region in regions_data
-        ]
+        if runs("regions"):
+            with timer.stage("regions"):
+                for region in self.detector.find_symmetry_regions(working):
+                    region["center_x"] *= 1 << (level + reduction)
+                    region["center_y"] *= 1 << (level + reduction)
+                    detected_regions.append(SymmetryRegion(**region))
 
-        # Calculate overall symmetry score
+        # Calculate overall symmetry score (over the detectors that ran)
         symmetry_score = self.detector.calculate_overall_score(
             vert_conf if has_vert else 0.0,
             horiz_conf if has_horiz else 0.0,
@@ -80,43 +394,60 @@ class SymmetryService:
             diagonal_confs
         )
 
-        # Draw symmetry axes on image
-        processed_image = image.copy()
-        for axis in detected_axes:
-            processed_image = self.image_service.draw_symmetry_axis(
-                processed_image,
-                axis.model_dump()
-            )
+        found = {
+            "vertical": has_vert,
+            "horizontal": has_horiz,
+            "diagonal": bool(diagonal_confs),
+            "radial": has_radial,
+            "regions": bool(detected_regions)
+        }
 
-        # Save processed image
-        processed_path = self.image_service.save_processed_image(
-            processed_image,
-            file_id,
-            "_analyzed"
-        )
+        return {
+            "symmetry_score": float(symmetry_score),
+            "detected_axes": [axis.model_dump(mode="json") for axis in detected_axes],
+            "detected_regions": [region.model_dump(mode="json") for region in detected_regions],
+            "has_vertical_symmetry": bool(has_vert),
+            "has_horizontal_symmetry": bool(has_horiz),
+            "has_radial_symmetry": bool(has_radial),
+            "radial_order": radial_order if has_radial else None,
+            "pyramid_level": finest_level + reduction,
+            "skipped_detectors": [name for name in DETECTOR_TYPES if name not in selected or name in timed_out],
+            "pruned_detectors": pruned,
+            "partial": bool(timed_out),
+            "detector_status": {
+                name: (
+                    "skipped" if name not in selected
+                    else "timed_out" if name in timed_out
+                    else "detected" if found[name] else "not_detected"
+                )
+                for name in DETECTOR_TYPES
+            }
+        }
 
-        # Create thumbnail
-        thumbnail_path = self.image_service.create_thumbnail(file_path)
+    @staticmethod
+    def _refine(at_level: Callable[[int], AnalysisContext], level: int, finest: int,
+                detect, threshold: float) -> tuple:
+        """
+        Run ``detect`` at pyramid ``level`` and step to finer levels, down to
+        ``finest``, while its confidence is within REFINE_MARGIN of ``threshold``
 
-        # Calculate processing time
-        processing_time = time.time() - start_time
+        Returns:
+            (detector result, level it was computed at)
+        """
 
-        # Build result
-        result = SymmetryAnalysisResult(
-            analysis_id=file_id,
-            original_image_url=f"/uploads/{file_id}",
-            processed_image_url=f"/results/{file_id}_analyzed.jpg",
-            symmetry_score=float(symmetry_score),
-            detected_axes=detected_axes,
-            detected_regions=detected_regions,
-            has_vertical_symmetry=has_vert,
-            has_horizontal_symmetry=has_horiz,
-            has_radial_symmetry=has_radial,
-            processing_time=processing_time,
-            timestamp=datetime.now()
-        )
+        while True:
+            result = detect(at_level(level))
+            if level <= finest or abs(float(result[1]) - threshold) >= REFINE_MARGIN:
+                return result, level
+            level -= 1
 
-        return result
+    @staticmethod
+    def _scale_coordinates(coords: dict, level: int) -> dict:
+        """Map axis end points found at pyramid ``level`` back to original image coordinates"""
+        if level == 0:
+            return coords
+
+        return {key: float(value) * 2.0 ** level for key, value in coords.items()}
 
     def get_analysis_summary(self, result: SymmetryAnalysisResult) -> dict:
         """Generate human-readable summary"""
@@ -166,4 +497,28 @@ class SymmetryService:
         elif avg_conf >= 0.6:
             return "Moderate"
         else:
-            return "Low"
\ No newline at end of file
+            return "Low"
+
+
+def run_analysis(file_path: str, file_id: str,
+                 original_filename: Optional[str] = None,
+                 content_hash: Optional[str] = None,
+                 use_cache: bool = True,
+                 profile_id: Optional[str] = None,
+                 detectors: Optional[Sequence[str]] = None,
+                 deadline: Optional[float] = None) -> SymmetryAnalysisResult:
+    """Module-level pipeline entry point so it can be pickled into worker processes"""
+
+    if profile_id is None:
+        return SymmetryService().analyze_image_sync(
+            file_path, file_id, original_filename, content_hash, use_cache, detectors, deadline
+        )
+
+    # Sampled on the worker thread running it; only this call pays the overhead
+    with SamplingProfiler() as profiler:
+        result = SymmetryService().analyze_image_sync(
+            file_path, file_id, original_filename, content_hash, use_cache=False, detectors=detectors,
+            deadline=deadline
+        )
+    save_profile(profile_id, profiler.folded())
+    return result
@@ -0,0 +1,115 @@
+"""
+Analysis worker
+Consumes the job queue filled by POST /api/v1/analyze?async=true
+
+Run from the backend directory, one process per core to spare:
+    python -m app.worker
+Each process runs one job at a time. SIGINT/SIGTERM finish the current
+job before exiting; a worker killed mid-job loses its lease and the job is
+retried by another worker.
+"""
+
+import argparse
+import os
+import signal
+import socket
+import threading
+from typing import Optional
+from app.core.config import settings
+from app.core.profiling import start_sampler
+from app.services.job_queue import JobQueue, get_job_queue
+from app.services.symmetry_service import run_analysis
+
+
+def default_worker_id() -> str:
+    """Worker ID unique to this process"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def process_job(queue: JobQueue, job: dict, worker_id: str) -> bool:
+    """Run one claimed job, renewing its lease meanwhile; True if it succeeded"""
+
+    job_id = job["job_id"]
+    finished = threading.Event()
+
+    def renew():
+        while not finished.wait(queue.lease_seconds / 3):
+            if not queue.renew(job_id, worker_id):
+                return
+
+    renewer = threading.Thread(target=renew, name=f"lease-{job_id}", daemon=True)
+    renewer.start()
+
+    try:
+        result = run_analysis(job["file_path"], job_id, job["original_filename"], job["content_hash"])
+    except Exception as e:
+        print(f"⚠️  Job {job_id} failed (attempt {job['attempts']}): {e}")
+        queue.fail(job_id, worker_id, str(e))
+        return False
+    finally:
+        finished.set()
+        renewer.join()
+
+    queue.complete(job_id, worker_id, result)
+    return True
+
+
+def run_worker(queue: Optional[JobQueue] = None, worker_id: Optional[str] = None,
+               stop: Optional[threading.Event] = None, once: bool = False) -> int:
+    """
+    Claim and run jobs until ``stop`` is set
+
+    Args:
+        queue: Job queue, defaults to the shared instance
+        worker_id: Lease holder name, defaults to host:pid
+        stop: Event that ends the loop after the current job
+        once: Return as soon as the queue is empty instead of polling
+
+    Returns:
+        Number of jobs processed
+    """
+
+    queue = queue or get_job_queue()
+    worker_id = worker_id or default_worker_id()
+    stop = stop or threading.Event()
+    processed = 0
+
+    while not stop.is_set():
+        job = queue.claim(worker_id)
+
+        if job is None:
+            if once:
+                break
+            stop.wait(settings.JOB_POLL_INTERVAL)
+            continue
+
+        process_job(queue, job, worker_id)
+        processed += 1
+
+    return processed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run queued symmetry analyses")
+    parser.add_argument("--worker-id", default=None, help="Lease holder name (default: host:pid)")
+    parser.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+    args = parser.parse_args()
+
+    worker_id = args.worker_id or default_worker_id()
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        print(f"👋 Worker {worker_id} stopping after the current job...")
+        stop.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    start_sampler()
+    print(f"⚙️  Worker {worker_id} polling {settings.DATABASE_URL}")
+    processed = run_worker(worker_id=worker_id, stop=stop, once=args.once)
+    print(f"✅ Worker {worker_id} processed {processed} jobs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+"""
+Detector benchmarks
+Run from the backend directory with: python -m benchmarks.run
+"""
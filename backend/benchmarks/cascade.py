@@ -0,0 +1,116 @@
+"""
+Detection cascade benchmark
+
+Runs SymmetryService.detect on every benchmark image with
+SYMMETRY_CASCADE off and on, and reports the speedup, the overall score
+deviation and which detectors the cascade pruned.
+
+Usage (from the backend directory):
+    python -m benchmarks.cascade
+    python -m benchmarks.cascade --sizes 1024,4mp --kinds scene --output cascade.json
+
+The exit status is 1 when any score deviates by more than --max-deviation
+points (default: SYMMETRY_CASCADE_TOLERANCE).
+"""
+
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+from benchmarks.run import metadata, time_call  # noqa: E402  (sets up the scratch directories first)
+from app.core.config import settings  # noqa: E402
+from app.ml.context import AnalysisContext  # noqa: E402
+from app.services.symmetry_service import SymmetryService  # noqa: E402
+from benchmarks.images import KINDS, SIZES  # noqa: E402
+
+
+def detect(service: SymmetryService, image, cascade: bool) -> dict:
+    """One detect() call on a fresh context (no pyramid levels carried over)"""
+    previous = settings.SYMMETRY_CASCADE
+    settings.SYMMETRY_CASCADE = cascade
+    try:
+        return service.detect(AnalysisContext(image))
+    finally:
+        settings.SYMMETRY_CASCADE = previous
+
+
+def run(sizes: List[str], kinds: List[str], repeats: int) -> List[dict]:
+    service = SymmetryService()
+    results = []
+
+    for size_name in sizes:
+        width, height = SIZES[size_name]
+        for kind in kinds:
+            image = KINDS[kind](width, height)
+            full_timings, full = time_call(lambda: detect(service, image, False), repeats)
+            cascade_timings, pruned = time_call(lambda: detect(service, image, True), repeats)
+
+            result = {
+                "id": f"{kind}|{size_name}",
+                "full_s": min(full_timings),
+                "cascade_s": min(cascade_timings),
+                "full_score": full["symmetry_score"],
+                "cascade_score": pruned["symmetry_score"],
+                "deviation": abs(full["symmetry_score"] - pruned["symmetry_score"]),
+                "pruned": pruned["pruned_detectors"]
+            }
+            results.append(result)
+            print(
+                f"{result['id']:<16} {result['full_s'] * 1000:9.2f} ms -> {result['cascade_s'] * 1000:9.2f} ms"
+                f"  x{result['full_s'] / result['cascade_s']:.2f}"
+                f"  score {result['full_score']:6.2f} -> {result['cascade_score']:6.2f}"
+                f"  pruned {','.join(result['pruned']) or '-'}"
+            )
+
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the detection cascade against full detection")
+    parser.add_argument("--sizes", default="1024,4mp", help=f"Comma-separated subset of {list(SIZES)}")
+    parser.add_argument("--kinds", default=",".join(KINDS), help=f"Comma-separated subset of {list(KINDS)}")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed calls per case (the fastest is reported)")
+    parser.add_argument("--max-deviation", type=float, default=None,
+                        help="Allowed overall score deviation in points (default: SYMMETRY_CASCADE_TOLERANCE)")
+    parser.add_argument("--output", default=None, help="Write results JSON here")
+    args = parser.parse_args(argv)
+
+    sizes = [s for s in args.sizes.split(",") if s]
+    kinds = [k for k in args.kinds.split(",") if k]
+    unknown = [s for s in sizes if s not in SIZES] + [k for k in kinds if k not in KINDS]
+    if unknown:
+        parser.error(f"Unknown sizes/kinds: {unknown}")
+
+    max_deviation = settings.SYMMETRY_CASCADE_TOLERANCE if args.max_deviation is None else args.max_deviation
+    results = run(sizes, kinds, args.repeats)
+
+    full_total = sum(r["full_s"] for r in results)
+    cascade_total = sum(r["cascade_s"] for r in results)
+    summary = {
+        "throughput_gain": full_total / cascade_total if cascade_total else None,
+        "max_deviation": max((r["deviation"] for r in results), default=0.0),
+        "pruned_cases": sum(1 for r in results if r["pruned"])
+    }
+    print(
+        f"\nThroughput x{summary['throughput_gain']:.2f}, max score deviation {summary['max_deviation']:.2f}"
+        f" points, {summary['pruned_cases']}/{len(results)} cases pruned"
+    )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"meta": metadata(), "summary": summary, "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    failures = [r for r in results if r["deviation"] > max_deviation]
+    if failures:
+        print(f"\n{len(failures)} case(s) deviate by more than {max_deviation} points:")
+        for r in failures:
+            print(f"  {r['id']}: {r['full_score']:.2f} -> {r['cascade_score']:.2f}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
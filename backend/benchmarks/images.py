@@ -0,0 +1,94 @@
+"""
+Synthetic benchmark images with known symmetry
+Smooth noise is generated at low resolution and upsampled, so even 24 MP
+images are built in well under a second and are exactly symmetric.
+"""
+
+import cv2
+import numpy as np
+from typing import Callable, Dict, Tuple
+
+
+# (width, height) of every benchmarked resolution, 256^2 up to 24 MP
+SIZES: Dict[str, Tuple[int, int]] = {
+    "256": (256, 256),
+    "1024": (1024, 1024),
+    "4mp": (2048, 2048),
+    "24mp": (6000, 4000)
+}
+
+ROSETTE_ORDER = 6
+OFFSET_AXIS_FRACTION = 0.4  # Off-centre axis position as a fraction of the width
+
+
+def smooth_noise(width: int, height: int, seed: int, feature: int = 8) -> np.ndarray:
+    """uint8 noise with features about ``feature`` pixels across"""
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, size=(max(2, height // feature), max(2, width // feature)), dtype=np.uint8)
+    return cv2.resize(small, (width, height), interpolation=cv2.INTER_LINEAR)
+
+
+def to_rgb(gray: np.ndarray) -> np.ndarray:
+    return cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB)
+
+
+def mirrored(width: int, height: int, seed: int = 0) -> np.ndarray:
+    """Mirror symmetric about the vertical midline"""
+    left = smooth_noise(width // 2, height, seed)
+    return to_rgb(np.concatenate([left, left[:, ::-1]], axis=1))
+
+
+def rosette(width: int, height: int, seed: int = 0) -> np.ndarray:
+    """ROSETTE_ORDER-fold rotationally symmetric about the image centre (no reflection axes)"""
+    rng = np.random.default_rng(seed)
+    phases = rng.uniform(0, 2 * np.pi, size=3)
+
+    yy, xx = np.ogrid[:height, :width]
+    dx = (xx - (width - 1) / 2.0).astype(np.float32)
+    dy = (yy - (height - 1) / 2.0).astype(np.float32)
+    radius = np.sqrt(dx * dx + dy * dy) / (min(width, height) / 2.0)
+    theta = np.arctan2(dy, dx)
+
+    n = ROSETTE_ORDER
+    # Radius-dependent phase twists the petals so no mirror line survives
+    value = (np.cos(n * theta + 4 * radius + phases[0])
+             + 0.5 * np.cos(2 * n * theta - 7 * radius + phases[1])
+             + 0.3 * np.cos(11 * radius + phases[2]))
+    return to_rgb(cv2.normalize(value, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8))
+
+
+def offset_mirrored(width: int, height: int, seed: int = 0) -> np.ndarray:
+    """Mirror symmetric about x = OFFSET_AXIS_FRACTION * width, unrelated noise beyond"""
+    axis = int(OFFSET_AXIS_FRACTION * width)
+    left = smooth_noise(axis, height, seed)
+    rest = smooth_noise(width - 2 * axis, height, seed + 1)
+    return to_rgb(np.concatenate([left, left[:, ::-1], rest], axis=1))
+
+
+def scene(width: int, height: int, seed: int = 0) -> np.ndarray:
+    """Asymmetric photo-like scene: random blurred shapes over a gradient"""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[:height, :width].astype(np.float32)
+    angle = rng.uniform(0, 2 * np.pi)
+    gradient = np.cos(angle) * xx / width + np.sin(angle) * yy / height
+    image = cv2.normalize(gradient, None, 40, 200, cv2.NORM_MINMAX).astype(np.uint8)
+
+    for _ in range(24):
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        size = int(rng.integers(max(2, min(width, height) // 40), max(3, min(width, height) // 5)))
+        color = int(rng.integers(0, 256))
+        if rng.random() < 0.5:
+            cv2.rectangle(image, (x, y), (x + size, y + int(size * rng.uniform(0.5, 2.0))), color, -1)
+        else:
+            cv2.circle(image, (x, y), size // 2, color, -1)
+
+    sigma = max(width, height) / 500.0
+    return to_rgb(cv2.GaussianBlur(image, (0, 0), sigma))
+
+
+KINDS: Dict[str, Callable[[int, int], np.ndarray]] = {
+    "mirrored": mirrored,
+    "rosette": rosette,
+    "offset": offset_mirrored,
+    "scene": scene
+}
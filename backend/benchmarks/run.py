@@ -0,0 +1,286 @@
+"""
+Detector benchmark suite
+
+Times every SymmetryDetector method, the SymmetryDetectorService entry
+points and SymmetryService.analyze_image end to end on synthetic images
+with known symmetry (see benchmarks.images), writes the results as JSON
+and compares them with a stored baseline.
+
+Usage (from the backend directory):
+    python -m benchmarks.run                           # compare with benchmarks/baseline.json
+    python -m benchmarks.run --sizes 256,1024 --output bench.json
+    python -m benchmarks.run --update-baseline         # record this machine's timings
+
+The exit status is 1 when a case's fastest run is slower than the
+baseline's by more than --tolerance (and by at least --min-delta seconds), or when a
+detector misses the symmetry its image was built with. Baselines are only
+comparable on the machine that recorded them.
+"""
+
+import argparse
+import asyncio
+import atexit
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+# Uploads, results, database and result cache go to a scratch directory, set before app settings load
+_SCRATCH = tempfile.mkdtemp(prefix="symmetry-bench-")
+atexit.register(shutil.rmtree, _SCRATCH, True)
+for _name, _value in {
+    "UPLOAD_DIR": os.path.join(_SCRATCH, "uploads"),
+    "RESULTS_DIR": os.path.join(_SCRATCH, "results"),
+    "DATABASE_URL": f"sqlite:///{os.path.join(_SCRATCH, 'bench.db')}",
+    "RESULT_CACHE_PATH": os.path.join(_SCRATCH, "result_cache.db")
+}.items():
+    os.environ.setdefault(_name, _value)
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.ml.detector import SymmetryDetector  # noqa: E402
+from app.services.executor import get_analysis_executor  # noqa: E402
+from app.services.symmetry_detector import SymmetryDetectorService  # noqa: E402
+from app.services.symmetry_service import SymmetryService  # noqa: E402
+from benchmarks.images import KINDS, OFFSET_AXIS_FRACTION, ROSETTE_ORDER, SIZES  # noqa: E402
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+DETECTOR_METHODS = [
+    "detect_vertical_symmetry",
+    "detect_horizontal_symmetry",
+    "find_vertical_axes",
+    "find_horizontal_axes",
+    "detect_diagonal_symmetry",
+    "detect_diagonal_symmetry_exact",
+    "detect_reflection_axes",
+    "detect_radial_symmetry",
+    "detect_radial_order",
+    "find_symmetry_regions"
+]
+
+SERVICE_METHODS = ["detect_all_symmetries", "quick_symmetry_check", "batch_detect"]
+
+BATCH_PIXELS = 16 * 1024 * 1024  # Pixels stacked per batch_detect call
+
+
+def summarize(target: str, output) -> dict:
+    """Comparable outcome of one call (what was detected, not how fast)"""
+
+    if target in ("find_vertical_axes", "find_horizontal_axes"):
+        return {"position": round(output[0]["position"], 1) if output else None}
+    if target == "detect_radial_order":
+        return {"detected": bool(output[0]), "order": int(output[2])}
+    if target in ("detect_diagonal_symmetry", "detect_diagonal_symmetry_exact", "detect_reflection_axes"):
+        labels = (r[3] if isinstance(r[3], str) else round(float(r[3]), 1) for r in output if r[0])
+        return {"detected": sorted(labels)}
+    if target == "find_symmetry_regions":
+        return {"regions": len(output)}
+    if isinstance(output, tuple):
+        return {"detected": bool(output[0])}
+    if target == "detect_all_symmetries":
+        return {"score": round(output["overall_score"], 1)}
+    if target == "quick_symmetry_check":
+        return {"detected": bool(output["has_symmetry"])}
+    if target == "batch_detect":
+        return {"successful": sum(1 for r in output if r["success"])}
+    if target == "analyze_image":
+        return {"score": round(output.symmetry_score, 1)}
+    return {}
+
+
+def check_expected(kind: str, target: str, width: int, outcome: dict) -> Optional[str]:
+    """Known symmetry the image was built with; returns a failure message or None"""
+
+    if kind == "mirrored" and target == "detect_vertical_symmetry" and not outcome["detected"]:
+        return "vertical mirror not detected"
+    if kind == "rosette" and target == "detect_radial_order" and outcome["order"] != ROSETTE_ORDER:
+        return f"rotation order {outcome['order']}, expected {ROSETTE_ORDER}"
+    if kind == "offset" and target == "find_vertical_axes":
+        expected = int(OFFSET_AXIS_FRACTION * width)
+        if outcome["position"] is None or abs(outcome["position"] - expected) > max(1.0, 0.002 * width):
+            return f"axis at {outcome['position']}, expected {expected}"
+    return None
+
+
+def time_call(fn: Callable, repeats: int) -> tuple:
+    """(seconds per call, last output); one untimed warm-up call first"""
+    output = fn()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = fn()
+        timings.append(time.perf_counter() - start)
+    return timings, output
+
+
+def build_cases(image: np.ndarray, upload_path: str, service: SymmetryService,
+                detector_service: SymmetryDetectorService) -> Dict[str, Callable]:
+    """Benchmark target name -> zero-argument call"""
+
+    cases = {
+        f"detector.{name}": (lambda name=name: getattr(SymmetryDetector, name)(image))
+        for name in DETECTOR_METHODS
+    }
+
+    batch = [image] * max(1, min(8, BATCH_PIXELS // (image.shape[0] * image.shape[1])))
+    for name in SERVICE_METHODS:
+        argument = batch if name == "batch_detect" else image
+        cases[f"detector_service.{name}"] = (
+            lambda name=name, argument=argument: getattr(detector_service, name)(argument)
+        )
+
+    file_id = os.path.splitext(os.path.basename(upload_path))[0]
+    cases["symmetry_service.analyze_image"] = lambda: asyncio.run(
+        service.analyze_image(upload_path, file_id, use_cache=False)
+    )
+
+    return cases
+
+
+def run(sizes: List[str], kinds: List[str], repeats: int, pattern: Optional[str]) -> List[dict]:
+    """Run every selected case and return one result per (target, image, size)"""
+
+    service = SymmetryService()
+    detector_service = SymmetryDetectorService()
+    results = []
+
+    for size_name in sizes:
+        width, height = SIZES[size_name]
+        for kind in kinds:
+            image = KINDS[kind](width, height)
+            upload_path = os.path.join(settings.UPLOAD_DIR, f"bench-{kind}-{size_name}.png")
+            cv2.imwrite(upload_path, cv2.cvtColor(image, cv2.COLOR_RGB2BGR))
+
+            for target, fn in build_cases(image, upload_path, service, detector_service).items():
+                if pattern and pattern not in target:
+                    continue
+
+                timings, output = time_call(fn, repeats)
+                short_target = target.split(".")[-1]
+                outcome = summarize(short_target, output)
+                result = {
+                    "id": f"{target}|{kind}|{size_name}",
+                    "target": target,
+                    "image": kind,
+                    "size": f"{width}x{height}",
+                    "pixels": width * height,
+                    "median_s": statistics.median(timings),
+                    "min_s": min(timings),
+                    "repeats": repeats,
+                    "outcome": outcome
+                }
+                failure = check_expected(kind, short_target, width, outcome)
+                if failure:
+                    result["failure"] = failure
+
+                results.append(result)
+                print(f"{result['id']:<70} {result['min_s'] * 1000:10.2f} ms  {json.dumps(outcome)}")
+
+    return results
+
+
+def compare(results: List[dict], baseline: dict, tolerance: float, min_delta: float) -> List[str]:
+    """Regressions of ``results`` against ``baseline`` (a previous run's JSON)"""
+
+    previous = {result["id"]: result for result in baseline.get("results", [])}
+    regressions = []
+
+    for result in results:
+        if "failure" in result:
+            regressions.append(f"{result['id']}: {result['failure']}")
+
+        before = previous.get(result["id"])
+        if before is None:
+            continue
+
+        # Best-of-N is far less sensitive to scheduler noise than the median
+        slower = result["min_s"] - before["min_s"]
+        if result["min_s"] > before["min_s"] * (1 + tolerance) and slower >= min_delta:
+            regressions.append(
+                f"{result['id']}: {before['min_s'] * 1000:.2f} ms -> {result['min_s'] * 1000:.2f} ms"
+                f" (+{slower / before['min_s']:.0%})"
+            )
+
+        if result["outcome"] != before["outcome"]:
+            regressions.append(f"{result['id']}: outcome {before['outcome']} -> {result['outcome']}")
+
+    return regressions
+
+
+def metadata() -> dict:
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "detector_signature": SymmetryDetector.get_signature()
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the symmetry detectors")
+    parser.add_argument("--sizes", default=",".join(SIZES), help=f"Comma-separated subset of {list(SIZES)}")
+    parser.add_argument("--kinds", default=",".join(KINDS), help=f"Comma-separated subset of {list(KINDS)}")
+    parser.add_argument("--filter", default=None, help="Only run targets containing this text")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed calls per case (the fastest is compared)")
+    parser.add_argument("--output", default=None, help="Write results JSON here")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON to compare with")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results to --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown")
+    parser.add_argument("--min-delta", type=float, default=0.005, help="Ignore slowdowns below this many seconds")
+    args = parser.parse_args(argv)
+
+    sizes = [s for s in args.sizes.split(",") if s]
+    kinds = [k for k in args.kinds.split(",") if k]
+    unknown = [s for s in sizes if s not in SIZES] + [k for k in kinds if k not in KINDS]
+    if unknown:
+        parser.error(f"Unknown sizes/kinds: {unknown}")
+
+    get_analysis_executor().start()
+    try:
+        results = run(sizes, kinds, args.repeats, args.filter)
+    finally:
+        get_analysis_executor().shutdown(wait=True)
+
+    report = {"meta": metadata(), "results": results}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        failures = [f"{r['id']}: {r['failure']}" for r in results if "failure" in r]
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            failures = compare(results, json.load(f), args.tolerance, args.min_delta)
+    else:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one")
+        failures = [f"{r['id']}: {r['failure']}" for r in results if "failure" in r]
+
+    if failures:
+        print(f"\n{len(failures)} regression(s):")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+
+    print(f"\n{len(results)} cases OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
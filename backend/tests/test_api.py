@@ -6,7 +6,13 @@ Run with: pytest tests/test_api.py
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
+from app.core.config import settings
+from app.services.executor import get_analysis_executor
+from app.services.image_service import ImageService
+from app.worker import run_worker
 import io
+import json
+import os
 from PIL import Image
 
 
@@ -38,6 +44,12 @@ class TestHealthEndpoints:
         assert response.status_code == 200
         assert response.json()["status"] == "healthy"
 
+    def test_health_reports_executor(self):
+        """Test health check exposes analysis executor status"""
+        response = client.get("/health")
+        executor = response.json()["executor"]
+        assert executor["capacity"] >= executor["workers"] >= 1
+
     def test_upload_health(self):
         """Test upload service health"""
         response = client.get("/api/v1/upload/health")
@@ -72,6 +84,53 @@ class TestUploadEndpoint:
 
         assert response.status_code == 400
 
+    def test_upload_rejects_mislabelled_content(self):
+        """Content is sniffed: a non-image with an image extension is rejected"""
+        response = client.post(
+            "/api/v1/upload/",
+            files={"file": ("test.jpg", b"GIF89a not really a jpeg", "image/jpeg")}
+        )
+
+        assert response.status_code == 400
+
+    def test_upload_too_large(self, monkeypatch):
+        """Uploads over MAX_FILE_SIZE are rejected and leave no file behind"""
+        monkeypatch.setattr(settings, "MAX_FILE_SIZE", 100)
+        uploads_before = set(os.listdir(settings.UPLOAD_DIR))
+
+        response = client.post(
+            "/api/v1/upload/",
+            files={"file": ("test.jpg", create_test_image(), "image/jpeg")}
+        )
+
+        assert response.status_code == 400
+        assert "too large" in response.json()["detail"]
+        assert set(os.listdir(settings.UPLOAD_DIR)) == uploads_before
+
+    def test_oversized_upload_refused_before_endpoint(self, monkeypatch):
+        """Bodies over the limit are refused as they arrive, declared or chunked, without reaching save_upload"""
+        monkeypatch.setattr(settings, "MAX_FILE_SIZE", 1024)
+        saved = []
+        monkeypatch.setattr(ImageService, "save_upload", staticmethod(lambda file: saved.append(file)))
+        boundary = "limit-test"
+        body = (
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"big.jpg\"\r\n"
+            f"Content-Type: image/jpeg\r\n\r\n"
+        ).encode() + b"\xff" * (64 * 1024) + f"\r\n--{boundary}--\r\n".encode()
+        headers = {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+
+        declared = client.post("/api/v1/upload/", content=body, headers=headers)
+        chunked = client.post(
+            "/api/v1/analyze/",
+            content=(body[i:i + 4096] for i in range(0, len(body), 4096)),
+            headers=headers
+        )
+
+        for response in (declared, chunked):
+            assert response.status_code == 400
+            assert "too large" in response.json()["detail"]
+        assert saved == []
+
     def test_upload_no_file(self):
         """Test upload without file"""
         response = client.post("/api/v1/upload/")
@@ -100,11 +159,215 @@ class TestAnalysisEndpoint:
             assert "detected_axes" in data
             assert isinstance(data["symmetry_score"], (int, float))
 
+    def test_get_analysis_served_from_store(self):
+        """Test stored analyses are returned without re-running detection"""
+        response = client.post(
+            "/api/v1/analyze/",
+            files={"file": ("test.jpg", create_test_image(), "image/jpeg")}
+        )
+        assert response.status_code == 200
+        created = response.json()
+
+        stored = client.get(f"/api/v1/analyze/{created['analysis_id']}")
+        assert stored.status_code == 200
+        assert stored.json()["timestamp"] == created["timestamp"]
+        assert stored.json()["symmetry_score"] == created["symmetry_score"]
+
+        recomputed = client.get(f"/api/v1/analyze/{created['analysis_id']}?recompute=true")
+        assert recomputed.status_code == 200
+        assert recomputed.json()["timestamp"] != created["timestamp"]
+
+    def test_annotated_image_rendered_on_request(self):
+        """The annotated JPEG is not written during analysis but rendered (and resized) when fetched"""
+        response = client.post(
+            "/api/v1/analyze/",
+            files={"file": ("test.jpg", create_test_image(), "image/jpeg")}
+        )
+        assert response.status_code == 200
+        url = response.json()["processed_image_url"]
+        assert not os.path.exists(os.path.join(settings.RESULTS_DIR, os.path.basename(url)))
+
+        full = client.get(url)
+        assert full.status_code == 200
+        assert full.headers["content-type"] == "image/jpeg"
+        assert Image.open(io.BytesIO(full.content)).size == (100, 100)
+
+        small = client.get(url, params={"width": 40})
+        assert Image.open(io.BytesIO(small.content)).size == (40, 40)
+
+        assert client.get("/results/nonexistent_analyzed.jpg").status_code == 404
+
     def test_get_analysis_nonexistent(self):
         """Test getting non-existent analysis"""
         response = client.get("/api/v1/analyze/nonexistent_id")
         assert response.status_code == 404
 
+    def test_stage_timings_reported(self):
+        """Per-stage timings come back in the body, the Server-Timing header and /metrics"""
+        response = client.post(
+            "/api/v1/analyze/",
+            files={"file": ("test.jpg", create_test_image(), "image/jpeg")}
+        )
+        assert response.status_code == 200
+        timings = response.json()["stage_timings"]
+        assert {"decode", "cache_lookup", "thumbnail"} <= set(timings)
+
+        server_timing = response.headers["server-timing"]
+        assert "decode;dur=" in server_timing
+        assert "total;dur=" in server_timing
+
+        exposition = client.get("/metrics")
+        assert exposition.status_code == 200
+        assert exposition.headers["content-type"].startswith("text/plain")
+        assert 'symmetry_stage_duration_seconds_bucket{stage="decode",le="+Inf"}' in exposition.text
+        assert 'symmetry_http_requests_total{route="/api/v1/analyze/",method="POST",status="200"}' in exposition.text
+        assert "symmetry_analysis_in_flight 0" in exposition.text
+
+    def test_selected_detectors(self):
+        """Unrequested detectors are skipped and reported as such; selections are cached separately"""
+        response = client.post(
+            "/api/v1/analyze/",
+            params={"detectors": "quick"},
+            files={"file": ("test.jpg", create_test_image(), "image/jpeg")}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["skipped_detectors"] == ["diagonal", "radial", "regions"]
+        assert data["detector_status"]["radial"] == "skipped"
+        assert data["detector_status"]["vertical"] in ("detected", "not_detected")
+        assert "radial;" not in response.headers["server-timing"]
+        assert not os.path.exists(os.path.join(settings.RESULTS_DIR, f"{data['analysis_id']}_thumb.jpg"))
+
+        # Same bytes, full analysis: must not be served the partial cached detection
+        full = client.post("/api/v1/analyze/", files={"file": ("test.jpg", create_test_image(), "image/jpeg")})
+        assert full.json()["skipped_detectors"] == []
+        assert "skipped" not in full.json()["detector_status"].values()
+
+        invalid = client.post(
+            "/api/v1/analyze/",
+            params={"detectors": "vertical,sideways"},
+            files={"file": ("test.jpg", create_test_image(), "image/jpeg")}
+        )
+        assert invalid.status_code == 400
+
+    def test_saturated_executor_returns_503(self, monkeypatch):
+        """A full analysis queue is reported as 503 rather than queued without bound"""
+        executor = get_analysis_executor()
+        monkeypatch.setattr(executor, "_in_flight", executor.capacity)
+
+        response = client.post(
+            "/api/v1/analyze/",
+            files={"file": ("test.jpg", create_test_image(), "image/jpeg")}
+        )
+
+        assert response.status_code == 503
+        assert "queue is full" in response.json()["detail"]
+
+    def test_latency_budget(self):
+        """Past X-Deadline-Ms only the first detector runs; the partial result is recomputed on read"""
+        img = Image.frombytes("RGB", (64, 64), os.urandom(64 * 64 * 3))  # Never a result-cache hit
+        img_bytes = io.BytesIO()
+        img.save(img_bytes, format="PNG")
+        img_bytes.seek(0)
+
+        response = client.post(
+            "/api/v1/analyze/",
+            headers={"X-Deadline-Ms": "1"},
+            files={"file": ("budget.png", img_bytes, "image/png")}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["partial"] is True
+        assert data["detector_status"]["vertical"] in ("detected", "not_detected")
+        assert data["skipped_detectors"] == ["horizontal", "diagonal", "radial", "regions"]
+
+        stored = client.get(f"/api/v1/analyze/{data['analysis_id']}")
+        assert stored.status_code == 200
+        assert stored.json()["partial"] is False
+        assert stored.json()["skipped_detectors"] == []
+
+        queued = client.post(
+            "/api/v1/analyze/",
+            params={"async": "true"},
+            headers={"X-Deadline-Ms": "300"},
+            files={"file": ("test.jpg", create_test_image(), "image/jpeg")}
+        )
+        assert queued.status_code == 400
+
+    def test_profiled_analysis(self, monkeypatch):
+        """X-Profile stores downloadable folded stacks, only when profiling is enabled"""
+        files = {"file": ("test.jpg", create_test_image(), "image/jpeg")}
+        assert client.post("/api/v1/analyze/", files=files, headers={"X-Profile": "1"}).status_code == 403
+
+        monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+        files = {"file": ("test.jpg", create_test_image(), "image/jpeg")}
+        response = client.post("/api/v1/analyze/", files=files, headers={"X-Profile": "1"})
+        assert response.status_code == 200
+        profile_url = response.headers["x-profile-url"]
+
+        try:
+            profile = client.get(profile_url)
+            assert profile.status_code == 200
+            _, count = profile.text.splitlines()[0].rsplit(" ", 1)
+            assert "analyze_image_sync" in profile.text
+            assert int(count) > 0
+        finally:
+            os.remove(os.path.join(settings.PROFILE_DIR, f"{response.json()['analysis_id']}.folded"))
+
+        assert client.get("/api/v1/profiles/nonexistent").status_code == 404
+
+
+class TestAdminEndpoints:
+    """Test admin endpoints"""
+
+    def test_hot_paths(self, monkeypatch):
+        """Hot paths are reported as ranked functions or merged folded stacks, only when enabled"""
+        assert client.get("/api/v1/admin/hot-paths").status_code == 403
+        assert "/api/v1/admin/hot-paths" not in client.get("/openapi.json").json()["paths"]
+
+        monkeypatch.setattr(settings, "ADMIN_ENDPOINTS_ENABLED", True)
+        response = client.get("/api/v1/admin/hot-paths", params={"limit": 5})
+        assert response.status_code == 200
+        data = response.json()
+        assert {"processes", "samples", "self", "cumulative"} <= set(data)
+        assert len(data["self"]) <= 5
+
+        folded = client.get("/api/v1/admin/hot-paths", params={"format": "folded"})
+        assert folded.status_code == 200
+        assert folded.headers["content-type"].startswith("text/plain")
+
+
+class TestJobEndpoints:
+    """Test queued (async=true) analyses"""
+
+    def test_async_analysis_job(self):
+        """Queued analyses return 202 and are completed by a worker"""
+        response = client.post(
+            "/api/v1/analyze/",
+            params={"async": "true"},
+            files={"file": ("test.jpg", create_test_image(), "image/jpeg")}
+        )
+        assert response.status_code == 202
+        job = response.json()
+        assert job["status"] == "queued"
+        assert response.headers["location"] == job["status_url"]
+
+        assert run_worker(worker_id="test-worker", once=True) >= 1
+
+        status = client.get(job["status_url"])
+        assert status.status_code == 200
+        assert status.json()["status"] == "succeeded"
+        assert status.json()["result"]["analysis_id"] == job["job_id"]
+
+        events = client.get(job["events_url"])
+        assert events.headers["content-type"].startswith("text/event-stream")
+        assert events.text.startswith("event: succeeded\ndata: ")
+
+    def test_get_job_nonexistent(self):
+        """Unknown jobs are 404"""
+        assert client.get("/api/v1/jobs/nonexistent_id").status_code == 404
+        assert client.get("/api/v1/jobs/nonexistent_id/events").status_code == 404
+
 
 class TestGalleryEndpoint:
     """Test gallery endpoints"""
@@ -170,6 +433,50 @@ class TestBatchAnalysis:
         response = client.post("/api/v1/analyze/batch", files=files)
         assert response.status_code == 400
 
+    def test_batch_analyze_stream(self):
+        """Streaming batches lift the cap and emit one NDJSON line per file"""
+        files = [
+            ("files", (f"test{i}.jpg", create_test_image(), "image/jpeg"))
+            for i in range(12)
+        ]
+        files.append(("files", ("notes.txt", io.BytesIO(b"not an image"), "text/plain")))
+
+        response = client.post("/api/v1/analyze/batch", params={"stream": "true"}, files=files)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert lines[-1] == {"done": True, "total": 13, "successful": 12}
+        assert sorted(line["index"] for line in lines[:-1]) == list(range(13))
+        assert "error" in next(line for line in lines if line["index"] == 12)
+
+    def test_batch_stream_analyzes_while_storing(self, monkeypatch):
+        """Each file is analyzed as soon as it is stored, not after the whole batch is stored"""
+        from app.api.routes import analysis as analysis_routes
+
+        events = []
+        original_save = analysis_routes.image_service.save_upload
+        original_analyze = analysis_routes.analyze_stored
+
+        async def recording_save(file):
+            metadata = await original_save(file)
+            events.append(("stored", file.filename))
+            return metadata
+
+        def recording_analyze(file_metadata, *args, **kwargs):
+            events.append(("analyzing", file_metadata["original_filename"]))
+            return original_analyze(file_metadata, *args, **kwargs)
+
+        monkeypatch.setattr(analysis_routes.image_service, "save_upload", recording_save)
+        monkeypatch.setattr(analysis_routes, "analyze_stored", recording_analyze)
+
+        files = [("files", (f"test{i}.jpg", create_test_image(), "image/jpeg")) for i in range(4)]
+        response = client.post("/api/v1/analyze/batch", params={"stream": "true"}, files=files)
+
+        assert json.loads(response.text.splitlines()[-1]) == {"done": True, "total": 4, "successful": 4}
+        assert [name for kind, name in events if kind == "stored"] == [f"test{i}.jpg" for i in range(4)]
+        assert events.index(("analyzing", "test0.jpg")) < events.index(("stored", "test3.jpg"))
+
 
 # Run tests with: pytest tests/test_api.py -v
 # Run with coverage: pytest tests/test_api.py --cov=app
\ No newline at end of file
@@ -0,0 +1,209 @@
+"""
+Unit tests for symmetry detection algorithms
+Run with: pytest tests/test_detector.py
+"""
+
+import cv2
+import numpy as np
+from app.ml.context import AnalysisContext
+from app.ml.detector import SymmetryDetector
+from app.ml.ncc import mirror_ncc, ncc
+
+
+def create_mirrored_image(height=120, width=160, seed=0):
+    """Create an RGB noise image that is mirrored about its vertical midline"""
+    rng = np.random.default_rng(seed)
+    left = rng.integers(0, 256, size=(height, width // 2, 3), dtype=np.uint8)
+    return np.concatenate([left, left[:, ::-1]], axis=1)
+
+
+def create_offset_mirrored_image(height=90, axis=70, extra=60, seed=0):
+    """Create an RGB noise image mirrored about x=axis with unrelated noise to the right"""
+    rng = np.random.default_rng(seed)
+    left = rng.integers(0, 256, size=(height, axis, 3), dtype=np.uint8)
+    noise = rng.integers(0, 256, size=(height, extra, 3), dtype=np.uint8)
+    return np.concatenate([left, left[:, ::-1], noise], axis=1)
+
+
+def create_reflected_image(size=256, angle=30.0, seed=0):
+    """Create a smooth grayscale noise image symmetric about the line through its centre at ``angle``"""
+    rng = np.random.default_rng(seed)
+    noise = cv2.GaussianBlur(rng.random((size, size)).astype(np.float32), (0, 0), 3)
+    centre = (size - 1) / 2.0
+    theta = np.deg2rad(angle)
+    c2, s2 = np.cos(2 * theta), np.sin(2 * theta)
+    matrix = np.array([
+        [c2, s2, centre - c2 * centre - s2 * centre],
+        [s2, -c2, centre - s2 * centre + c2 * centre]
+    ])
+    reflected = cv2.warpAffine(noise, matrix, (size, size), flags=cv2.INTER_LINEAR)
+    image = noise + reflected
+    image = (image - image.min()) / (image.max() - image.min()) * 255
+    return image.astype(np.uint8)
+
+
+def create_rosette_image(order, size=256, seed=0):
+    """Create a grayscale noise image with ``order``-fold rotational symmetry about its centre"""
+    rng = np.random.default_rng(seed)
+    noise = cv2.GaussianBlur(rng.random((size, size)).astype(np.float32), (0, 0), 2)
+    centre = ((size - 1) / 2.0, (size - 1) / 2.0)
+    image = np.zeros_like(noise)
+    for i in range(order):
+        matrix = cv2.getRotationMatrix2D(centre, 360.0 * i / order, 1.0)
+        image += cv2.warpAffine(noise, matrix, (size, size))
+    image = (image - image.min()) / (image.max() - image.min()) * 255
+    return image.astype(np.uint8)
+
+
+class TestAnalysisContext:
+    """Test shared per-image analysis context"""
+
+    def test_views_are_memoized(self):
+        """Each derived view is computed only once"""
+        context = AnalysisContext(create_mirrored_image())
+
+        assert context.gray is context.gray
+        assert context.edges is context.edges
+        assert context.pyramid(2) is context.pyramid(2)
+        assert context.gray_f32.dtype == np.float32
+
+    def test_pyramid_levels_halve_resolution(self):
+        """Each pyramid level halves both dimensions"""
+        context = AnalysisContext(create_mirrored_image(128, 160))
+
+        assert context.pyramid(0) is context.gray
+        assert context.pyramid(1).shape == (64, 80)
+        assert context.pyramid(2).shape == (32, 40)
+
+    def test_detectors_accept_context(self):
+        """Detectors give the same answer for raw images and contexts"""
+        image = create_mirrored_image()
+        context = AnalysisContext(image)
+
+        raw = SymmetryDetector.detect_vertical_symmetry(image)
+        shared = SymmetryDetector.detect_vertical_symmetry(context)
+
+        assert raw[0] == shared[0]
+        assert abs(raw[1] - shared[1]) < 1e-9
+        assert shared[0]
+
+
+class TestAxisSearch:
+    """Test FFT-based mirror axis search"""
+
+    def test_finds_off_centre_vertical_axis(self):
+        """The FFT search locates an axis the midline check misses"""
+        image = create_offset_mirrored_image(axis=70)
+
+        midline = SymmetryDetector.detect_vertical_symmetry(image, search="midline")
+        found, confidence, coords = SymmetryDetector.detect_vertical_symmetry(image, search="fft")
+
+        assert not midline[0]
+        assert found
+        assert confidence > 0.99
+        assert abs(coords["x1"] - 70) < 0.5
+
+    def test_finds_off_centre_horizontal_axis(self):
+        """Horizontal search is the vertical search on the transpose"""
+        image = np.ascontiguousarray(create_offset_mirrored_image(axis=50).transpose(1, 0, 2))
+
+        candidates = SymmetryDetector.find_horizontal_axes(image, top_k=3)
+
+        assert len(candidates) == 3
+        assert abs(candidates[0]["position"] - 50) < 0.5
+        assert candidates[0]["confidence"] > candidates[1]["confidence"]
+
+    def test_finds_oblique_reflection_axis(self):
+        """The angle sweep finds an axis that none of the fixed checks cover"""
+        image = create_reflected_image(angle=30.0)
+
+        results = SymmetryDetector.detect_reflection_axes(image)
+        found, confidence, _, angle = results[0]
+
+        assert found
+        assert confidence > 0.9
+        assert abs(angle - 30.0) < 1.5
+        assert not SymmetryDetector.is_fixed_axis_angle(angle)
+
+
+class TestRadialOrder:
+    """Test polar-transform rotational order detection"""
+
+    def test_reports_dominant_order(self):
+        """An n-fold rosette reports n rather than one of its divisors"""
+        for order in (3, 5, 6):
+            detected, confidence, found = SymmetryDetector.detect_radial_order(create_rosette_image(order))
+
+            assert detected
+            assert confidence > 0.95
+            assert found == order
+
+    def test_noise_has_no_order(self):
+        """Unstructured noise is not reported as radially symmetric"""
+        rng = np.random.default_rng(1)
+        image = cv2.GaussianBlur(rng.integers(0, 256, size=(200, 240), dtype=np.uint8), (0, 0), 2)
+
+        detected, confidence, order = SymmetryDetector.detect_radial_order(image)
+
+        assert not detected
+        assert confidence < 0.3
+
+    def test_polar_mode_matches_detect_radial_symmetry(self):
+        """detect_radial_symmetry delegates to the polar engine in polar mode"""
+        image = create_rosette_image(4)
+
+        detected, confidence = SymmetryDetector.detect_radial_symmetry(image, mode="polar")
+
+        assert detected
+        assert abs(confidence - SymmetryDetector.detect_radial_order(image)[1]) < 1e-12
+
+
+class TestDiagonalTranspose:
+    """Test the exact transpose-based diagonal detector"""
+
+    def test_labels_the_symmetric_diagonal(self):
+        """Only the diagonal the image is mirrored about is detected"""
+        rng = np.random.default_rng(2)
+        base = cv2.GaussianBlur(rng.random((128, 128)).astype(np.float32), (0, 0), 3)
+        image = np.full((128, 200), 40, dtype=np.uint8)
+        image[:, 36:164] = cv2.normalize(base + base.T, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+
+        results = SymmetryDetector.detect_diagonal_symmetry(image, mode="transpose")
+
+        assert [r[3] for r in results] == ["main_diagonal"]
+        assert results[0][1] > 0.99
+        assert results[0][2] == {"x1": 36, "y1": 0, "x2": 164, "y2": 128}
+
+    def test_anti_diagonal_and_noise(self):
+        """The anti-diagonal is the transpose of the double flip; noise scores near chance"""
+        rng = np.random.default_rng(3)
+        base = rng.integers(0, 256, size=(90, 90)).astype(np.float32)
+        mirrored = ((base + base[::-1, ::-1].T) / 2).astype(np.uint8)
+
+        results = SymmetryDetector.detect_diagonal_symmetry(mirrored, threshold=0.0, mode="transpose")
+        scores = {r[3]: r[1] for r in results}
+
+        assert scores["anti_diagonal"] > 0.99
+        assert abs(scores["main_diagonal"] - 0.5) < 0.1
+
+
+class TestNCC:
+    """Test the shared normalized cross-correlation kernel"""
+
+    def test_matches_pearson_correlation(self):
+        """Blocked sums give the same value as np.corrcoef, for every backend"""
+        rng = np.random.default_rng(4)
+        a = rng.integers(0, 256, size=(300, 200), dtype=np.uint8)
+        b = (a // 2 + rng.integers(0, 128, size=a.shape)).astype(np.uint8)
+        expected = np.corrcoef(a.ravel().astype(np.float64), b.ravel().astype(np.float64))[0, 1]
+
+        assert abs(ncc(a, b) - expected) < 1e-9
+        assert abs(ncc(a, b, backend="opencv") - expected) < 1e-4
+
+    def test_mirror_on_flipped_views(self):
+        """Mirrored halves correlate perfectly; constant inputs give 0"""
+        image = create_mirrored_image()[:, :, 0]
+
+        assert mirror_ncc(image, axis=1) > 0.999999
+        assert mirror_ncc(np.ascontiguousarray(image.T), axis=0) > 0.999999
+        assert ncc(np.full((8, 8), 7, np.uint8), image[:8, :8]) == 0.0
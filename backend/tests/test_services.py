@@ -0,0 +1,644 @@
+"""
+Unit tests for service-layer components
+Run with: pytest tests/test_services.py
+"""
+
+from datetime import datetime, timedelta
+import asyncio
+import io
+import os
+import threading
+import time
+import cv2
+import numpy as np
+import pytest
+from PIL import ExifTags, Image
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app.core.profiling import ContinuousSampler, load_hot_paths
+from app.ml.cascade import DetectionCascade
+from app.ml.context import AnalysisContext
+from app.ml.detector import SymmetryDetector
+from app.models import database
+from app.models.database import AnalysisJob, AnalysisRecord, Base, StorageUsage
+from app.models.schemas import SymmetryAnalysisResult
+from app.services import symmetry_service
+from app.services.analysis_store import AnalysisStore
+from app.services.executor import AnalysisExecutor, ExecutorBusyError
+from app.services.image_service import ImageService, ImageTooLargeError
+from app.services.job_queue import JobQueue
+from app.services.render_service import render_annotated
+from app.services.result_cache import ResultCache
+from app.services.stats_service import StatsService
+from app.services.symmetry_detector import SymmetryDetectorService
+from app.services.symmetry_service import SymmetryService
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Session factory for a throwaway SQLite database"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def store(session_factory):
+    """Analysis store backed by a throwaway SQLite database"""
+    return AnalysisStore(session_factory=session_factory)
+
+
+def make_result(index: int, score: float) -> SymmetryAnalysisResult:
+    """Minimal analysis result for persistence tests"""
+    return SymmetryAnalysisResult(
+        analysis_id=f"analysis-{index}",
+        original_image_url=f"/uploads/analysis-{index}",
+        processed_image_url=f"/results/analysis-{index}_analyzed.jpg",
+        symmetry_score=score,
+        detected_axes=[],
+        detected_regions=[],
+        has_vertical_symmetry=False,
+        has_horizontal_symmetry=False,
+        has_radial_symmetry=False,
+        processing_time=0.1,
+        timestamp=datetime(2025, 1, 1) + timedelta(minutes=index)
+    )
+
+
+class TestAnalysisExecutor:
+    """Test the bounded analysis executor"""
+
+    def test_rejects_work_beyond_workers_and_queue(self):
+        """With every worker busy and the queue full, further jobs fail fast and slots are released"""
+        executor = AnalysisExecutor(kind="thread", max_workers=1, queue_size=1)
+        release = threading.Event()
+
+        async def scenario():
+            running = [asyncio.ensure_future(executor.run(release.wait, 5)) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            assert executor.in_flight == 2
+            assert executor.queue_depth == 1
+
+            with pytest.raises(ExecutorBusyError):
+                await executor.run(release.wait, 5)
+            assert executor.in_flight == 2
+
+            release.set()
+            assert await asyncio.gather(*running) == [True, True]
+            assert executor.in_flight == 0
+            assert await executor.run(sum, [1, 2]) == 3
+
+        try:
+            asyncio.run(scenario())
+        finally:
+            release.set()
+            executor.shutdown()
+
+
+class TestResultCache:
+    """Test the content-addressed result cache"""
+
+    def test_round_trip(self, tmp_path):
+        """Stored payloads are returned unchanged"""
+        cache = ResultCache(path=str(tmp_path / "cache.db"), max_bytes=1024 * 1024)
+        key = cache.make_key("abc")
+
+        assert cache.get(key) is None
+        cache.put(key, {"symmetry_score": 42.0})
+        assert cache.get(key) == {"symmetry_score": 42.0}
+
+    def test_key_includes_detector_signature(self):
+        """Keys change with the detector signature"""
+        key = ResultCache.make_key("abc")
+        assert key.startswith("abc:")
+        assert len(key) > len("abc:")
+
+    def test_lru_eviction_respects_budget(self, tmp_path):
+        """Least recently used entries are evicted once over budget"""
+        payload = {"data": "x" * 100}
+        cache = ResultCache(path=str(tmp_path / "cache.db"), max_bytes=250)
+
+        cache.put("a", payload)
+        cache.put("b", payload)
+        cache.get("a")  # "b" is now least recently used
+        cache.put("c", payload)
+
+        assert cache.get("a") == payload
+        assert cache.get("b") is None
+        assert cache.get("c") == payload
+        assert cache.get_stats()["total_bytes"] <= 250
+
+
+class TestAnalysisStore:
+    """Test persisted analyses and gallery pagination"""
+
+    def test_save_and_get(self, store):
+        """Saved results load back unchanged"""
+        result = make_result(1, 80.0)
+        store.save(result, "uploads/analysis-1.jpg")
+
+        assert store.get("analysis-1") == result
+        assert store.get("missing") is None
+        assert store.delete("analysis-1")
+        assert store.get("analysis-1") is None
+
+    @pytest.mark.parametrize("sort_by", ["timestamp", "score"])
+    def test_keyset_pagination_visits_every_row_once(self, store, sort_by):
+        """Walking cursors returns every row exactly once, in order"""
+        for i in range(25):
+            store.save(make_result(i, float(i % 7) * 10), f"uploads/analysis-{i}.jpg")
+
+        seen = []
+        cursor = None
+        while True:
+            rows, cursor = store.list_page(sort_by, limit=10, cursor=cursor)
+            seen.extend(rows)
+            if cursor is None:
+                break
+
+        key = "symmetry_score" if sort_by == "score" else "timestamp"
+        assert len({row["analysis_id"] for row in seen}) == 25
+        assert [row[key] for row in seen] == sorted((row[key] for row in seen), reverse=True)
+
+    def test_cursor_for_other_sort_is_rejected(self, store):
+        """Cursors are bound to their sort order"""
+        for i in range(3):
+            store.save(make_result(i, 50.0), f"uploads/analysis-{i}.jpg")
+
+        _, cursor = store.list_page("score", limit=1)
+        with pytest.raises(ValueError):
+            store.list_page("timestamp", limit=1, cursor=cursor)
+
+    def test_no_processed_image_path_recorded(self, session_factory, store):
+        """Annotated images are rendered on request, so no stored path is recorded"""
+        store.save(make_result(0, 50.0), "uploads/analysis-0.jpg")
+
+        with session_factory() as db:
+            assert db.query(AnalysisRecord).one().processed_image_path is None
+
+    def test_legacy_not_null_column_is_relaxed(self, tmp_path, monkeypatch):
+        """Databases created while processed_image_path was required are rebuilt with their rows"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE analyses (id INTEGER NOT NULL PRIMARY KEY, analysis_id VARCHAR NOT NULL, "
+                "original_filename VARCHAR NOT NULL, original_image_path VARCHAR NOT NULL, "
+                "processed_image_path VARCHAR NOT NULL, symmetry_score FLOAT NOT NULL)"
+            ))
+            conn.execute(text("CREATE UNIQUE INDEX ix_analyses_analysis_id ON analyses (analysis_id)"))
+            conn.execute(text("INSERT INTO analyses VALUES (1, 'a', 'a.jpg', 'uploads/a.jpg', 'results/a.jpg', 42.0)"))
+        monkeypatch.setattr(database, "engine", engine)
+
+        database._relax_processed_image_path()
+
+        columns = {column["name"]: column for column in inspect(engine).get_columns("analyses")}
+        assert columns["processed_image_path"]["nullable"]
+        with sessionmaker(bind=engine)() as db:
+            assert db.query(AnalysisRecord.analysis_id, AnalysisRecord.symmetry_score).all() == [("a", 42.0)]
+
+
+class TestStatsService:
+    """Test incrementally maintained statistics"""
+
+    def test_aggregates_follow_writes_and_deletes(self, session_factory, store):
+        """Count, average, min and max track saves, replacements and deletes"""
+        stats = StatsService(session_factory=session_factory)
+        stats.reconcile()
+
+        for i, score in enumerate([40.0, 60.0, 90.0]):
+            store.save(make_result(i, score), f"uploads/analysis-{i}.jpg")
+
+        summary = stats.get_gallery_stats()
+        assert summary["total_analyses"] == 3
+        assert summary["average_score"] == pytest.approx(63.33, abs=0.01)
+        assert (summary["lowest_score"], summary["highest_score"]) == (40.0, 90.0)
+
+        store.delete("analysis-2")
+        store.save(make_result(0, 70.0), "uploads/analysis-0.jpg")
+
+        summary = stats.get_gallery_stats()
+        assert summary["total_analyses"] == 2
+        assert (summary["lowest_score"], summary["highest_score"]) == (60.0, 70.0)
+
+    def test_incomplete_analyses_stay_out_of_gallery_and_stats(self, session_factory, store):
+        """Analyses that skipped detectors are stored but neither listed nor aggregated"""
+        stats = StatsService(session_factory=session_factory)
+        stats.reconcile()
+
+        store.save(make_result(0, 80.0), "uploads/analysis-0.jpg")
+        partial = make_result(1, 10.0)
+        partial.skipped_detectors = ["diagonal", "radial", "regions"]
+        store.save(partial, "uploads/analysis-1.jpg")
+
+        assert store.get("analysis-1").skipped_detectors == ["diagonal", "radial", "regions"]
+        rows, _ = store.list_page("timestamp")
+        assert [row["analysis_id"] for row in rows] == ["analysis-0"]
+        assert stats.get_gallery_stats()["total_analyses"] == 1
+        assert stats.get_gallery_stats()["lowest_score"] == 80.0
+
+        # Recomputed in full: now counted; deleting it again only removes what was counted
+        store.save(make_result(1, 60.0), "uploads/analysis-1.jpg")
+        assert stats.get_gallery_stats()["total_analyses"] == 2
+        store.delete("analysis-0")
+        incremental = stats.get_gallery_stats()
+        stats.reconcile()
+        assert stats.get_gallery_stats() == incremental == dict(incremental, total_analyses=1, average_score=60.0)
+
+    def test_reconcile_matches_incremental_totals(self, session_factory, store):
+        """Rebuilding from scratch gives the same score aggregates"""
+        stats = StatsService(session_factory=session_factory)
+        stats.reconcile()
+
+        for i in range(5):
+            store.save(make_result(i, 10.0 * i), f"uploads/analysis-{i}.jpg")
+        store.delete("analysis-4")
+
+        incremental = stats.get_gallery_stats()
+        stats.reconcile()
+        assert stats.get_gallery_stats() == incremental
+
+    def test_first_file_change_builds_storage_totals(self, session_factory, tmp_path, monkeypatch):
+        """A change recorded before any totals exist is not lost"""
+        monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path / "uploads"))
+        monkeypatch.setattr(settings, "RESULTS_DIR", str(tmp_path / "results"))
+        os.makedirs(settings.UPLOAD_DIR)
+        stats = StatsService(session_factory=session_factory)
+
+        path = os.path.join(settings.UPLOAD_DIR, "a.jpg")
+        with open(path, "wb") as f:
+            f.write(b"x" * 100)
+        stats.record_file_written("uploads", path, None)
+
+        with session_factory() as db:
+            usage = db.get(StorageUsage, "uploads")
+            assert (usage.bytes_used, usage.file_count) == (100, 1)
+
+
+class TestJobQueue:
+    """Test the SQLite-backed analysis job queue"""
+
+    @pytest.fixture
+    def queue(self, session_factory):
+        return JobQueue(session_factory=session_factory, lease_seconds=60, max_attempts=2)
+
+    def expire_lease(self, session_factory, job_id):
+        with session_factory() as db:
+            db.get(AnalysisJob, job_id).lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+            db.commit()
+
+    def test_claims_are_exclusive_and_fifo(self, queue):
+        """Each job goes to exactly one worker, oldest first"""
+        queue.enqueue("job-1", "uploads/job-1.jpg")
+        queue.enqueue("job-2", "uploads/job-2.jpg")
+
+        first = queue.claim("worker-a")
+        second = queue.claim("worker-b")
+
+        assert (first["job_id"], second["job_id"]) == ("job-1", "job-2")
+        assert queue.claim("worker-c") is None
+        assert queue.get("job-1").status == "running"
+
+        assert queue.complete("job-1", "worker-a", make_result(1, 50.0))
+        assert not queue.complete("job-2", "worker-a", make_result(2, 50.0))
+
+        job = queue.get("job-1")
+        assert job.status == "succeeded"
+        assert job.result.symmetry_score == 50.0
+        assert queue.get_stats() == {"succeeded": 1, "running": 1}
+
+    def test_expired_lease_is_requeued(self, session_factory, queue):
+        """A job whose worker stopped renewing is retried, then failed after the last attempt"""
+        queue.enqueue("job-1", "uploads/job-1.jpg")
+        queue.claim("worker-a")
+        self.expire_lease(session_factory, "job-1")
+
+        retry = queue.claim("worker-b")
+        assert retry["attempts"] == 2
+        assert not queue.renew("job-1", "worker-a")
+        assert not queue.complete("job-1", "worker-a", make_result(1, 50.0))
+
+        self.expire_lease(session_factory, "job-1")
+        assert queue.claim("worker-c") is None
+        assert queue.get("job-1").status == "failed"
+
+    def test_failures_retry_up_to_max_attempts(self, queue):
+        """Failed attempts are requeued until max_attempts; released claims do not count"""
+        queue.enqueue("job-1", "uploads/job-1.jpg")
+
+        queue.claim("worker-a")
+        assert queue.release("job-1", "worker-a")
+        assert queue.claim("worker-a")["attempts"] == 1
+
+        queue.fail("job-1", "worker-a", "boom")
+        assert queue.get("job-1").status == "queued"
+
+        queue.claim("worker-a")
+        queue.fail("job-1", "worker-a", "boom")
+        job = queue.get("job-1")
+        assert (job.status, job.error, job.attempts) == ("failed", "boom", 2)
+
+
+class TestImageDecoding:
+    """Test single-pass, size-checked decoding in ImageService"""
+
+    def test_reduced_jpeg_decode_matches_pyramid_geometry(self):
+        """JPEGs larger than the working resolution decode at reduced scale, cropped like the pyramid"""
+        rng = np.random.default_rng(6)
+        image = cv2.GaussianBlur(rng.integers(0, 256, size=(301, 403, 3), dtype=np.uint8), (0, 0), 3)
+        data = cv2.imencode(".jpg", image)[1].tobytes()
+
+        full, full_reduction = ImageService.decode_image(data)
+        reduced, reduction = ImageService.decode_image(data, max_pixels=10000)
+
+        assert (full.shape, full_reduction) == ((301, 403, 3), 0)
+        assert (reduced.shape, reduction) == ((75, 100, 3), 2)
+
+    def test_reduced_decode_of_rotated_jpeg_keeps_whole_image(self):
+        """EXIF orientation swaps the decoded width and height; the reduced crop follows it"""
+        exif = Image.Exif()
+        exif[ExifTags.Base.Orientation] = 6
+        buffer = io.BytesIO()
+        Image.new("RGB", (400, 300), (40, 120, 200)).save(buffer, format="JPEG", exif=exif.tobytes())
+        data = buffer.getvalue()
+
+        full, _ = ImageService.decode_image(data)
+        reduced, reduction = ImageService.decode_image(data, max_pixels=10000)
+
+        assert ImageService.read_header(data)[:2] == (300, 400)
+        assert full.shape == (400, 300, 3)
+        assert (reduced.shape, reduction) == ((100, 75, 3), 2)
+
+    def test_pixel_bombs_rejected_from_header(self, monkeypatch):
+        """Images declaring more than MAX_IMAGE_PIXELS are refused before decoding"""
+        monkeypatch.setattr(settings, "MAX_IMAGE_PIXELS", 100 * 100)
+        data = cv2.imencode(".png", np.zeros((101, 100, 3), dtype=np.uint8))[1].tobytes()
+
+        with pytest.raises(ImageTooLargeError):
+            ImageService.decode_image(data)
+
+
+class TestRenderService:
+    """Test on-request rendering of annotated images"""
+
+    def test_rotated_jpeg_renders_whole_image_with_scaled_axes(self, tmp_path):
+        """Width and axis scale follow the EXIF-rotated image the axes were detected on"""
+        exif = Image.Exif()
+        exif[ExifTags.Base.Orientation] = 6
+        path = tmp_path / "rotated.jpg"
+        Image.new("RGB", (800, 600), (255, 255, 255)).save(path, format="JPEG", exif=exif.tobytes())
+        axis = {"type": "vertical", "confidence": 0.9, "coordinates": {"x1": 300, "y1": 0, "x2": 300, "y2": 800}}
+
+        rendered = cv2.imdecode(np.frombuffer(render_annotated(str(path), [axis], width=150), np.uint8), cv2.IMREAD_COLOR)
+
+        assert rendered.shape[:2] == (200, 150)
+        row = rendered[150].astype(int)
+        red = np.flatnonzero((row[:, 2] > 200) & (row[:, 0] < 100))
+        assert red.size and abs(red.mean() - 75) <= 2
+
+
+class TestContinuousSampler:
+    """Test the always-on sampler and hot-path aggregation"""
+
+    def test_busy_thread_shows_up_in_hot_paths(self, tmp_path):
+        """Samples of a busy thread are snapshotted per process and ranked by self and cumulative time"""
+
+        def spin_for(seconds):
+            end = time.perf_counter() + seconds
+            while time.perf_counter() < end:
+                pass
+
+        def busy_caller():
+            spin_for(0.3)
+
+        sampler = ContinuousSampler(interval=0.002, window=60, flush_seconds=0.05, directory=str(tmp_path))
+        sampler.start()
+        worker = threading.Thread(target=busy_caller)
+        worker.start()
+        worker.join()
+        sampler.stop()
+
+        assert (tmp_path / f"{os.getpid()}.json").exists()
+        hot_paths = load_hot_paths(limit=50, directory=str(tmp_path))
+        assert hot_paths["processes"] == 1
+        self_functions = [entry["function"] for entry in hot_paths["self"]]
+        cumulative_functions = [entry["function"] for entry in hot_paths["cumulative"]]
+        assert self_functions[0].startswith("spin_for ")
+        assert any(function.startswith("busy_caller ") for function in cumulative_functions)
+        assert not any(function.startswith("busy_caller ") for function in self_functions)
+
+
+class TestPyramidDetection:
+    """Test coarse-to-fine detection in SymmetryService"""
+
+    def test_detects_on_working_level(self, monkeypatch):
+        """Detection runs on a downsampled level and reports full-resolution coordinates"""
+        monkeypatch.setattr(settings, "SYMMETRY_PYRAMID", True)
+        monkeypatch.setattr(settings, "MAX_WORKING_PIXELS", 20000)
+
+        rng = np.random.default_rng(0)
+        left = np.repeat(np.repeat(rng.integers(0, 256, size=(40, 30), dtype=np.uint8), 8, 0), 8, 1)
+        image = np.concatenate([left, left[:, ::-1]], axis=1)  # 320x480
+
+        detection = SymmetryService().detect(AnalysisContext(image))
+        vertical = [axis for axis in detection["detected_axes"] if axis["type"] == "vertical"]
+
+        # Starts on level 2; near-threshold detectors on the noise may be refined one level finer
+        assert detection["pyramid_level"] in (1, 2)
+        assert detection["has_vertical_symmetry"]
+        assert vertical[0]["coordinates"] == {"x1": 240.0, "y1": 0.0, "x2": 240.0, "y2": 320.0}
+
+    def test_reports_finest_refined_level(self, monkeypatch):
+        """A detector refined down to full resolution is reflected in pyramid_level"""
+        monkeypatch.setattr(settings, "SYMMETRY_PYRAMID", True)
+        monkeypatch.setattr(settings, "MAX_WORKING_PIXELS", 20000)
+        # Near the threshold on every level, so vertical is refined all the way to level 0
+        monkeypatch.setattr(
+            SymmetryDetector, "detect_vertical_symmetry",
+            staticmethod(lambda image, threshold=0.85: (True, 0.86, {"x1": 1, "y1": 0, "x2": 1, "y2": 1}))
+        )
+
+        rng = np.random.default_rng(2)
+        image = rng.integers(0, 256, size=(320, 480), dtype=np.uint8)
+
+        assert SymmetryService().detect(AnalysisContext(image))["pyramid_level"] == 0
+
+    def test_refines_below_reduced_decode(self, monkeypatch):
+        """Refinement of a JPEG decoded at reduced scale continues on the full-size image"""
+        monkeypatch.setattr(settings, "SYMMETRY_PYRAMID", True)
+        monkeypatch.setattr(settings, "MAX_WORKING_PIXELS", 20000)
+        monkeypatch.setattr(symmetry_service, "REFINE_MARGIN", 1.0)  # Every detector is refined
+
+        rng = np.random.default_rng(3)
+        left = cv2.GaussianBlur(rng.integers(0, 256, size=(160, 120, 3), dtype=np.uint8), (0, 0), 2)
+        data = cv2.imencode(".jpg", np.concatenate([left, left[:, ::-1]], axis=1))[1].tobytes()
+        image, reduction = ImageService.decode_image(data, settings.MAX_WORKING_PIXELS)
+        assert reduction == 1
+
+        def decode_full():
+            return AnalysisContext(ImageService.decode_image(data)[0], bgr=True)
+
+        service = SymmetryService()
+        assert service.detect(AnalysisContext(image, bgr=True), reduction)["pyramid_level"] == 1
+        refined = service.detect(AnalysisContext(image, bgr=True), reduction, decode_full=decode_full)
+        assert refined["pyramid_level"] == 0
+        assert refined["has_vertical_symmetry"]
+
+    def test_full_resolution_by_default(self):
+        """Without pyramid mode everything runs on level 0"""
+        rng = np.random.default_rng(1)
+        image = rng.integers(0, 256, size=(64, 64), dtype=np.uint8)
+
+        assert SymmetryService().detect(AnalysisContext(image))["pyramid_level"] == 0
+
+
+class TestDetectionCascade:
+    """Test low-resolution probing of the expensive detectors in SymmetryService"""
+
+    @staticmethod
+    def make_scene() -> np.ndarray:
+        rng = np.random.default_rng(3)
+        image = np.tile(np.linspace(40, 200, 512, dtype=np.float32), (512, 1)).astype(np.uint8)
+        for _ in range(16):
+            x, y = (int(v) for v in rng.integers(0, 512, size=2))
+            size = int(rng.integers(16, 128))
+            cv2.rectangle(image, (x, y), (x + size, y + size // 2), int(rng.integers(0, 256)), -1)
+        return cv2.GaussianBlur(image, (0, 0), 2.0)
+
+    def test_prunes_within_tolerance(self, monkeypatch):
+        """Pruned detectors answer from the probe and keep the score within the tolerance"""
+        image = self.make_scene()
+        full = SymmetryService().detect(AnalysisContext(image))
+
+        monkeypatch.setattr(settings, "SYMMETRY_CASCADE", True)
+        monkeypatch.setattr(settings, "SYMMETRY_CASCADE_PROBE_PIXELS", 128 * 128)
+        pruned = SymmetryService().detect(AnalysisContext(image))
+
+        assert full["pruned_detectors"] == []
+        assert pruned["pruned_detectors"]
+        assert abs(pruned["symmetry_score"] - full["symmetry_score"]) <= settings.SYMMETRY_CASCADE_TOLERANCE
+
+    def test_radial_judged_against_full_diagonal(self):
+        """After diagonal's full run radial is re-planned with the diagonal value the score uses"""
+        cascade = DetectionCascade(AnalysisContext(self.make_scene()), ("diagonal", "radial"),
+                                   probe_pixels=128 * 128, tolerance=2.0)
+        cascade.bounds = {"diagonal": [(0.95, 0.3)], "radial": [(0.9, 0.025)]}
+
+        # Diagonal may fall either side of its threshold: it needs a full run before radial is decided
+        assert cascade.plan(0.0, 0.0) == []
+        # Alongside a passing diagonal radial moves the score by ~1.4 points, on its own by 2.5
+        assert cascade.plan(0.0, 0.0, exact={"diagonal": [0.95]}) == ["radial"]
+        assert cascade.plan(0.0, 0.0, exact={"diagonal": []}) == []
+
+    def test_zero_tolerance_runs_everything(self, monkeypatch):
+        """Without any allowed error every detector runs in full"""
+        image = self.make_scene()
+        full = SymmetryService().detect(AnalysisContext(image))
+
+        monkeypatch.setattr(settings, "SYMMETRY_CASCADE", True)
+        monkeypatch.setattr(settings, "SYMMETRY_CASCADE_TOLERANCE", 0.0)
+        detection = SymmetryService().detect(AnalysisContext(image))
+
+        assert detection["pruned_detectors"] == []
+        assert detection["symmetry_score"] == pytest.approx(full["symmetry_score"])
+
+
+class TestLatencyBudget:
+    """Test deadline-bounded detection in SymmetryService"""
+
+    def test_stops_at_deadline(self, monkeypatch):
+        """Stages after the one that overran the deadline are timed out; the score covers the rest"""
+        original = SymmetryDetector.detect_vertical_symmetry
+
+        def slow_vertical(*args, **kwargs):
+            time.sleep(0.25)
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(SymmetryDetector, "detect_vertical_symmetry", staticmethod(slow_vertical))
+        rng = np.random.default_rng(4)
+        left = rng.integers(0, 256, size=(64, 32), dtype=np.uint8)
+        image = np.concatenate([left, left[:, ::-1]], axis=1)
+
+        detection = SymmetryService().detect(AnalysisContext(image), deadline=time.time() + 0.2)
+
+        assert detection["partial"]
+        assert detection["has_vertical_symmetry"]
+        assert detection["detector_status"]["vertical"] == "detected"
+        assert detection["skipped_detectors"] == ["horizontal", "diagonal", "radial", "regions"]
+        assert detection["detector_status"]["radial"] == "timed_out"
+        assert detection["symmetry_score"] > 0
+
+    def test_first_stage_runs_past_deadline(self):
+        """An expired budget still yields the first selected detector's answer"""
+        rng = np.random.default_rng(5)
+        left = rng.integers(0, 256, size=(32, 64), dtype=np.uint8)
+        image = np.concatenate([left, left[::-1]], axis=0)
+
+        detection = SymmetryService().detect(
+            AnalysisContext(image), detectors=("horizontal", "radial"), deadline=time.time() - 1
+        )
+
+        assert detection["partial"]
+        assert detection["detector_status"]["horizontal"] == "detected"
+        assert detection["detector_status"]["radial"] == "timed_out"
+        assert detection["symmetry_score"] > 0
+
+    def test_no_deadline_is_complete(self):
+        rng = np.random.default_rng(6)
+        image = rng.integers(0, 256, size=(64, 64), dtype=np.uint8)
+
+        detection = SymmetryService().detect(AnalysisContext(image), deadline=time.time() + 60)
+
+        assert not detection["partial"]
+        assert "timed_out" not in detection["detector_status"].values()
+
+
+class TestBatchDetect:
+    """Test stacked batch detection in SymmetryDetectorService"""
+
+    @pytest.mark.parametrize("diagonal_mode", ["warp", "transpose"])
+    def test_matches_single_image_results(self, monkeypatch, diagonal_mode):
+        """Stacked results equal detect_all_symmetries; bad inputs only fail their own entry"""
+        monkeypatch.setattr(settings, "SYMMETRY_DIAGONAL_MODE", diagonal_mode)
+
+        rng = np.random.default_rng(5)
+        left = rng.integers(0, 256, size=(48, 32, 3), dtype=np.uint8)
+        images = [
+            np.concatenate([left, left[:, ::-1]], axis=1),
+            rng.integers(0, 256, size=(48, 64, 3), dtype=np.uint8),
+            "not an image",
+            rng.integers(0, 256, size=(48, 64, 3), dtype=np.uint8),
+            rng.integers(0, 256, size=(30, 30, 3), dtype=np.uint8)
+        ]
+        service = SymmetryDetectorService()
+
+        results = service.batch_detect(images)
+
+        assert [r["image_index"] for r in results] == [0, 1, 2, 3, 4]
+        assert [r["success"] for r in results] == [True, True, False, True, True]
+        for index in (0, 1, 3, 4):
+            expected = service.detect_all_symmetries(images[index])
+            assert set(results[index]) == set(expected) | {"image_index", "success"}
+            assert results[index]["vertical"]["detected"] == expected["vertical"]["detected"]
+            assert results[index]["vertical"]["confidence"] == pytest.approx(expected["vertical"]["confidence"])
+            assert results[index]["radial"]["confidence"] == pytest.approx(expected["radial"]["confidence"])
+            assert [d["type"] for d in results[index]["diagonal"]] == [d["type"] for d in expected["diagonal"]]
+            assert results[index]["overall_score"] == pytest.approx(expected["overall_score"])
+        assert results[0]["vertical"]["detected"]
+
+    def test_cascade_never_prunes_batches(self, monkeypatch):
+        """Lone images run every detector in full, like stacked ones, even with SYMMETRY_CASCADE"""
+        monkeypatch.setattr(settings, "SYMMETRY_CASCADE", True)
+        monkeypatch.setattr(settings, "SYMMETRY_CASCADE_PROBE_PIXELS", 128 * 128)
+
+        rng = np.random.default_rng(7)
+        scene = TestDetectionCascade.make_scene()
+        images = [scene] + [rng.integers(0, 256, size=(48, 64), dtype=np.uint8) for _ in range(2)]
+        service = SymmetryDetectorService()
+        assert service.detect_all_symmetries(scene)["pruned_detectors"]
+
+        results = service.batch_detect(images)
+
+        assert [r["pruned_detectors"] for r in results] == [[], [], []]
+        full = service.detect_all_symmetries(scene, use_cascade=False)
+        assert results[0]["overall_score"] == pytest.approx(full["overall_score"])